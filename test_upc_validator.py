@@ -3,7 +3,37 @@ Test script for UPC Validator
 Run this to test the core validation functionality without the GUI
 """
 
-from upc_core import UPCValidator
+import csv
+import gzip
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+from upc_core import (
+    NUMPY_AVAILABLE, UPC_MODULES, BatchResultStore, FixedWidthUPCFile, UPCValidator, UPCError, UPCResult,
+    ValidationStats, count_completions, encode_upca, iter_completions, iter_corrections, iter_validate_file,
+    iter_validate_file_parallel, solve_missing_digits, suggest_corrections, validate_code, validate_many,
+    validate_records, write_corrections
+)
+from upc_gtin import (
+    GTIN_LENGTHS, compress_upca, expand_upce, gtin_check_digit, to_gtin14, upca_from_gtin, validate_gtin,
+    validate_gtins
+)
+from upc_history import PDF_AVAILABLE, HistoryStore
+from upc_scanner import (
+    CV2_AVAILABLE, Detection, FrameDecoder, LatestFrameQueue, ScanDebouncer, ScannerPipeline,
+    decode_offline, upc_from_detection
+)
+from upc_barcode import (
+    PIL_AVAILABLE, BarcodeGenerator, RenderCache, generate_batch, render_upca, render_upca_svg,
+    upca_bar_runs, write_vector_sheet
+)
 
 def test_upc_validation():
     """Test UPC validation with various examples."""
@@ -136,6 +166,1206 @@ def test_product_type_detection():
     print("=" * 60)
     print()
 
+def test_bulk_validation():
+    """Test that validate_many agrees with UPCValidator on every code."""
+    
+    print("=" * 60)
+    print("BULK VALIDATION - TEST")
+    print("=" * 60)
+    print()
+    
+    codes = [
+        "036000291452",
+        "012000161155",
+        "123456789013",
+        "12345678901",
+        "1234567890123",
+        "12345678901X",
+        " 078000082487 ",
+        "",
+    ]
+    expected_errors = [
+        UPCError.OK,
+        UPCError.OK,
+        UPCError.CHECK_DIGIT,
+        UPCError.LENGTH,
+        UPCError.LENGTH,
+        UPCError.NON_DIGIT,
+        UPCError.OK,
+        UPCError.LENGTH,
+    ]
+    
+    valid, errors = validate_many(codes)
+    
+    for i, upc in enumerate(codes):
+        expected_valid = UPCValidator(upc).validate()
+        print(f"{upc!r:18} valid={bool(valid[i])} error={UPCError(errors[i]).name}")
+        assert bool(valid[i]) == expected_valid
+        assert errors[i] == expected_errors[i]
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_fast_path():
+    """Test that is_valid_fast agrees with validate() for str and bytes input."""
+    
+    print("=" * 60)
+    print("FAST PATH - TEST")
+    print("=" * 60)
+    print()
+    
+    codes = [
+        "036000291452",
+        "041196403091",
+        "123456789013",
+        "12345678901",
+        "12345678901X",
+        "０３６０００２９１４５２",
+    ]
+    
+    for upc in codes:
+        expected = UPCValidator(upc).validate()
+        fast = UPCValidator.is_valid_fast(upc)
+        print(f"{upc:14} fast={fast} validate={expected}")
+        assert fast == expected
+        if upc.isascii():
+            assert UPCValidator.is_valid_fast(upc.encode()) == expected
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_result_records():
+    """Test that UPCResult records match UPCValidator fields."""
+    
+    print("=" * 60)
+    print("RESULT RECORDS - TEST")
+    print("=" * 60)
+    print()
+    
+    codes = ["036000291452", "312345678906", "123456789013", "12345678901X", "123"]
+    records = validate_records(codes)
+    
+    for upc, record in zip(codes, records):
+        validator = UPCValidator(upc)
+        validator.validate()
+        single = validate_code(upc)
+        print(f"{upc:14} {record.error.name:12} {record.product_type or record.error_message}")
+        
+        assert isinstance(record, UPCResult)
+        assert record == single == validator.to_result()
+        for field in ('upc_code', 'is_valid', 'error_message', 'product_type',
+                      'manufacturer_code', 'product_code', 'check_digit'):
+            assert getattr(record, field) == getattr(validator, field)
+    
+    # Records are immutable and carry no per-instance __dict__
+    assert not hasattr(records[0], '__dict__')
+    try:
+        records[0].is_valid = False
+        assert False, "UPCResult should be immutable"
+    except AttributeError:
+        pass
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_streaming_file_validation():
+    """Test chunked file validation for CSV-with-header and plain text files."""
+    
+    print("=" * 60)
+    print("STREAMING FILE VALIDATION - TEST")
+    print("=" * 60)
+    print()
+    
+    codes = ["036000291452", "123456789013", "012000161155", "12345678901X"] * 50
+    expected = [UPCValidator(upc).validate() for upc in codes]
+    
+    layouts = {
+        'csv': "UPC_Code,Product_Name\n" + "".join(f"{upc},Item {i}\n" for i, upc in enumerate(codes)),
+        'txt': "".join(f"{upc}\r\n\n" for upc in codes),
+    }
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, content in layouts.items():
+            path = os.path.join(tmp, f"upcs.{name}")
+            with open(path, 'w', newline='') as f:
+                f.write(content)
+            
+            # A tiny chunk size forces lines to straddle block boundaries
+            stats = ValidationStats()
+            chunks = list(iter_validate_file(path, chunk_size=37, stats=stats))
+            results = [r for chunk in chunks for r in chunk]
+            
+            print(f"{name}: {len(chunks)} chunks, {stats.valid} valid, {stats.invalid} invalid")
+            assert [r.upc_code for r in results] == codes
+            assert [r.is_valid for r in results] == expected
+            assert stats.total == len(codes)
+            assert stats.valid == sum(expected)
+            assert stats.progress == 1.0
+            
+            # Rejects only, with every code still counted
+            stats = ValidationStats()
+            rejects = [r for chunk in iter_validate_file(path, chunk_size=37, stats=stats, invalid_only=True)
+                       for r in chunk]
+            assert rejects == [r for r in results if not r.is_valid]
+            assert stats.total == len(codes)
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_parallel_file_validation():
+    """Test that the process-pool engine matches the sequential stream."""
+    
+    print("=" * 60)
+    print("PARALLEL FILE VALIDATION - TEST")
+    print("=" * 60)
+    print()
+    
+    codes = ["036000291452", "123456789013", "012000161155", "12345678901X", "1234"] * 40
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "upcs.csv")
+        with open(path, 'w', newline='') as f:
+            f.write("UPC_Code,Brand\n")
+            f.writelines(f"{upc},Brand {i}\n" for i, upc in enumerate(codes))
+        
+        sequential = [r for chunk in iter_validate_file(path) for r in chunk]
+        
+        # Small byte ranges so most lines straddle a range boundary
+        stats = ValidationStats()
+        parallel = [
+            r for chunk in iter_validate_file_parallel(path, workers=2, chunk_size=64, stats=stats)
+            for r in chunk
+        ]
+        print(f"sequential={len(sequential)} parallel={len(parallel)} "
+              f"valid={stats.valid} invalid={stats.invalid}")
+        assert parallel == sequential
+        assert stats.valid == sum(r.is_valid for r in sequential)
+        assert stats.total == len(codes)
+        
+        stats = ValidationStats()
+        rejects = [
+            r for chunk in iter_validate_file_parallel(path, workers=2, chunk_size=64,
+                                                       stats=stats, invalid_only=True)
+            for r in chunk
+        ]
+        assert rejects == [r for r in sequential if not r.is_valid]
+        assert stats.total == len(codes)
+        
+        # The parent's serial share is unpickling chunks and joining them into
+        # the store, so chunks travel as columns: 14 bytes per 12-digit row.
+        # Timings are printed for reference only.
+        path = os.path.join(tmp, "large.txt")
+        with open(path, 'w', newline='') as f:
+            f.writelines(f"{i * 7919 % 10 ** 12:012d}\n" for i in range(200000))
+        
+        payloads = [pickle.dumps(chunk) for chunk in iter_validate_file(path, chunk_size=1 << 20)]
+        started = time.perf_counter()
+        store = BatchResultStore()
+        for payload in payloads:
+            store.extend(pickle.loads(payload))
+        print(f"200k rows: {sum(map(len, payloads)):,} bytes pickled, "
+              f"parent join {(time.perf_counter() - started) * 1000:.0f} ms")
+        assert len(store) == 200000 and store[5] == validate_code(f"{5 * 7919:012d}")
+        assert sum(map(len, payloads)) < 200000 * 15
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_fixed_width_reader():
+    """Test the memory-mapped fixed-width reader against validate_records."""
+    
+    print("=" * 60)
+    print("FIXED-WIDTH MMAP READER - TEST")
+    print("=" * 60)
+    print()
+    
+    codes = ["036000291452", "123456789013", "012000161155", "12345678901X"] * 25
+    expected = validate_records(codes)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for newline, trailing in (("\n", True), ("\r\n", True), ("\n", False)):
+            path = os.path.join(tmp, "fixed.txt")
+            content = newline.join(codes) + (newline if trailing else "")
+            with open(path, 'w', newline='') as f:
+                f.write(content)
+            
+            with FixedWidthUPCFile(path) as upc_file:
+                stats = ValidationStats()
+                invalid = list(upc_file.iter_invalid(chunk_records=7, stats=stats))
+                
+                print(f"newline={newline!r} trailing={trailing}: "
+                      f"{len(upc_file)} records, {len(invalid)} invalid")
+                assert len(upc_file) == len(codes)
+                assert invalid == [(i, r) for i, r in enumerate(expected) if not r.is_valid]
+                assert stats.total == len(codes)
+                assert stats.valid == sum(r.is_valid for r in expected)
+                
+                # Random access re-validation of record N
+                assert upc_file.record(2) == b"012000161155"
+                assert upc_file.validate_record(1) == expected[1]
+                assert upc_file.is_valid_record(len(codes) - 2)
+        
+        # Closing early (e.g. on cancel) finishes iterators still holding views
+        upc_file = FixedWidthUPCFile(path)
+        flags = upc_file.iter_flags(chunk_records=7)
+        invalid = upc_file.iter_invalid(chunk_records=7)
+        next(flags)
+        next(invalid)
+        upc_file.close()
+        assert list(flags) == [] and list(invalid) == []
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_batch_result_store():
+    """Test filtering and sorting views over the columnar result store."""
+    
+    print("=" * 60)
+    print("BATCH RESULT STORE - TEST")
+    print("=" * 60)
+    print()
+    
+    codes = ["312345678906", "036000291452", "123456789013", "012000161155", "12345678901X"]
+    records = validate_records(codes)
+    
+    store = BatchResultStore()
+    store.extend(records[:2])
+    store.extend(records[2:])
+    
+    assert len(store) == len(codes)
+    assert [store[i] for i in range(len(store))] == records
+    assert store.valid_count == 3 and store.invalid_count == 2
+    
+    invalid = store.select(invalid_only=True)
+    groceries = store.select(product_digit='0')
+    by_upc = store.sort(store.select(), 'upc')
+    by_status = store.sort(store.select(), 'status', reverse=True)
+    
+    print(f"invalid rows:   {list(invalid)}")
+    print(f"digit 0 rows:   {list(groceries)}")
+    print(f"sorted by UPC:  {[store.codes[i] for i in by_upc]}")
+    
+    assert list(invalid) == [2, 4]
+    assert list(groceries) == [1, 3]
+    assert [store.codes[i] for i in by_upc] == sorted(codes)
+    assert [store.errors[i] for i in by_status] == sorted(store.errors, reverse=True)
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_history_store():
+    """Test the pooled, WAL-mode history store."""
+    
+    print("=" * 60)
+    print("HISTORY STORE - TEST")
+    print("=" * 60)
+    print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        
+        journal_mode = store.connection().execute('PRAGMA journal_mode').fetchone()[0]
+        print(f"journal_mode = {journal_mode}")
+        assert journal_mode.lower() == 'wal'
+        
+        store.add("036000291452", True)
+        store.add("123456789013", False)
+        
+        # Connections are long-lived and reused per thread
+        assert store.connection() is store.connection()
+        
+        # Worker threads release their connection when done, so short-lived
+        # background tasks don't accumulate open connections
+        def worker():
+            store.count()
+            store.release()
+        
+        for _ in range(20):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        assert len(store._connections) == 1
+        store.release()
+        assert store.count() == 2 and len(store._connections) == 1
+        
+        recent = store.recent(10)
+        print(f"recent rows: {[row[1:4] for row in recent]}")
+        assert [row.upc_code for row in recent] == ["123456789013", "036000291452"]
+        assert [row.product_type for row in recent] == ["", "General groceries"]
+        assert len(list(store.iter_rows())) == 2
+        
+        store.clear()
+        assert store.recent(10) == []
+        store.close()
+        
+        # Write-behind: rows stay buffered until flush_size or an explicit flush
+        path = os.path.join(tmp, "buffered.db")
+        store = HistoryStore(path, flush_size=3)
+        store.add("036000291452", True)
+        store.add("012000161155", True)
+        assert store.pending_count == 2
+        
+        reader = HistoryStore(path)
+        assert reader.recent(10) == []
+        
+        store.add("123456789013", False)
+        assert store.pending_count == 0
+        assert len(reader.recent(10)) == 3
+        
+        store.add("078000082487", True)
+        store.close()
+        assert len(reader.recent(10)) == 4
+        reader.close()
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_history_schema_and_paging():
+    """Test migration from the original schema and keyset pagination."""
+    
+    print("=" * 60)
+    print("HISTORY SCHEMA & PAGING - TEST")
+    print("=" * 60)
+    print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "legacy.db")
+        
+        # Database in the original TEXT schema
+        conn = sqlite3.connect(path)
+        conn.execute('''
+            CREATE TABLE validation_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                upc_code TEXT NOT NULL,
+                is_valid INTEGER NOT NULL,
+                product_type TEXT,
+                timestamp TEXT NOT NULL
+            )
+        ''')
+        legacy_rows = [
+            ("036000291452", 1, "General groceries", "2024-01-01T10:00:00.123456"),
+            ("12345678901X", 0, "", "2024-01-01T11:00:00"),
+            ("012345", 0, "", "2024-01-02T09:30:00"),
+            ("312345678906", 1, "Drugs & health products", "not a date"),
+        ]
+        conn.executemany(
+            'INSERT INTO validation_history (upc_code, is_valid, product_type, timestamp) VALUES (?, ?, ?, ?)',
+            legacy_rows
+        )
+        conn.commit()
+        conn.close()
+        
+        assert HistoryStore.needs_upgrade(path)
+        progress = []
+        store = HistoryStore(path, progress=lambda done, total: progress.append((done, total)))
+        assert progress == [(4, 4)] and not HistoryStore.needs_upgrade(path)
+        migrated = list(store.iter_rows(page_size=2))
+        print(f"migrated: {[(r.upc_code, r.is_valid) for r in migrated]}")
+        assert [r.upc_code for r in migrated] == [row[0] for row in reversed(legacy_rows)]
+        assert migrated[-1].product_type == "General groceries"
+        assert migrated[-1].timestamp == int(datetime.fromisoformat(legacy_rows[0][3]).timestamp())
+        assert migrated[0].timestamp == 0 and migrated[1].upc_code == "012345"
+        
+        columns = {row[1]: row[2] for row in store.connection().execute('PRAGMA table_info(validation_history)')}
+        indexes = {row[1] for row in store.connection().execute('PRAGMA index_list(validation_history)')}
+        assert columns['upc_code'] == 'INTEGER' and columns['timestamp'] == 'INTEGER'
+        assert {'idx_history_upc', 'idx_history_timestamp'} <= indexes
+        
+        # Keyset pages over new rows
+        for i in range(7):
+            store.add("036000291452" if i % 2 else "012000161155", True)
+        
+        first = store.page(limit=4)
+        second = store.page(before_id=first[-1].id, limit=4)
+        back = store.page(after_id=second[0].id, limit=4)
+        assert back == first
+        assert second[0].id < first[-1].id
+        
+        tide = list(store.iter_rows(upc="036000291452"))
+        assert len(tide) == 4 and all(r.upc_code == "036000291452" for r in tide)
+        assert [r.upc_code for r in store.page(upc="12345678901X")] == ["12345678901X"]
+        assert len(store.page(start=first[0].timestamp - 3600, limit=100)) == 7
+        store.close()
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_history_csv_export():
+    """Test streaming CSV export with filters, gzip and cancellation."""
+    
+    print("=" * 60)
+    print("HISTORY CSV EXPORT - TEST")
+    print("=" * 60)
+    print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        for i in range(25):
+            store.add("036000291452" if i % 5 else "12345678901X", i % 5 != 0)
+        
+        progress = []
+        plain = os.path.join(tmp, "history.csv")
+        written = store.export_csv(plain, batch_size=10, progress=lambda done, total: progress.append((done, total)))
+        with open(plain, newline='') as f:
+            rows = list(csv.reader(f))
+        
+        print(f"plain: {written} rows, progress={progress}")
+        assert written == 25 and len(rows) == 26
+        assert rows[0] == ['UPC Code', 'Valid', 'Product Type', 'Timestamp']
+        assert rows[1][:3] == ['036000291452', 'Yes', 'General groceries']
+        assert progress == [(10, 25), (20, 25), (25, 25)]
+        
+        compressed = os.path.join(tmp, "invalid.csv.gz")
+        written = store.export_csv(compressed, valid=False)
+        with gzip.open(compressed, 'rt', newline='') as f:
+            rows = list(csv.reader(f))
+        print(f"gzip, invalid only: {written} rows")
+        assert written == 5 and all(row[:2] == ['12345678901X', 'No'] for row in rows[1:])
+        
+        assert store.export_csv(plain, start=0, end=1) == 0
+        
+        cancel_event = threading.Event()
+        cancel_event.set()
+        assert store.export_csv(plain, batch_size=10, cancel_event=cancel_event) is None
+        assert not os.path.exists(plain)
+        store.close()
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_history_pdf_report():
+    """Test SQL summaries and the streamed PDF report."""
+    
+    print("=" * 60)
+    print("HISTORY PDF REPORT - TEST")
+    print("=" * 60)
+    print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        for i in range(120):
+            store.add("036000291452" if i % 4 else "12345678901X", i % 4 != 0)
+        store.add("312345678906", True)
+        
+        summary = store.summary()
+        print(f"summary: {summary['total']} total, {summary['valid']} valid, types={summary['by_product_type']}")
+        assert (summary['total'], summary['valid'], summary['invalid']) == (121, 91, 30)
+        assert summary['by_product_type'] == [('General groceries', 90), ('Invalid', 30), ('Drugs & health products', 1)]
+        assert len(summary['by_day']) == 1 and summary['by_day'][0][1:] == (91, 30)
+        assert store.summary(valid=False)['total'] == 30
+        
+        if PDF_AVAILABLE:
+            progress = []
+            path = os.path.join(tmp, "report.pdf")
+            drawn = store.export_pdf(path, page_size=50, progress=lambda done, total: progress.append((done, total)))
+            print(f"full report: {drawn} rows, progress={progress}")
+            assert drawn == 121 and progress[-1] == (121, 121)
+            assert open(path, 'rb').read(5) == b'%PDF-'
+            
+            assert store.export_pdf(path, summary_only=True) == 0
+            # Over the detail cap the report falls back to the summary
+            calls = len(progress)
+            assert store.export_pdf(path, max_detail_rows=100, progress=progress.append) == 0
+            assert len(progress) == calls
+            
+            cancel_event = threading.Event()
+            cancel_event.set()
+            os.remove(path)
+            assert store.export_pdf(path, cancel_event=cancel_event) is None
+            assert not os.path.exists(path)
+        else:
+            print("reportlab not installed - skipping PDF output")
+        store.close()
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_history_retention():
+    """Test archiving expired history and incremental vacuum."""
+    
+    print("=" * 60)
+    print("HISTORY RETENTION & COMPACTION - TEST")
+    print("=" * 60)
+    print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_dir = os.path.join(tmp, "archive")
+        store = HistoryStore(os.path.join(tmp, "history.db"), max_rows=10, archive_dir=archive_dir)
+        for i in range(30):
+            store.add("036000291452" if i % 3 else "12345678901X", i % 3 != 0)
+        
+        cancel_event = threading.Event()
+        cancel_event.set()
+        assert store.archive_expired(cancel_event=cancel_event, batch_size=5) == (0, None)
+        assert store.count() == 30 and os.listdir(archive_dir) == []
+        
+        archived, path = store.archive_expired(batch_size=7)
+        with gzip.open(path, 'rt', newline='') as f:
+            rows = list(csv.reader(f))
+        print(f"max_rows=10: archived {archived} rows to {os.path.basename(path)}")
+        assert archived == 20 and store.count() == 10
+        assert os.path.basename(path) == "history_000000000001-000000000020.csv.gz"
+        assert rows[0] == ['ID', 'UPC Code', 'Valid', 'Timestamp']
+        assert [int(row[0]) for row in rows[1:]] == list(range(1, 21))
+        assert rows[1][1:3] == ['12345678901X', '0'] and rows[2][1:3] == ['036000291452', '1']
+        assert store.page(limit=50)[-1].id == 21
+        assert store.archive_expired() == (0, None)
+        
+        # Ids don't follow timestamps: an epoch-0 row from the v0 migration
+        # expires alone, without taking the older-id current rows with it
+        with store.connection() as conn:
+            conn.execute(store.INSERT_SQL, (36000291452, None, 1, 0))
+        store.add("036000291452", True)
+        store.max_rows = None
+        archived, path = store.archive_expired(max_age=86400)
+        print(f"epoch-0 row: archived {archived} rows to {os.path.basename(path)}")
+        assert archived == 1 and store.count() == 11
+        assert os.path.basename(path) == "history_000000000031-000000000031.csv.gz"
+        
+        # Age limit, evaluated an hour from now
+        store.max_age = 60
+        result = store.maintain(now=time.time() + 3600)
+        print(f"max_age=60s: {result}")
+        assert result['archived'] == 11 and store.count() == 0
+        assert store.connection().execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        store.close()
+        
+        # Databases created without auto_vacuum are converted when opened,
+        # not by the background compact()
+        legacy = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(legacy)
+        conn.execute(HistoryStore.SCHEMA_SQL[0])
+        conn.execute('PRAGMA user_version = 1')
+        conn.commit()
+        conn.close()
+        assert HistoryStore.needs_upgrade(legacy)
+        store = HistoryStore(legacy)
+        assert store.connection().execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        assert not HistoryStore.needs_upgrade(legacy)
+        store.close()
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_render_cache():
+    """Test the size-bounded LRU cache used for rendered barcodes."""
+    
+    print("=" * 60)
+    print("BARCODE RENDER CACHE - TEST")
+    print("=" * 60)
+    print()
+    
+    cache = RenderCache(max_bytes=100)
+    cache.put(('036000291452', ()), 'a', 40)
+    cache.put(('012345678905', ()), 'b', 40)
+    assert cache.get(('036000291452', ())) == 'a'    # now most recently used
+    cache.put(('036000291452', (('module_width', 0.5),)), 'c', 40)
+    
+    stats = cache.stats()
+    print(f"stats: {stats}")
+    assert cache.get(('012345678905', ())) is None    # least recently used, evicted
+    assert cache.get(('036000291452', ())) == 'a'
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (2, 80, 1)
+    assert (cache.hits, cache.misses) == (2, 1)
+    
+    cache.put('too big', 'x', 101)
+    assert cache.get('too big') is None and len(cache) == 2
+    cache.put(('036000291452', ()), 'a2', 60)
+    assert cache.current_bytes == 100 and len(cache) == 2
+    
+    generator = BarcodeGenerator()
+    if not PIL_AVAILABLE:
+        print("Pillow not installed - skipping rendering")
+        assert generator.generate('036000291452') is None
+    else:
+        first = generator.generate('036000291452')
+        assert generator.generate('036000291452') is first
+        assert generator.generate('036000291452', module_width=0.5) is not first
+        assert (generator.cache.hits, generator.cache.misses) == (1, 2)
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_native_renderer():
+    """Test the UPC-A bar pattern encoder and the native raster renderer."""
+    
+    print("=" * 60)
+    print("NATIVE UPC-A RENDERER - TEST")
+    print("=" * 60)
+    print()
+    
+    pattern = encode_upca("036000291452")
+    print(f"pattern: {pattern}")
+    assert len(pattern) == UPC_MODULES == 95
+    assert pattern.startswith("101" + "0001101") and pattern.endswith("1101100" + "101")
+    assert pattern[45:50] == "01010"
+    try:
+        encode_upca("036000291453")
+        assert False, "invalid UPC encoded"
+    except ValueError as e:
+        assert "check digit" in str(e)
+    
+    if not PIL_AVAILABLE:
+        print("Pillow not installed - skipping rendering")
+    else:
+        image = render_upca("036000291452", module_width=0.254, quiet_zone=1.27, dpi=100, write_text=False)
+        print(f"image: {image.mode} {image.size}")
+        assert image.mode == 'L' and image.size == (105, round(10 / 25.4 * 100) + 2 * 4)
+        
+        # The middle row reads back as the bar pattern with 5-pixel quiet zones
+        row = [image.getpixel((x, image.height // 2)) for x in range(image.width)]
+        assert ''.join('1' if value == 0 else '0' for value in row) == "0" * 5 + pattern + "0" * 5
+        
+        assert render_upca("036000291452").height > render_upca("036000291452", write_text=False).height
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_vector_output():
+    """Test template-based SVG barcodes and streamed vector sheets."""
+    
+    print("=" * 60)
+    print("VECTOR (SVG/PDF) BARCODES - TEST")
+    print("=" * 60)
+    print()
+    
+    # Bar runs rebuilt from the templates match the encoder's pattern
+    for upc in ("036000291452", "012345678905", "312345678906"):
+        modules = ['0'] * UPC_MODULES
+        for x, width in upca_bar_runs(upc):
+            modules[x:x + width] = '1' * width
+        assert ''.join(modules) == encode_upca(upc)
+    
+    svg = render_upca_svg("036000291452", module_width=0.33)
+    root = ElementTree.fromstring(svg)
+    path = root.find('.//{http://www.w3.org/2000/svg}path')
+    print(f"svg: {len(svg)} bytes, width={root.get('width')}")
+    assert path.get('d').count('z') == 30    # 3 guards (6 bars) + 2 bars per digit
+    assert 'scale(0.33 10.0)' in path.get('transform')
+    assert root.find('.//{http://www.w3.org/2000/svg}text').text == "036000291452"
+    
+    generator = BarcodeGenerator()
+    assert generator.generate_svg("036000291452") is generator.generate_svg("036000291452")
+    
+    codes = ["036000291452", "012345678905", "bad"] * 10
+    with tempfile.TemporaryDirectory() as tmp:
+        sheet = os.path.join(tmp, "labels.svg")
+        report = generate_batch(codes, sheet, 'sheet-svg', columns=4)
+        labels = ElementTree.parse(sheet).getroot().findall('.//{http://www.w3.org/2000/svg}path')
+        print(f"svg sheet: {report.rendered} labels, {len(report.failures)} failed")
+        assert report.rendered == len(labels) == 20 and len(report.failures) == 10
+        
+        if PDF_AVAILABLE:
+            pdf = os.path.join(tmp, "labels.pdf")
+            report = write_vector_sheet(codes, pdf, 'pdf', columns=3, rows=4)
+            assert report.rendered == 20 and open(pdf, 'rb').read(5) == b'%PDF-'
+            
+            # 20 labels are 2 pages: one file per page
+            report = write_vector_sheet(codes, pdf, 'pdf', columns=3, rows=4, pages_per_file=1)
+            assert report.files == [pdf, os.path.join(tmp, "labels_0002.pdf")]
+            assert all(open(f, 'rb').read(5) == b'%PDF-' for f in report.files)
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_batch_barcodes():
+    """Test bulk barcode rendering to PNG files and label sheets."""
+    
+    print("=" * 60)
+    print("BATCH BARCODE GENERATION - TEST")
+    print("=" * 60)
+    print()
+    
+    if not PIL_AVAILABLE:
+        print("Pillow not installed - skipping")
+        print()
+        return
+    
+    codes = ["036000291452", "012345678905", "123", "036000291453", "312345678906"] * 3
+    with tempfile.TemporaryDirectory() as tmp:
+        report = generate_batch(codes, os.path.join(tmp, "png"), 'png', workers=1, chunk_size=4)
+        print(f"png: {report.rendered} rendered, {len(report.failures)} failed, "
+              f"{report.throughput:.0f} barcodes/s")
+        assert report.rendered == 9 and len(report.failures) == 6
+        assert report.failures[0] == ('123', 'UPC must be exactly 12 digits (got 3)')
+        assert sorted(os.listdir(os.path.join(tmp, "png"))) == [
+            "012345678905.png", "036000291452.png", "312345678906.png"
+        ]
+        
+        progress = []
+        report = generate_batch(codes, os.path.join(tmp, "sheets"), 'sheet-png', workers=2,
+                                columns=2, rows=2, chunk_size=4,
+                                progress=lambda done, total: progress.append((done, total)))
+        print(f"sheets: {report.files}")
+        assert report.rendered == 9 and len(report.files) == 3
+        assert progress == [(4, 9), (8, 9), (9, 9)]
+        
+        if PDF_AVAILABLE:
+            path = os.path.join(tmp, "labels.pdf")
+            report = generate_batch(codes, path, 'sheet-pdf', workers=1)
+            assert report.files == [path] and open(path, 'rb').read(5) == b'%PDF-'
+            
+            # 9 labels on 2 x 2 sheets are 3 pages, split 2 + 1
+            report = generate_batch(codes, path, 'sheet-pdf', workers=1, columns=2, rows=2,
+                                    pages_per_file=2)
+            print(f"pdf sheets: {[os.path.basename(f) for f in report.files]}")
+            assert report.files == [path, os.path.join(tmp, "labels_0002.pdf")]
+    
+    print()
+    print("=" * 60)
+    print()
+
+class _BrightBoxDecoder:
+    """Stand-in for pyzbar.decode: reports the bright box in an image as one barcode."""
+    
+    def __init__(self):
+        self.shapes = []
+    
+    def __call__(self, image):
+        self.shapes.append(image.shape)
+        ys, xs = (image > 128).nonzero()
+        if not len(xs):
+            return []
+        corners = [(xs.min(), ys.min()), (xs.min(), ys.max()), (xs.max(), ys.max()), (xs.max(), ys.min())]
+        return [SimpleNamespace(data=b"036000291452", type="UPCA",
+                                polygon=[SimpleNamespace(x=int(x), y=int(y)) for x, y in corners])]
+
+def test_frame_decoder():
+    """Test frame skipping, downsampling and ROI tracking in FrameDecoder."""
+    
+    print("=" * 60)
+    print("SCANNER FRAME DECODER - TEST")
+    print("=" * 60)
+    print()
+    
+    if not NUMPY_AVAILABLE:
+        print("NumPy not installed - skipping")
+        print()
+        return
+    
+    import numpy as np
+    
+    frame = np.zeros((480, 640), dtype=np.uint8)
+    frame[200:260, 300:420] = 255
+    decoder_fn = _BrightBoxDecoder()
+    decoder = FrameDecoder(decode_every=2, max_width=None, roi_margin=10, decode=decoder_fn)
+    
+    results = [decoder.process(frame) for _ in range(5)]
+    print(f"stats: {decoder.stats()}")
+    assert results[1] is None and results[3] is None
+    assert results[0][0] == Detection("036000291452", "UPCA", ((300, 200), (300, 259), (419, 259), (419, 200)))
+    assert results[4] == results[0]    # ROI decodes map back to frame coordinates
+    assert decoder_fn.shapes == [(480, 640), (80, 140), (80, 140)]
+    assert decoder.roi == (290, 190, 430, 270)
+    assert decoder.stats()['skip_rate'] == 0.4 and decoder.roi_hits == 2
+    
+    # Barcode gone: the empty ROI falls back to a full-frame decode, then the ROI is dropped
+    assert decoder.process(np.zeros_like(frame)) is None    # frame 6 is skipped
+    assert decoder.process(np.zeros_like(frame)) == [] and decoder.roi is None
+    assert decoder_fn.shapes[-2:] == [(80, 140), (480, 640)]
+    
+    if CV2_AVAILABLE:
+        decoder_fn = _BrightBoxDecoder()
+        decoder = FrameDecoder(decode_every=1, max_width=320, decode=decoder_fn)
+        color = np.dstack([frame] * 3)
+        polygon = decoder.process(color)[0].polygon
+        assert decoder_fn.shapes == [(240, 320)]
+        assert all(abs(x - ex) <= 2 and abs(y - ey) <= 2
+                   for (x, y), (ex, ey) in zip(polygon, ((300, 200), (300, 259), (419, 259), (419, 200))))
+    
+    print()
+    print("=" * 60)
+    print()
+
+class _FrameSource:
+    """Stand-in for cv2.VideoCapture that plays a list of frames."""
+    
+    def __init__(self, frames, delay=0.0):
+        self.frames = list(frames)
+        self.delay = delay
+        self.released = False
+    
+    def isOpened(self):
+        return True
+    
+    def read(self):
+        time.sleep(self.delay)
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+    
+    def release(self):
+        self.released = True
+
+def test_scanner_pipeline():
+    """Test latest-frame-wins queues and the capture/decode pipeline."""
+    
+    print("=" * 60)
+    print("SCANNER PIPELINE - TEST")
+    print("=" * 60)
+    print()
+    
+    frames = LatestFrameQueue(2)
+    for i in range(5):
+        frames.put(i)
+    assert (len(frames), frames.dropped) == (2, 3)
+    assert frames.get() == 3 and frames.get() == 4 and frames.get(timeout=0.01) is None
+    frames.close()
+    assert frames.get() is None and frames.closed
+    
+    if not NUMPY_AVAILABLE:
+        print("NumPy not installed - skipping pipeline")
+        print()
+        return
+    
+    import numpy as np
+    
+    blank = np.zeros((120, 160), dtype=np.uint8)
+    marked = blank.copy()
+    marked[40:60, 50:110] = 255
+    source = _FrameSource([blank, marked] * 10, delay=0.002)
+    hits = []
+    pipeline = ScannerPipeline(
+        on_detections=lambda index, detections: hits.append(index),
+        workers=2, decode_every=1, max_width=None, capture=source, decode=_BrightBoxDecoder()
+    )
+    pipeline.start()
+    
+    displayed = 0
+    while True:
+        item = pipeline.frames.get(timeout=1)
+        if item is None:
+            break
+        displayed += 1
+        pipeline.metrics.record('display', 0.0)
+    pipeline.stop()
+    
+    stats = pipeline.stats()
+    print(f"displayed {displayed}, hits {len(hits)}, stats: {stats['stages']}")
+    assert source.released and not pipeline.running
+    assert pipeline.captured == 20 and stats['stages']['capture']['count'] == 20
+    decoded = stats['stages']['decode']['count']
+    assert decoded + stats['decode_dropped'] == 20
+    assert hits and all(index % 2 == 1 for index in hits)
+    assert set(stats['stages']) == {'capture', 'queue_wait', 'decode', 'latency', 'display'}
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_offline_decoding():
+    """Test offline decoding of image folders and video files with dedupe."""
+    
+    print("=" * 60)
+    print("OFFLINE IMAGE/VIDEO DECODING - TEST")
+    print("=" * 60)
+    print()
+    
+    ean = Detection("0036000291452", "EAN13", ())
+    assert upc_from_detection(ean) == "036000291452"
+    assert upc_from_detection(Detection("4006381333931", "EAN13", ())) == "4006381333931"
+    
+    if not CV2_AVAILABLE:
+        print("OpenCV not installed - skipping")
+        print()
+        return
+    
+    import cv2
+    import numpy as np
+    
+    blank = np.zeros((120, 160), dtype=np.uint8)
+    marked = blank.copy()
+    marked[40:60, 50:110] = 255
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        images = os.path.join(tmp, "images")
+        os.makedirs(images)
+        for i in range(10):
+            cv2.imwrite(os.path.join(images, f"shelf_{i:02d}.png"), marked if i % 3 == 0 else blank)
+        with open(os.path.join(images, "broken.jpg"), 'wb') as f:
+            f.write(b"not an image")
+        
+        csv_path = os.path.join(tmp, "images.csv")
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        report = decode_offline(images, output=csv_path, history=store, workers=1, decode=_BrightBoxDecoder())
+        with open(csv_path, newline='') as f:
+            rows = list(csv.reader(f))
+        print(f"images: {report.items} decoded, {report.hits} hits, {report.rate:.0f} images/s")
+        assert (report.kind, report.items, report.hits, report.valid) == ('images', 10, 4, 4)
+        assert report.errors == [(os.path.join(images, "broken.jpg"), "Unreadable image")]
+        assert rows[1] == ["shelf_00.png", "0", "036000291452", "UPCA", "Yes", ""]
+        assert store.count() == 4
+        store.close()
+        
+        # 90 frames: barcode visible in frames 0-29 and 60-89
+        video = os.path.join(tmp, "conveyor.avi")
+        writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*'MJPG'), 30, (160, 120), False)
+        for i in range(90):
+            writer.write(marked if (i // 30) % 2 == 0 else blank)
+        writer.release()
+        
+        csv_path = os.path.join(tmp, "video.csv")
+        report = decode_offline(video, output=csv_path, workers=1, step=2, decode=_BrightBoxDecoder())
+        with open(csv_path, newline='') as f:
+            frames = [row[1] for row in csv.reader(f)][1:]
+        print(f"video: {report.items} frames decoded, {report.hits} hits, {report.rate:.0f} frames/s")
+        assert (report.kind, report.items, report.hits) == ('frames', 45, 2)
+        assert frames == ["0", "60"]
+    
+    print()
+    print("=" * 60)
+    print()
+
+def test_scan_debouncer():
+    """Test the time-windowed dedupe cache used by continuous scanning."""
+    
+    print("=" * 60)
+    print("CONTINUOUS SCAN DEBOUNCING - TEST")
+    print("=" * 60)
+    print()
+    
+    now = [0.0]
+    debouncer = ScanDebouncer(hold_off=2.0, clock=lambda: now[0])
+    
+    # Held in view: reported once, every sighting extends the window
+    reported = []
+    for _ in range(10):
+        if debouncer.accept("036000291452"):
+            reported.append(now[0])
+        now[0] += 0.5
+    assert reported == [0.0]
+    
+    # A second item interleaved with the first is reported on its own
+    assert debouncer.accept("012345678905")
+    assert not debouncer.accept("036000291452")
+    
+    # Out of view for the hold-off, then scanned again
+    now[0] += 2.0
+    assert debouncer.accept("036000291452") and debouncer.accept("012345678905")
+    print(f"accepted {debouncer.accepted}, suppressed {debouncer.suppressed}")
+    assert (debouncer.accepted, debouncer.suppressed) == (4, 10)
+    
+    # Expired entries are pruned once the cache grows
+    for i in range(70):
+        debouncer.accept(f"code{i}")
+        now[0] += 1.0
+    assert len(debouncer) <= 66
+    debouncer.reset()
+    assert len(debouncer) == 0
+    
+    print()
+    print("=" * 60)
+    print()
+
+
+def test_multi_digit_solver():
+    """Test the residue-based solver for several unknown digits."""
+    
+    print("=" * 60)
+    print("MULTI-DIGIT SOLVER - TEST")
+    print("=" * 60)
+    print()
+    
+    # Matches a brute-force search over all candidates, in ascending order
+    pattern = "?3600_29145?"
+    expected = []
+    for a in range(10):
+        for b in range(10):
+            for c in range(10):
+                candidate = f"{a}3600{b}29145{c}"
+                if validate_code(candidate).is_valid:
+                    expected.append(candidate)
+    assert list(iter_completions(pattern)) == expected
+    assert count_completions(pattern) == len(expected) == 100
+    print(f"{pattern}: {len(expected)} completions, first {expected[0]}")
+    
+    # Lazy enumeration with a cap, even over a huge solution space
+    assert count_completions("????????????") == 10 ** 11
+    first = solve_missing_digits("????????????", limit=3)
+    assert first == ["000000000000", "000000000017", "000000000024"]
+    
+    # Prefix filter fixes leading digits and rejects contradictions
+    assert solve_missing_digits("??????291452", prefix="036000") == ["036000291452"]
+    assert count_completions("??????291452", prefix="036000") == 1
+    assert solve_missing_digits("136000291452", prefix="036") == []
+    assert count_completions("03600029145?", prefix="1") == 0
+    
+    # Unknowns in check-weighted (3) and plain (1) positions, and no unknowns
+    assert UPCValidator("_36000291452").solve_missing_digit() == "036000291452"
+    assert UPCValidator("0?6000291452").solve_missing_digit() == "036000291452"
+    assert solve_missing_digits("036000291452") == ["036000291452"]
+    assert solve_missing_digits("036000291453") == []
+    
+    # Malformed patterns have no completions
+    assert solve_missing_digits("03600029145") == []
+    assert solve_missing_digits("0360002914a?") == []
+    assert UPCValidator("0360002914??").solve_missing_digit() is None
+    
+    print()
+    print("=" * 60)
+    print()
+
+
+def test_typo_corrections():
+    """Test substitution/transposition corrections, ranking and batch mode."""
+    
+    print("=" * 60)
+    print("TYPO CORRECTION - TEST")
+    print("=" * 60)
+    print()
+    
+    def brute_force(code):
+        found = set()
+        for i in range(12):
+            for digit in "0123456789":
+                candidate = code[:i] + digit + code[i + 1:]
+                if candidate != code and validate_code(candidate).is_valid:
+                    found.add(candidate)
+        for i in range(11):
+            candidate = code[:i] + code[i + 1] + code[i] + code[i + 2:]
+            if candidate != code and validate_code(candidate).is_valid:
+                found.add(candidate)
+        return found
+    
+    # Same candidates as revalidating every neighbour
+    for code in ["036000291425", "306000291452", "036000291453", "999999999990", "012345678901"]:
+        corrections = suggest_corrections(code)
+        assert {c.upc_code for c in corrections} == brute_force(code), code
+        assert sum(c.kind == 'substitution' for c in corrections) == 12
+        assert all(validate_code(c.upc_code).is_valid for c in corrections)
+    
+    # Transpositions rank before substitutions; known products before both
+    swapped = suggest_corrections("036000291425")
+    print(f"036000291425 -> {[c.upc_code for c in swapped[:3]]}")
+    assert swapped[0].kind == 'transposition'
+    ranked = suggest_corrections("036000291425", known={"036000291452"})
+    assert ranked[0] == ("036000291452", 'transposition', 10, True)
+    assert sum(c.known for c in ranked) == 1
+    
+    # Valid and malformed codes have no suggestions
+    assert suggest_corrections("036000291452") == []
+    assert suggest_corrections("03600029145") == suggest_corrections("03600029145a") == []
+    
+    # Batch mode: rejects only, input order, one known lookup per chunk
+    lookups = []
+    
+    def known(codes):
+        codes = set(codes)
+        lookups.append(len(codes))
+        return codes & {"036000291452"}
+    
+    feed = ["036000291425", "036000291452", "bad", "306000291452", "036000291425"]
+    results = list(iter_corrections(feed, known=known, chunk_size=2))
+    assert [code for code, _ in results] == ["036000291425", "306000291452", "036000291425"]
+    assert len(lookups) == 2
+    assert all(corrections[0].upc_code == "036000291452" and corrections[0].known
+               for _, corrections in results)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        store.add("036000291452", True)
+        store.add("036000291425", False)
+        assert store.known_codes(["036000291452", "036000291425", "x"]) == {"036000291452"}
+        
+        path = os.path.join(tmp, "corrections.csv")
+        assert write_corrections(feed, path, known=store.known_codes, max_suggestions=2) == 3
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))
+        store.close()
+    
+    assert rows[0] == ['UPC Code', 'Suggestion', 'Error', 'Position', 'Known']
+    assert len(rows) == 1 + 3 * 2
+    assert rows[1] == ['036000291425', '036000291452', 'transposition', '11', 'Yes']
+    
+    print()
+    print("=" * 60)
+    print()
+
+
+def test_gtin_engine():
+    """Test GTIN validation, normalization and UPC-E expansion/compression."""
+    
+    print("=" * 60)
+    print("GTIN ENGINE - TEST")
+    print("=" * 60)
+    print()
+    
+    # One check-digit routine for every length
+    assert gtin_check_digit("9638507") == "4"             # EAN-8
+    assert gtin_check_digit("03600029145") == "2"         # UPC-A
+    assert gtin_check_digit("400638133393") == "1"        # EAN-13
+    assert gtin_check_digit("1003600029145") == "9"       # GTIN-14
+    
+    for code, kind in [("96385074", "EAN-8"), ("036000291452", "UPC-A"),
+                       ("4006381333931", "EAN-13"), ("10036000291459", "GTIN-14")]:
+        result = validate_gtin(code)
+        print(f"{code:>14} -> {result.kind:8} {result.gtin14}")
+        assert result.is_valid and result.kind == kind and result.gtin14 == code.rjust(14, "0")
+    
+    assert validate_gtin("4006381333932").error == UPCError.CHECK_DIGIT
+    assert validate_gtin("12345").error == UPCError.LENGTH
+    assert validate_gtin("9638507a").error == UPCError.NON_DIGIT
+    assert "expected 1" in validate_gtin("4006381333932").error_message
+    
+    # Canonical GTIN-14 and the UPC-A inside it
+    assert to_gtin14("0036000291452") == to_gtin14("036000291452") == "00036000291452"
+    assert upca_from_gtin("00036000291452") == upca_from_gtin("0036000291452") == "036000291452"
+    assert upca_from_gtin("4006381333931") is None
+    assert upca_from_gtin("96385074") is None and upca_from_gtin("10036000291459") is None
+    try:
+        to_gtin14("4006381333932")
+        assert False, "invalid GTIN accepted"
+    except ValueError:
+        pass
+    
+    # UPC-E: one example per expansion rule, both directions
+    for upce, upca in [("04252614", "042100005264"), ("01234565", "012345000065"),
+                       ("01234531", "012300000451"), ("01234543", "012340000053"),
+                       ("11234540", "112340000050")]:
+        assert expand_upce(upce) == upca, upce
+        assert expand_upce(compress_upca(upca)) == upca
+    assert expand_upce("425261") == "042100005264"
+    assert compress_upca("036000291452") is None
+    for bad in ("04252615", "24252614", "0425"):
+        try:
+            expand_upce(bad)
+            assert False, f"accepted {bad}"
+        except ValueError:
+            pass
+    
+    # Scanner data: UPC-E and zero-padded EAN-13 become UPC-A, EAN-8 is kept
+    assert upc_from_detection(Detection("04252614", "UPCE", ())) == "042100005264"
+    assert upc_from_detection(Detection("96385074", "EAN8", ())) == "96385074"
+    
+    # Mixed feed in one pass, same answers as the single-code path
+    feed = ["96385074", "036000291452", "4006381333931", "10036000291459", "4006381333932",
+            "12345", "9638507a", " 036000291452 ", "", "123456789012345"]
+    valid, errors, gtin14s = validate_gtins(feed)
+    for code, ok, error, gtin14 in zip(feed, list(valid), list(errors), gtin14s):
+        result = validate_gtin(code)
+        assert (bool(ok), error, gtin14) == (result.is_valid, result.error, result.gtin14), code
+    assert sorted(GTIN_LENGTHS) == [8, 12, 13, 14]
+    
+    print()
+    print("=" * 60)
+    print()
+
+
 def main():
     """Run all tests."""
     print("\n" + "=" * 60)
@@ -148,11 +1378,34 @@ def main():
         test_upc_validation()
         test_missing_digit_solver()
         test_product_type_detection()
+        test_bulk_validation()
+        test_fast_path()
+        test_result_records()
+        test_streaming_file_validation()
+        test_parallel_file_validation()
+        test_fixed_width_reader()
+        test_batch_result_store()
+        test_history_store()
+        test_history_schema_and_paging()
+        test_history_csv_export()
+        test_history_pdf_report()
+        test_history_retention()
+        test_render_cache()
+        test_native_renderer()
+        test_batch_barcodes()
+        test_vector_output()
+        test_frame_decoder()
+        test_scanner_pipeline()
+        test_offline_decoding()
+        test_scan_debouncer()
+        test_multi_digit_solver()
+        test_typo_corrections()
+        test_gtin_engine()
         
         print("\n✓ All tests completed!")
         print("\nTo launch the full GUI application, run:")
         print("  python upc_validator_app.py\n")
-        
+    
     except Exception as e:
         print(f"\n✗ Error during testing: {e}")
         import traceback
@@ -0,0 +1,820 @@
+"""
+UPC Validator Barcode Module
+Barcode image rendering without GUI dependencies
+UPC-A symbols are painted directly from the upc_core bar pattern;
+python-barcode is only needed for the optional legacy backend
+SVG/vector PDF output is assembled from precomputed per-digit bar templates
+Rendered images are kept in a bounded LRU cache so repeated previews and
+re-prints of the same UPC don't re-render; bulk label runs are rendered
+across a process pool and tiled into multi-up sheets
+"""
+
+import importlib.util
+import io
+import os
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from upc_core import (
+    UPC_CENTER_GUARD, UPC_END_GUARD, UPC_LEFT_PATTERNS, UPC_MODULES, UPC_RIGHT_PATTERNS,
+    encode_upca, iter_validate_file, validate_code, validate_records
+)
+
+# Optional imports with error handling
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# python-barcode is imported lazily by the 'python-barcode' backend only
+BARCODE_AVAILABLE = importlib.util.find_spec('barcode') is not None
+
+try:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+# Default render options (python-barcode ImageWriter units: mm, font size in points)
+DEFAULT_RENDER_OPTIONS = {
+    'module_width': 0.3,
+    'module_height': 10.0,
+    'quiet_zone': 6.5,
+    'font_size': 8,
+    'text_distance': 3,
+}
+
+# Resolution used to convert millimetres to pixels
+DEFAULT_DPI = 300
+
+# Pixel values for bar ('1') and space ('0') modules in grayscale images
+_BAR, _SPACE = b'\x00', b'\xff'
+
+# Barcode renderers accepted by BarcodeGenerator
+BARCODE_BACKENDS = ('native', 'python-barcode')
+
+# Upper bound for cached image data (decoded pixel bytes)
+DEFAULT_CACHE_BYTES = 64 << 20
+
+# Barcodes rendered per worker task in batch generation
+BATCH_CHUNK_SIZE = 64
+
+# Multi-up label sheets: labels per row/column and spacing in pixels
+DEFAULT_SHEET_COLUMNS = 3
+DEFAULT_SHEET_ROWS = 10
+SHEET_MARGIN = 40
+SHEET_GAP = 20
+
+# generate_batch() output formats; vector formats are written by write_vector_sheet()
+VECTOR_FORMATS = ('sheet-svg', 'vector-pdf')
+BATCH_FORMATS = ('png', 'sheet-png', 'sheet-pdf') + VECTOR_FORMATS
+
+# Buffer size for streamed vector sheets
+EXPORT_BUFFER_SIZE = 1 << 20
+
+# reportlab keeps every page of a document in memory until save(), so PDF
+# output starts a new file after this many pages (about 10 MB of sheets)
+PDF_PAGES_PER_FILE = 100
+
+# Vector label layout in millimetres
+LABEL_MARGIN_MM = 1.0
+VECTOR_SHEET_MARGIN_MM = 10.0
+VECTOR_SHEET_GAP_MM = 4.0
+
+
+class RenderCache:
+    """
+    Thread-safe LRU cache bounded by the total size of its values.
+    put() takes each value's size in bytes; least recently used entries are
+    evicted until the total fits max_bytes. Values larger than max_bytes
+    are not cached at all.
+    """
+    
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()    # key -> (value, size)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        """Return the cached value (marking it recently used) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key, value, size):
+        """Cache value under key, evicting least recently used entries as needed."""
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hit_rate,
+            }
+
+
+def _mm_to_px(mm, dpi):
+    return mm * dpi / 25.4
+
+
+@lru_cache(maxsize=16)
+def _text_font(size_px):
+    """Load a monospaced font at size_px, falling back to Pillow's built-in font."""
+    try:
+        return ImageFont.truetype('DejaVuSansMono.ttf', size_px)
+    except OSError:
+        try:
+            return ImageFont.load_default(size_px)
+        except TypeError:
+            # Pillow < 10.1 only has the fixed-size bitmap font
+            return ImageFont.load_default()
+
+
+def render_upca(upc_code, module_width=0.3, module_height=10.0, quiet_zone=6.5, font_size=8,
+                text_distance=3, dpi=DEFAULT_DPI, write_text=True):
+    """
+    Paint a UPC-A barcode straight into a grayscale ('L') PIL image.
+    
+    Takes the same options as python-barcode's ImageWriter (millimetres,
+    font size in points). The 95-module pattern comes from
+    upc_core.encode_upca(); modules are rounded to whole pixels so bars stay
+    crisp, and the bar area is one pixel row repeated for its height, so
+    there is no per-module drawing and no PNG encode/decode round-trip.
+    Raises ValueError for invalid UPCs.
+    """
+    pattern = encode_upca(upc_code)
+    module_px = max(1, round(_mm_to_px(module_width, dpi)))
+    quiet_px = round(_mm_to_px(quiet_zone, dpi))
+    bar_px = max(1, round(_mm_to_px(module_height, dpi)))
+    margin_px = round(_mm_to_px(1, dpi))
+    
+    row = b''.join((_BAR if module == '1' else _SPACE) * module_px for module in pattern)
+    row = _SPACE * quiet_px + row + _SPACE * quiet_px
+    width = len(row)
+    
+    if not write_text:
+        return Image.frombytes('L', (width, bar_px + 2 * margin_px), _SPACE * (width * margin_px)
+                               + row * bar_px + _SPACE * (width * margin_px))
+    
+    font = _text_font(max(1, round(font_size * dpi / 72)))
+    left, top, right, bottom = font.getbbox(upc_code)
+    text_y = margin_px + bar_px + round(_mm_to_px(text_distance, dpi) / 2)
+    height = text_y + bottom + margin_px
+    
+    image = Image.frombytes('L', (width, height), _SPACE * (width * margin_px) + row * bar_px
+                            + _SPACE * (width * (height - margin_px - bar_px)))
+    ImageDraw.Draw(image).text(((width - (right - left)) // 2 - left, text_y), upc_code, fill=0, font=font)
+    return image
+
+
+def _bar_runs(pattern, offset):
+    """Return the (x, width) module runs of the bars in a '1'/'0' pattern starting at offset."""
+    runs = []
+    start = None
+    for i, module in enumerate(pattern + '0'):
+        if module == '1' and start is None:
+            start = i
+        elif module == '0' and start is not None:
+            runs.append((offset + start, i - start))
+            start = None
+    return tuple(runs)
+
+
+def _digit_offset(position):
+    """Module offset of the digit at position 0-11 (after the end and center guards)."""
+    if position < 6:
+        return len(UPC_END_GUARD) + 7 * position
+    return len(UPC_END_GUARD) + len(UPC_CENTER_GUARD) + 7 * position
+
+
+# Bar templates in module units: guard runs and, per digit position, the
+# runs for each digit value. Every symbol is a concatenation of these.
+_GUARD_RUNS = (
+    _bar_runs(UPC_END_GUARD, 0)
+    + _bar_runs(UPC_CENTER_GUARD, len(UPC_END_GUARD) + 42)
+    + _bar_runs(UPC_END_GUARD, UPC_MODULES - len(UPC_END_GUARD))
+)
+_DIGIT_RUNS = tuple(
+    tuple(_bar_runs(patterns[digit], _digit_offset(position)) for digit in range(10))
+    for position, patterns in enumerate((UPC_LEFT_PATTERNS,) * 6 + (UPC_RIGHT_PATTERNS,) * 6)
+)
+
+
+def _svg_fragment(runs):
+    """SVG path data for bar runs: unit-height rectangles in module units."""
+    return ''.join(f'M{x} 0h{width}v1h-{width}z' for x, width in runs)
+
+
+# The same templates as precomputed SVG path fragments
+_GUARD_PATH = _svg_fragment(_GUARD_RUNS)
+_DIGIT_PATHS = tuple(tuple(_svg_fragment(runs) for runs in position) for position in _DIGIT_RUNS)
+
+
+def _checked_digits(upc_code):
+    """Return the digits of a valid UPC, raising ValueError otherwise."""
+    result = validate_code(upc_code)
+    if not result.is_valid:
+        raise ValueError(result.error_message)
+    return result.upc_code
+
+
+def upca_bar_runs(upc_code):
+    """Return the (x, width) bar runs of a UPC-A symbol in module units."""
+    digits = _checked_digits(upc_code)
+    runs = list(_GUARD_RUNS)
+    for position, digit in enumerate(digits):
+        runs.extend(_DIGIT_RUNS[position][ord(digit) - 48])
+    return runs
+
+
+def upca_svg_path(upc_code):
+    """
+    Return SVG path data for a UPC-A symbol in module units (bars one unit tall).
+    Scale it with a transform to the module width and bar height.
+    """
+    digits = _checked_digits(upc_code)
+    return _GUARD_PATH + ''.join(
+        _DIGIT_PATHS[position][ord(digit) - 48] for position, digit in enumerate(digits)
+    )
+
+
+def _vector_options(module_width=0.3, module_height=10.0, quiet_zone=6.5, font_size=8,
+                    text_distance=3, dpi=DEFAULT_DPI, write_text=True):
+    """
+    Resolve render options into the vector label layout in millimetres:
+    (module_width, module_height, quiet_zone, font_mm, text_baseline, label_width, label_height).
+    dpi is accepted for compatibility and ignored.
+    """
+    font_mm = font_size * 25.4 / 72 if write_text else 0.0
+    baseline = LABEL_MARGIN_MM + module_height + (text_distance / 2 + font_mm if write_text else 0.0)
+    width = UPC_MODULES * module_width + 2 * quiet_zone
+    return (module_width, module_height, quiet_zone, font_mm, baseline, width, baseline + LABEL_MARGIN_MM)
+
+
+def _svg_label(upc_code, layout, x=0.0, y=0.0):
+    """One barcode as an SVG group at (x, y) millimetres."""
+    module_width, module_height, quiet_zone, font_mm, baseline, width, _ = layout
+    parts = [
+        f'<g transform="translate({x:.3f} {y:.3f})">',
+        f'<path transform="translate({quiet_zone} {LABEL_MARGIN_MM}) scale({module_width} {module_height})" '
+        f'd="{upca_svg_path(upc_code)}"/>',
+    ]
+    if font_mm:
+        parts.append(
+            f'<text x="{width / 2:.3f}" y="{baseline:.3f}" font-size="{font_mm:.3f}" '
+            f'text-anchor="middle">{escape(upc_code)}</text>'
+        )
+    parts.append('</g>')
+    return ''.join(parts)
+
+
+def _svg_header(width, height):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.3f}mm" height="{height:.3f}mm" '
+        f'viewBox="0 0 {width:.3f} {height:.3f}">\n'
+        f'<rect width="{width:.3f}" height="{height:.3f}" fill="white"/>\n'
+        '<g fill="black" font-family="DejaVu Sans Mono, monospace">\n'
+    )
+
+
+def render_upca_svg(upc_code, **options):
+    """
+    Return a standalone SVG document for a UPC-A barcode.
+    Takes the same options as render_upca(); sizes are in millimetres.
+    Raises ValueError for invalid UPCs.
+    """
+    layout = _vector_options(**dict(DEFAULT_RENDER_OPTIONS, **options))
+    return _svg_header(layout[5], layout[6]) + _svg_label(upc_code, layout) + '\n</g>\n</svg>\n'
+
+
+def _image_nbytes(image):
+    """Approximate decoded size of a PIL image in bytes."""
+    return image.width * image.height * len(image.getbands())
+
+
+class BarcodeGenerator:
+    """
+    Generate barcode images for valid UPC codes.
+    The default 'native' backend paints UPC-A symbols with render_upca();
+    the 'python-barcode' backend uses python-barcode's ImageWriter instead.
+    
+    Rendered images are cached by (UPC, render options). Cached images are
+    shared between callers, so copy() one before modifying it in place.
+    """
+    
+    def __init__(self, cache_bytes=DEFAULT_CACHE_BYTES, backend='native'):
+        if backend not in BARCODE_BACKENDS:
+            raise ValueError(f"Unknown barcode backend: {backend!r}")
+        self.backend = backend
+        self.last_image = None
+        self.cache = RenderCache(cache_bytes)
+    
+    @property
+    def available(self):
+        """Whether the dependencies for this generator's backend are installed."""
+        return PIL_AVAILABLE and (self.backend == 'native' or BARCODE_AVAILABLE)
+    
+    def render(self, upc_code, **options):
+        """
+        Render a UPC-A barcode, bypassing the cache.
+        Options override DEFAULT_RENDER_OPTIONS. Returns a loaded PIL Image.
+        """
+        render_options = dict(DEFAULT_RENDER_OPTIONS, **options)
+        if self.backend == 'native':
+            return render_upca(upc_code, **render_options)
+        
+        import barcode
+        from barcode.writer import ImageWriter
+        
+        # Create UPC-A barcode
+        upc_class = barcode.get_barcode_class('upca')
+        
+        # UPC-A expects 11 digits (adds check digit automatically)
+        # But our UPC already has check digit, so we use it as-is
+        upc_instance = upc_class(upc_code[:-1], writer=ImageWriter())
+        
+        # Generate to buffer
+        buffer = io.BytesIO()
+        upc_instance.write(buffer, options=render_options)
+        
+        # Load image from buffer (decoded now so the buffer can be released)
+        buffer.seek(0)
+        image = Image.open(buffer)
+        image.load()
+        return image
+    
+    def get_image(self, upc_code, **options):
+        """Return the cached image for (upc_code, options), rendering it on a miss."""
+        key = (upc_code, tuple(sorted(options.items())))
+        image = self.cache.get(key)
+        if image is None:
+            image = self.render(upc_code, **options)
+            self.cache.put(key, image, _image_nbytes(image))
+        return image
+    
+    def generate_svg(self, upc_code, output_path=None, **options):
+        """
+        Generate an SVG document for a UPC code (cached like raster images).
+        Returns the SVG text. Raises ValueError for invalid UPCs.
+        """
+        key = (upc_code, 'svg', tuple(sorted(options.items())))
+        svg = self.cache.get(key)
+        if svg is None:
+            svg = render_upca_svg(upc_code, **options)
+            self.cache.put(key, svg, len(svg))
+        
+        if output_path:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(svg)
+        return svg
+    
+    def generate(self, upc_code, output_path=None, **options):
+        """
+        Generate barcode image for UPC code.
+        Returns PIL Image object or None if generation fails.
+        """
+        if not self.available:
+            return None
+        
+        try:
+            image = self.get_image(upc_code, **options)
+            self.last_image = image
+            
+            # Save to file if path provided
+            if output_path:
+                image.save(output_path)
+            
+            return image
+        
+        except Exception as e:
+            print(f"Error generating barcode: {e}")
+            return None
+
+
+class BatchBarcodeReport(namedtuple('BatchBarcodeReport', ['rendered', 'failures', 'files', 'elapsed'])):
+    """
+    Outcome of generate_batch().
+    failures holds (upc, reason) pairs for codes that failed validation or
+    rendering; files lists the PNG/PDF files written.
+    """
+    
+    __slots__ = ()
+    
+    @property
+    def throughput(self):
+        """Barcodes rendered per second."""
+        return self.rendered / self.elapsed if self.elapsed else 0.0
+
+
+class _PDFParts:
+    """
+    Letter-size reportlab canvases that roll over to a new file every
+    pages_per_file pages: path, then <stem>_0002.pdf, <stem>_0003.pdf, ...
+    Only the current file's pages are held in memory.
+    """
+    
+    def __init__(self, path, pages_per_file=PDF_PAGES_PER_FILE):
+        self.path = path
+        self.pages_per_file = pages_per_file
+        self.files = []
+        self._canvas = None
+        self._pages = 0
+    
+    def page(self):
+        """Return the canvas for the current page, starting a new file if needed."""
+        if self._canvas is None:
+            path = self.path
+            if self.files:
+                stem, ext = os.path.splitext(self.path)
+                path = f'{stem}_{len(self.files) + 1:04d}{ext}'
+            self._canvas = canvas.Canvas(path, pagesize=letter, pageCompression=1)
+            self.files.append(path)
+        return self._canvas
+    
+    def end_page(self):
+        """Finish the current page, saving the file once it is full."""
+        self._canvas.showPage()
+        self._pages += 1
+        if self._pages == self.pages_per_file:
+            self.close()
+    
+    def close(self):
+        """Save the current file (including an unfinished page). Returns the files written."""
+        if self._canvas is not None:
+            self._canvas.save()
+            self._canvas = None
+            self._pages = 0
+        return self.files
+
+
+class LabelSheetWriter:
+    """
+    Tile barcode images onto multi-up label sheets.
+    Each sheet is written as soon as it fills (sheet_0001.png, ... in a
+    directory, or one page of a PDF). reportlab holds a PDF's pages until it
+    is saved, so PDF output is split into files of pages_per_file sheets.
+    """
+    
+    def __init__(self, output, output_format='sheet-png', columns=DEFAULT_SHEET_COLUMNS,
+                 rows=DEFAULT_SHEET_ROWS, pages_per_file=PDF_PAGES_PER_FILE):
+        if output_format == 'sheet-pdf' and not PDF_AVAILABLE:
+            raise RuntimeError("PDF sheets require reportlab (pip install reportlab)")
+        
+        self.output = output
+        self.output_format = output_format
+        self.columns = columns
+        self.rows = rows
+        self.files = []
+        self._sheet = None
+        self._count = 0
+        self._cell = None
+        self._pdf = None
+        
+        if output_format == 'sheet-pdf':
+            self._pdf = _PDFParts(output, pages_per_file)
+            self.files = self._pdf.files
+        else:
+            os.makedirs(output, exist_ok=True)
+    
+    def add(self, image):
+        """Place one label on the current sheet, writing the sheet when full."""
+        if self._cell is None:
+            self._cell = image.size
+        cell_width, cell_height = self._cell
+        
+        if self._sheet is None:
+            self._sheet = Image.new(image.mode, (
+                2 * SHEET_MARGIN + self.columns * cell_width + (self.columns - 1) * SHEET_GAP,
+                2 * SHEET_MARGIN + self.rows * cell_height + (self.rows - 1) * SHEET_GAP,
+            ), 'white')
+        
+        row, column = divmod(self._count, self.columns)
+        self._sheet.paste(image, (
+            SHEET_MARGIN + column * (cell_width + SHEET_GAP),
+            SHEET_MARGIN + row * (cell_height + SHEET_GAP),
+        ))
+        self._count += 1
+        if self._count == self.columns * self.rows:
+            self._write_sheet()
+    
+    def _write_sheet(self):
+        sheet, self._sheet = self._sheet, None
+        self._count = 0
+        
+        if self._pdf is None:
+            path = os.path.join(self.output, f'sheet_{len(self.files) + 1:04d}.png')
+            sheet.save(path)
+            self.files.append(path)
+            return
+        
+        # Scale the sheet to fit the page inside half-inch margins
+        page_width, page_height = letter
+        scale = min((page_width - inch) / sheet.width, (page_height - inch) / sheet.height)
+        width, height = sheet.width * scale, sheet.height * scale
+        self._pdf.page().drawImage(
+            ImageReader(sheet), (page_width - width) / 2, page_height - 0.5*inch - height,
+            width, height
+        )
+        self._pdf.end_page()
+    
+    def close(self):
+        """Write the last partial sheet and finish the PDF. Returns the files written."""
+        if self._sheet is not None:
+            self._write_sheet()
+        if self._pdf is not None:
+            self._pdf.close()
+        return self.files
+
+
+# Per-process generator so each worker keeps its own render cache
+_worker_generator = None
+
+
+def _render_chunk(codes, options, output_dir):
+    """
+    Worker: render a chunk of barcodes (runs in a child process).
+    With output_dir each image is saved there as <upc>.png; otherwise raw
+    (mode, size, pixels) tuples are returned, which are much cheaper to
+    pickle than re-encoded PNGs. Returns (upc, image data, error) tuples.
+    """
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = BarcodeGenerator()
+    
+    rendered = []
+    for upc in codes:
+        try:
+            image = _worker_generator.get_image(upc, **options)
+            if output_dir:
+                image.save(os.path.join(output_dir, f'{upc}.png'))
+                rendered.append((upc, None, None))
+            else:
+                rendered.append((upc, (image.mode, image.size, image.tobytes()), None))
+        except Exception as e:
+            rendered.append((upc, None, str(e) or type(e).__name__))
+    return rendered
+
+
+def _iter_rendered_chunks(chunks, options, output_dir, workers):
+    """Yield _render_chunk() results in order with at most 2 * workers chunks in flight."""
+    if workers == 1:
+        for chunk in chunks:
+            yield _render_chunk(chunk, options, output_dir)
+        return
+    
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(_render_chunk, chunk, options, output_dir))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Abandoned iteration (e.g. cancel): drop queued chunks before shutdown
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _split_valid(codes):
+    """
+    Validate codes (an iterable or the path of a CSV/text file).
+    Returns (valid codes, [(upc, reason), ...] failures).
+    """
+    if isinstance(codes, (str, os.PathLike)):
+        results = [result for block in iter_validate_file(codes) for result in block]
+    else:
+        results = validate_records(codes)
+    
+    failures = [(result.upc_code, result.error_message) for result in results if not result.is_valid]
+    return [result.upc_code for result in results if result.is_valid], failures
+
+
+def generate_batch(codes, output, output_format='png', workers=None, columns=DEFAULT_SHEET_COLUMNS,
+                   rows=DEFAULT_SHEET_ROWS, chunk_size=BATCH_CHUNK_SIZE, progress=None,
+                   cancel_event=None, pages_per_file=PDF_PAGES_PER_FILE, **options):
+    """
+    Render barcodes for many UPCs across a pool of worker processes.
+    
+    codes is an iterable of UPC strings or the path of a CSV/text file (read
+    like batch validation). Every code is validated with upc_core first and
+    invalid ones are reported as failures without rendering. output_format:
+        'png'        one <upc>.png per code in the output directory
+        'sheet-png'  columns x rows label sheets as sheet_0001.png, ... in output
+        'sheet-pdf'  the same sheets as PDF pages at output
+        'sheet-svg'  one vector SVG sheet at output (see write_vector_sheet)
+        'vector-pdf' vector label pages as a PDF at output
+    PDFs are split into files of pages_per_file pages (output, then
+    <stem>_0002.pdf, ...), since reportlab holds a file's pages until saved.
+    Codes are rendered in chunks of chunk_size, in order, with at most
+    2 * workers chunks in flight; workers=1 renders in this process.
+    Render options are passed to BarcodeGenerator. progress(done, total)
+    is called after each chunk and cancel_event stops early.
+    Returns a BatchBarcodeReport (covering what was written if cancelled).
+    """
+    if output_format in VECTOR_FORMATS:
+        return write_vector_sheet(codes, output, 'pdf' if output_format == 'vector-pdf' else 'svg',
+                                  columns=columns, rows=rows, progress=progress,
+                                  cancel_event=cancel_event, pages_per_file=pages_per_file,
+                                  **options)
+    if not PIL_AVAILABLE:
+        raise RuntimeError("Barcode generation requires Pillow (pip install pillow)")
+    if output_format not in BATCH_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format!r}")
+    
+    started = time.perf_counter()
+    valid_codes, failures = _split_valid(codes)
+    chunks = [valid_codes[i:i + chunk_size] for i in range(0, len(valid_codes), chunk_size)]
+    
+    if output_format == 'png':
+        os.makedirs(output, exist_ok=True)
+        sheets = None
+    else:
+        sheets = LabelSheetWriter(output, output_format, columns, rows, pages_per_file)
+    
+    workers = workers or os.cpu_count() or 1
+    rendered = 0
+    files = []
+    done = 0
+    chunk_results = _iter_rendered_chunks(chunks, options, output if sheets is None else None, workers)
+    try:
+        for chunk in chunk_results:
+            for upc, data, error in chunk:
+                if error is not None:
+                    failures.append((upc, error))
+                    continue
+                rendered += 1
+                if sheets is None:
+                    files.append(os.path.join(output, f'{upc}.png'))
+                else:
+                    mode, size, pixels = data
+                    sheets.add(Image.frombytes(mode, size, pixels))
+            
+            done += len(chunk)
+            if progress:
+                progress(done, len(valid_codes))
+            if cancel_event is not None and cancel_event.is_set():
+                break
+    finally:
+        chunk_results.close()
+        if sheets is not None:
+            files = sheets.close()
+    
+    return BatchBarcodeReport(rendered, failures, files, time.perf_counter() - started)
+
+
+def write_vector_sheet(codes, path, output_format='svg', columns=DEFAULT_SHEET_COLUMNS,
+                       rows=DEFAULT_SHEET_ROWS, progress=None, cancel_event=None,
+                       progress_every=1000, pages_per_file=PDF_PAGES_PER_FILE, **options):
+    """
+    Stream many barcodes into one vector label sheet.
+    
+    Each symbol is the concatenation of the precomputed guard and per-digit
+    bar templates, so no raster work is done. 'svg' writes a single SVG
+    with the labels in a grid of the given number of columns; 'pdf' writes
+    columns x rows labels per letter page with reportlab, drawing the bar
+    runs as filled rectangles. SVG labels are written as they are produced;
+    reportlab holds a PDF's pages until it is saved, so PDFs are split into
+    files of pages_per_file pages (path, then <stem>_0002.pdf, ...).
+    Codes and options are as for generate_batch(). progress(done, total)
+    is called every progress_every labels and cancel_event stops early.
+    Returns a BatchBarcodeReport.
+    """
+    if output_format == 'pdf' and not PDF_AVAILABLE:
+        raise RuntimeError("PDF sheets require reportlab (pip install reportlab)")
+    if output_format not in ('svg', 'pdf'):
+        raise ValueError(f"Unknown vector format: {output_format!r}")
+    
+    started = time.perf_counter()
+    valid_codes, failures = _split_valid(codes)
+    layout = _vector_options(**dict(DEFAULT_RENDER_OPTIONS, **options))
+    label_width, label_height = layout[5], layout[6]
+    pitch_x = label_width + VECTOR_SHEET_GAP_MM
+    pitch_y = label_height + VECTOR_SHEET_GAP_MM
+    
+    if output_format == 'svg':
+        sheet_rows = -(-len(valid_codes) // columns) or 1
+        sheet_width = 2 * VECTOR_SHEET_MARGIN_MM + columns * pitch_x - VECTOR_SHEET_GAP_MM
+        sheet_height = 2 * VECTOR_SHEET_MARGIN_MM + sheet_rows * pitch_y - VECTOR_SHEET_GAP_MM
+        out = open(path, 'w', encoding='utf-8', buffering=EXPORT_BUFFER_SIZE)
+        out.write(_svg_header(sheet_width, sheet_height))
+        
+        def draw(index, upc):
+            row, column = divmod(index, columns)
+            out.write(_svg_label(
+                upc, layout,
+                VECTOR_SHEET_MARGIN_MM + column * pitch_x,
+                VECTOR_SHEET_MARGIN_MM + row * pitch_y,
+            ))
+            out.write('\n')
+        
+        def finish():
+            out.write('</g>\n</svg>\n')
+            out.close()
+    else:
+        pdf = _PDFParts(path, pages_per_file)
+        page_height = letter[1]
+        points = 72 / 25.4
+        module_width, module_height, quiet_zone, font_mm, baseline = layout[:5]
+        
+        def draw(index, upc):
+            slot = index % (columns * rows)
+            c = pdf.page()
+            row, column = divmod(slot, columns)
+            # PDF y grows upwards: place the label's top edge, then work in mm
+            c.saveState()
+            c.translate(
+                (VECTOR_SHEET_MARGIN_MM + column * pitch_x) * points,
+                page_height - (VECTOR_SHEET_MARGIN_MM + row * pitch_y) * points,
+            )
+            c.scale(points, -points)
+            
+            bars = c.beginPath()
+            for x, width in upca_bar_runs(upc):
+                bars.rect(quiet_zone + x * module_width, LABEL_MARGIN_MM, width * module_width, module_height)
+            c.drawPath(bars, stroke=0, fill=1)
+            
+            if font_mm:
+                # Flip back so the text isn't mirrored
+                c.translate(label_width / 2, baseline)
+                c.scale(1, -1)
+                c.setFont('Courier', font_mm)
+                c.drawCentredString(0, 0, upc)
+            c.restoreState()
+            if slot == columns * rows - 1:
+                pdf.end_page()
+        
+        def finish():
+            pdf.close()
+    
+    drawn = 0
+    try:
+        for upc in valid_codes:
+            draw(drawn, upc)
+            drawn += 1
+            if drawn % progress_every == 0:
+                if progress:
+                    progress(drawn, len(valid_codes))
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+        if progress:
+            progress(drawn, len(valid_codes))
+    finally:
+        finish()
+    
+    files = [path] if output_format == 'svg' else pdf.files
+    return BatchBarcodeReport(drawn, failures, files, time.perf_counter() - started)
@@ -4,6 +4,102 @@ Pure Python UPC validation logic without GUI dependencies
 Can be used standalone or imported by the main application
 """
 
+import codecs
+import csv
+import itertools
+import mmap
+import os
+import weakref
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from enum import IntEnum
+
+# Optional NumPy acceleration for bulk validation
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class UPCError(IntEnum):
+    """Compact error codes returned by the bulk validation API."""
+    OK = 0
+    LENGTH = 1
+    NON_DIGIT = 2
+    CHECK_DIGIT = 3
+
+
+# Check-digit weights for positions 1-12 (3, 1, 3, 1, ...)
+UPC_WEIGHTS = (3, 1) * 6
+
+# Placeholders for unknown digits in solver patterns
+MISSING_DIGIT_CHARS = '?_'
+
+# Multiplicative inverses of the weights mod 10 (3 * 7 = 21 ≡ 1), so an
+# unknown digit follows directly from the residue it has to supply
+_WEIGHT_INVERSES = {1: 1, 3: 7}
+_UNKNOWN_AS_ZERO = str.maketrans(dict.fromkeys(MISSING_DIGIT_CHARS, '0'))
+
+# Keying errors the correction engine undoes, in ranking order: a transposition
+# fits only some codes, so a match is stronger evidence than a substitution
+CORRECTION_KINDS = ('transposition', 'substitution')
+
+# Rejects per known-products lookup when correcting a feed in batch
+DEFAULT_CORRECTION_CHUNK_SIZE = 4096
+
+# Weighted sum contributed by the ASCII offset of '0' (48) in all 12 positions,
+# so raw byte values can be summed without converting each digit
+_ASCII_RESIDUE = (48 * sum(UPC_WEIGHTS)) % 10
+
+if NUMPY_AVAILABLE:
+    _UPC_WEIGHTS_NP = np.array(UPC_WEIGHTS, dtype=np.int32)
+
+# Bytes read per block when streaming files (lines are never split across blocks)
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Byte range handed to each worker process in parallel mode
+DEFAULT_PARALLEL_CHUNK_SIZE = 8 << 20
+
+# Shared enum members indexed by error code, for building results from arrays
+_ERRORS = tuple(UPCError)
+
+# UPC-A symbol: 7-module digit patterns ('1' = bar); right-hand digits are
+# the complement of the left-hand ones
+UPC_LEFT_PATTERNS = (
+    '0001101', '0011001', '0010011', '0111101', '0100011',
+    '0110001', '0101111', '0111011', '0110111', '0001011',
+)
+UPC_RIGHT_PATTERNS = tuple(pattern.translate(str.maketrans('01', '10')) for pattern in UPC_LEFT_PATTERNS)
+UPC_END_GUARD = '101'
+UPC_CENTER_GUARD = '01010'
+
+# Modules in a UPC-A symbol: 2 end guards, center guard, 12 digits
+UPC_MODULES = 2 * len(UPC_END_GUARD) + len(UPC_CENTER_GUARD) + 12 * 7
+
+
+def _classify_invalid(code):
+    """Return the UPCError explaining why a code failed the fast path."""
+    if len(code) != 12:
+        return UPCError.LENGTH
+    if not (code.isascii() and code.isdigit()):
+        return UPCError.NON_DIGIT
+    return UPCError.CHECK_DIGIT
+
+
+def _error_message(code, error):
+    """Format the human-readable message for a UPCError."""
+    if error == UPCError.LENGTH:
+        return f"UPC must be exactly 12 digits (got {len(code)})"
+    if error == UPCError.NON_DIGIT:
+        return "UPC must contain only digits"
+    if error == UPCError.CHECK_DIGIT:
+        total = sum(int(digit) * weight for digit, weight in zip(code, UPC_WEIGHTS))
+        return f"Invalid check digit (sum = {total}, should be divisible by 10)"
+    return ""
+
+
 class UPCValidator:
     """
     Core UPC validation and decoding logic.
@@ -33,41 +129,44 @@ class UPCValidator:
         self.manufacturer_code = ""
         self.product_code = ""
         self.check_digit = ""
+    
+    @staticmethod
+    def is_valid_fast(code):
+        """
+        Return True if code is a valid 12-digit UPC, without building a
+        validator instance or an error message.
+        Accepts str or bytes; the caller is responsible for stripping.
+        """
+        if code.__class__ is str:
+            if not code.isascii():
+                return False
+            code = code.encode()
         
+        if len(code) != 12 or not code.isdigit():
+            return False
+        
+        # Sum raw byte values, then remove the ASCII '0' offset via its residue
+        return (3 * sum(code[0::2]) + sum(code[1::2])) % 10 == _ASCII_RESIDUE
+    
     def validate(self):
         """
         Validate UPC code using check-digit formula:
         3*a1 + a2 + 3*a3 + a4 + 3*a5 + a6 + 3*a7 + a8 + 3*a9 + a10 + 3*a11 + a12 ≡ 0 (mod 10)
         """
-        # Check if UPC has exactly 12 digits
-        if len(self.upc_code) != 12:
-            self.error_message = f"UPC must be exactly 12 digits (got {len(self.upc_code)})"
-            return False
-        
-        # Check if all characters are digits
-        if not self.upc_code.isdigit():
-            self.error_message = "UPC must contain only digits"
-            return False
-        
-        # Calculate check digit
-        total = 0
-        for i, digit in enumerate(self.upc_code):
-            digit_val = int(digit)
-            # Positions 0, 2, 4, 6, 8, 10 get multiplied by 3
-            if i % 2 == 0:
-                total += digit_val * 3
-            else:
-                total += digit_val
+        # Fast path: valid codes need no diagnostics
+        if self.is_valid_fast(self.upc_code):
+            self.is_valid = True
+            self.decode()
+            return True
         
-        # Check if total is divisible by 10
-        if total % 10 != 0:
-            self.error_message = f"Invalid check digit (sum = {total}, should be divisible by 10)"
-            return False
-        
-        # UPC is valid
-        self.is_valid = True
-        self.decode()
-        return True
+        # Wrong length, non-digit characters or a bad check digit
+        error = _classify_invalid(self.upc_code)
+        self.error_message = _error_message(self.upc_code, error)
+        return False
+    
+    def to_result(self):
+        """Validate and return the outcome as a compact UPCResult."""
+        return validate_code(self.upc_code)
     
     def decode(self):
         """Decode UPC components."""
@@ -84,26 +183,900 @@ class UPCValidator:
         Returns the complete UPC if solvable, None otherwise.
         """
         # Count missing digits
-        missing_count = self.upc_code.count('?') + self.upc_code.count('_')
+        missing_count = sum(self.upc_code.count(char) for char in MISSING_DIGIT_CHARS)
         
         if missing_count != 1:
             return None
         
-        # Find position of missing digit
-        missing_pos = -1
-        for i, char in enumerate(self.upc_code):
-            if char in ['?', '_']:
-                missing_pos = i
-                break
+        # The digit is computed from the known digits' residue, not searched for
+        return next(iter_completions(self.upc_code), None)
+
+
+class UPCResult(namedtuple('UPCResult', ['upc_code', 'is_valid', 'error'])):
+    """
+    Immutable, compact result of validating one UPC code.
+    Stores only the code, its validity and a UPCError; decoded fields are
+    derived from fixed offsets into upc_code on access instead of being
+    copied into every record.
+    """
+    
+    __slots__ = ()
+    
+    # Offsets of the decoded components within a 12-digit UPC
+    MANUFACTURER_SLICE = slice(1, 6)   # Digits 2-6
+    PRODUCT_SLICE = slice(6, 11)       # Digits 7-11
+    CHECK_DIGIT_INDEX = 11             # Digit 12
+    
+    @property
+    def product_type(self):
+        """Shared description string from PRODUCT_TYPES (never copied)."""
+        if not self.is_valid:
+            return ''
+        return UPCValidator.PRODUCT_TYPES.get(self.upc_code[0], 'Unknown')
+    
+    @property
+    def manufacturer_code(self):
+        return self.upc_code[self.MANUFACTURER_SLICE] if self.is_valid else ''
+    
+    @property
+    def product_code(self):
+        return self.upc_code[self.PRODUCT_SLICE] if self.is_valid else ''
+    
+    @property
+    def check_digit(self):
+        return self.upc_code[self.CHECK_DIGIT_INDEX] if self.is_valid else ''
+    
+    @property
+    def error_message(self):
+        return _error_message(self.upc_code, self.error)
+
+
+def validate_code(upc_code):
+    """Validate a single UPC code and return a UPCResult."""
+    code = str(upc_code).strip()
+    if UPCValidator.is_valid_fast(code):
+        return UPCResult(code, True, UPCError.OK)
+    return UPCResult(code, False, _classify_invalid(code))
+
+
+def encode_upca(upc_code):
+    """
+    Return the 95-module UPC-A bar pattern for a valid 12-digit UPC
+    as a string of '1' (bar) and '0' (space) characters.
+    Raises ValueError for invalid codes.
+    """
+    result = validate_code(upc_code)
+    if not result.is_valid:
+        raise ValueError(result.error_message)
+    
+    digits = result.upc_code
+    return ''.join((
+        UPC_END_GUARD,
+        *(UPC_LEFT_PATTERNS[int(digit)] for digit in digits[:6]),
+        UPC_CENTER_GUARD,
+        *(UPC_RIGHT_PATTERNS[int(digit)] for digit in digits[6:]),
+        UPC_END_GUARD,
+    ))
+
+
+def _parse_pattern(pattern, prefix=None):
+    """
+    Split a 12-character pattern into the pattern, the weighted residue of
+    the known digits and the positions of unknown digits, with prefix
+    digits filled in. Returns None if the pattern has the wrong length,
+    other characters or contradicts the prefix.
+    """
+    pattern = str(pattern).strip()
+    if len(pattern) != 12:
+        return None
+    
+    if prefix:
+        prefix = str(prefix).strip()
+        if len(prefix) > 12 or not (prefix.isascii() and prefix.isdigit()):
+            return None
+        head = pattern[:len(prefix)]
+        if any(char != fixed and char not in MISSING_DIGIT_CHARS for char, fixed in zip(head, prefix)):
+            return None
+        pattern = prefix + pattern[len(prefix):]
+    
+    unknown = [i for i, char in enumerate(pattern) if char in MISSING_DIGIT_CHARS]
+    known = pattern.translate(_UNKNOWN_AS_ZERO).encode()
+    if not (known.isascii() and known.isdigit()):
+        return None
+    
+    # Same byte-sum trick as is_valid_fast(); unknowns count as '0'
+    residue = (3 * sum(known[0::2]) + sum(known[1::2]) - _ASCII_RESIDUE) % 10
+    return pattern, residue, unknown
+
+
+def iter_completions(pattern, prefix=None):
+    """
+    Lazily yield every valid UPC matching a pattern with '?' or '_' for
+    unknown digits, in ascending order.
+    
+    The last unknown digit is solved from the residue the others leave mod
+    10, so k unknowns give exactly 10**(k-1) completions and nothing is
+    tried and rejected; one unknown costs O(1). prefix (e.g. a manufacturer's
+    company prefix such as '036000') fixes the leading digits. Nothing is
+    yielded for malformed patterns.
+    """
+    parsed = _parse_pattern(pattern, prefix)
+    if parsed is None:
+        return
+    pattern, residue, unknown = parsed
+    
+    if not unknown:
+        if residue == 0:
+            yield pattern
+        return
+    
+    *free, last = unknown
+    if not free:
+        yield pattern[:last] + str(-residue * _WEIGHT_INVERSES[UPC_WEIGHTS[last]] % 10) + pattern[last + 1:]
+        return
+    
+    digits = list(pattern)
+    free_weights = [UPC_WEIGHTS[i] for i in free]
+    inverse = _WEIGHT_INVERSES[UPC_WEIGHTS[last]]
+    for values in itertools.product(range(10), repeat=len(free)):
+        total = residue
+        for i, weight, value in zip(free, free_weights, values):
+            digits[i] = str(value)
+            total += weight * value
+        digits[last] = str(-total * inverse % 10)
+        yield ''.join(digits)
+
+
+def count_completions(pattern, prefix=None):
+    """Return how many valid UPCs iter_completions() would yield, without enumerating them."""
+    parsed = _parse_pattern(pattern, prefix)
+    if parsed is None:
+        return 0
+    _, residue, unknown = parsed
+    if not unknown:
+        return 1 if residue == 0 else 0
+    return 10 ** (len(unknown) - 1)
+
+
+def solve_missing_digits(pattern, prefix=None, limit=None):
+    """Return a list of at most limit (default all) valid completions of a pattern."""
+    return list(itertools.islice(iter_completions(pattern, prefix), limit))
+
+
+class Correction(namedtuple('Correction', ['upc_code', 'kind', 'position', 'known'])):
+    """
+    A valid UPC one keying error away from a rejected code.
+    kind is 'substitution' (digit at position replaced) or 'transposition'
+    (digits at position and position + 1 swapped); known tells whether the
+    code is in the known-products index used for ranking.
+    """
+    
+    __slots__ = ()
+
+
+def _correction_candidates(code):
+    """
+    Return (upc_code, kind, position) for every valid single-substitution
+    and adjacent-transposition neighbour of a 12-digit code that fails its
+    check digit, or [] for any other input.
+    
+    With r the weighted residue of the code, replacing digit d at position
+    i by d - r * inverse(w_i) mod 10 is the only substitution that fixes
+    it, so every position gives exactly one candidate. Swapping adjacent
+    digits a, b changes the sum by (w_i - w_i+1) * (b - a) = ±2 * (b - a),
+    which fixes it only when that cancels r.
+    """
+    if len(code) != 12 or not (code.isascii() and code.isdigit()):
+        return []
+    
+    values = code.encode()
+    residue = (3 * sum(values[0::2]) + sum(values[1::2]) - _ASCII_RESIDUE) % 10
+    if residue == 0:
+        return []
+    
+    candidates = []
+    for i in range(11):
+        a, b = values[i], values[i + 1]
+        if a != b and (residue + (UPC_WEIGHTS[i] - UPC_WEIGHTS[i + 1]) * (b - a)) % 10 == 0:
+            candidates.append((code[:i] + code[i + 1] + code[i] + code[i + 2:], 'transposition', i))
+    
+    for i, weight in enumerate(UPC_WEIGHTS):
+        digit = (values[i] - 48 - residue * _WEIGHT_INVERSES[weight]) % 10
+        candidates.append((code[:i] + str(digit) + code[i + 1:], 'substitution', i))
+    return candidates
+
+
+def _known_lookup(known):
+    """
+    Normalize a known-products index to a function returning the known
+    subset of an iterable of codes. known may be such a function (e.g.
+    HistoryStore.known_codes), any container supporting 'in', or None.
+    """
+    if known is None:
+        return lambda codes: frozenset()
+    if callable(known):
+        return known
+    return lambda codes: {code for code in codes if code in known}
+
+
+def _rank_corrections(candidates, known_codes):
+    """Build Correction records, known products first, then by CORRECTION_KINDS order."""
+    corrections = [
+        Correction(upc, kind, position, upc in known_codes)
+        for upc, kind, position in candidates
+    ]
+    corrections.sort(key=lambda c: (not c.known, CORRECTION_KINDS.index(c.kind)))
+    return corrections
+
+
+def suggest_corrections(upc_code, known=None):
+    """
+    Return the valid UPCs one keying error (a single substitution or an
+    adjacent transposition) away from a code that fails its check digit,
+    ranked best first. Valid and malformed codes have no suggestions.
+    known is an optional known-products index (see iter_corrections()).
+    """
+    candidates = _correction_candidates(str(upc_code).strip())
+    if not candidates:
+        return []
+    known_codes = _known_lookup(known)([upc for upc, _, _ in candidates])
+    return _rank_corrections(candidates, known_codes)
+
+
+def iter_corrections(codes, known=None, chunk_size=DEFAULT_CORRECTION_CHUNK_SIZE):
+    """
+    Correct a feed of rejected codes in batch.
+    
+    Yields (code, corrections) in input order for every code that fails
+    only its check digit; other codes are skipped. known is an optional
+    known-products index: a container of valid codes or a function mapping
+    an iterable of codes to the known subset, which is called once per
+    chunk_size rejects so e.g. a database lookup is batched too.
+    """
+    lookup = _known_lookup(known)
+    
+    def correct(chunk):
+        known_codes = lookup({upc for _, candidates in chunk for upc, _, _ in candidates})
+        for code, candidates in chunk:
+            yield code, _rank_corrections(candidates, known_codes)
+    
+    chunk = []
+    for code in codes:
+        code = str(code).strip()
+        candidates = _correction_candidates(code)
+        if not candidates:
+            continue
+        chunk.append((code, candidates))
+        if len(chunk) >= chunk_size:
+            yield from correct(chunk)
+            chunk = []
+    
+    if chunk:
+        yield from correct(chunk)
+
+
+def write_corrections(codes, path, known=None, max_suggestions=3, progress=None, cancel_event=None):
+    """
+    Write a CSV of rejected codes with their best max_suggestions
+    corrections (UPC Code, Suggestion, Error, Position, Known).
+    progress(done, total) is called per chunk when codes has a length.
+    Returns the number of corrected codes, or None if cancelled.
+    """
+    total = len(codes) if hasattr(codes, '__len__') else 0
+    corrected = 0
+    
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['UPC Code', 'Suggestion', 'Error', 'Position', 'Known'])
+        
+        for code, corrections in iter_corrections(codes, known):
+            writer.writerows(
+                (code, c.upc_code, c.kind, c.position + 1, 'Yes' if c.known else '')
+                for c in corrections[:max_suggestions]
+            )
+            corrected += 1
+            
+            if corrected % DEFAULT_CORRECTION_CHUNK_SIZE == 0:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                if progress:
+                    progress(corrected, total)
+    
+    if progress:
+        progress(corrected, total)
+    return corrected
+
+
+def validate_many(codes):
+    """
+    Validate a whole column of UPC codes in one batched pass.
+    
+    Returns a tuple (valid, errors) of compact arrays with one entry per code:
+    valid holds 1/0 flags and errors holds UPCError values. With NumPy these
+    are bool/uint8 ndarrays, otherwise bytearrays.
+    """
+    return _validate_stripped([str(code).strip() for code in codes])
+
+
+def _validate_stripped(codes):
+    """Dispatch already-stripped codes to the NumPy or pure-Python pass."""
+    if NUMPY_AVAILABLE:
+        return _validate_many_numpy(codes)
+    return _validate_many_python(codes)
+
+
+def _validate_many_numpy(codes):
+    """Vectorized validation: build an (n, 12) digit matrix and reduce it."""
+    count = len(codes)
+    errors = np.full(count, UPCError.LENGTH, dtype=np.uint8)
+    
+    lengths = np.fromiter(map(len, codes), dtype=np.intp, count=count)
+    rows = np.flatnonzero(lengths == 12)
+    
+    if rows.size:
+        # Non-ASCII characters become b'?' so every row stays 12 bytes wide
+        buffer = ''.join([codes[i] for i in rows]).encode('ascii', 'replace')
+        digits = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, 12) - 48
         
-        # Try each digit 0-9
-        for digit in range(10):
-            test_upc = self.upc_code[:missing_pos] + str(digit) + self.upc_code[missing_pos+1:]
-            validator = UPCValidator(test_upc)
-            if validator.validate():
-                return test_upc
+        # Bytes below '0' wrap around in uint8, so one comparison catches both ends
+        non_digit = (digits > 9).any(axis=1)
+        total = digits @ _UPC_WEIGHTS_NP
         
-        return None
+        errors[rows] = np.where(
+            non_digit,
+            UPCError.NON_DIGIT,
+            np.where(total % 10 == 0, UPCError.OK, UPCError.CHECK_DIGIT)
+        )
+    
+    return errors == UPCError.OK, errors
+
+
+def _validate_many_python(codes):
+    """Pure-Python fallback for validate_many()."""
+    count = len(codes)
+    valid = bytearray(count)
+    errors = bytearray(count)
+    
+    is_valid_fast = UPCValidator.is_valid_fast
+    
+    for i, code in enumerate(codes):
+        if is_valid_fast(code):
+            valid[i] = 1
+        else:
+            errors[i] = _classify_invalid(code)
+    
+    return valid, errors
+
+
+class ResultChunk:
+    """
+    A block of validation results kept as two columns: the codes and a
+    bytes object of UPCError values. Indexing or iterating builds UPCResult
+    records on demand, while BatchResultStore.extend() copies the columns
+    as they are. Pickles as one joined code blob plus the error bytes, so
+    chunks cross process boundaries without a per-row object each.
+    """
+    
+    __slots__ = ('codes', 'errors')
+    
+    def __init__(self, codes, errors):
+        self.codes = codes
+        self.errors = bytes(errors)
+    
+    def __len__(self):
+        return len(self.errors)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        error = self.errors[index]
+        return UPCResult(self.codes[index], error == UPCError.OK, _ERRORS[error])
+    
+    def __iter__(self):
+        for code, error in zip(self.codes, self.errors):
+            yield UPCResult(code, error == UPCError.OK, _ERRORS[error])
+    
+    @property
+    def valid_count(self):
+        return self.errors.count(UPCError.OK)
+    
+    def __reduce__(self):
+        # Codes never contain newlines (they come from split lines)
+        return _unpack_chunk, ('\n'.join(self.codes).encode('utf-8'), self.errors)
+
+
+def _unpack_chunk(blob, errors):
+    """Rebuild a pickled ResultChunk; decoding and splitting run in C."""
+    return ResultChunk(blob.decode('utf-8').split('\n') if errors else [], errors)
+
+
+def _error_bytes(errors):
+    """Convert an errors array from validate_many() to bytes."""
+    return errors.tobytes() if hasattr(errors, 'tobytes') else bytes(errors)
+
+
+def _reject_chunk(codes, errors):
+    """Build a ResultChunk of only the rejected rows of (codes, error bytes)."""
+    if NUMPY_AVAILABLE:
+        error_array = np.frombuffer(errors, dtype=np.uint8)
+        invalid = np.flatnonzero(error_array)
+        return ResultChunk([codes[i] for i in invalid.tolist()], error_array[invalid].tobytes())
+    invalid = [i for i, error in enumerate(errors) if error]
+    return ResultChunk([codes[i] for i in invalid], bytes(errors[i] for i in invalid))
+
+
+def validate_records(codes):
+    """
+    Validate a batch of UPC codes and return a list of UPCResult records.
+    Uses the same batched pass as validate_many().
+    """
+    codes = [str(code).strip() for code in codes]
+    valid, errors = _validate_stripped(codes)
+    return _build_results(codes, valid, errors)
+
+
+def _build_results(codes, valid, errors):
+    """Zip codes with validity/error arrays into UPCResult records."""
+    if hasattr(valid, 'tolist'):
+        valid = valid.tolist()
+        errors = errors.tolist()
+    return [
+        UPCResult(code, bool(ok), _ERRORS[error])
+        for code, ok, error in zip(codes, valid, errors)
+    ]
+
+
+def _count_valid(valid):
+    """Count set flags in a validity array from validate_many()."""
+    if isinstance(valid, bytearray):
+        return valid.count(1)
+    return int(np.count_nonzero(valid))
+
+
+class ValidationStats:
+    """Running counters updated while a file is validated in chunks."""
+    
+    __slots__ = ('total', 'valid', 'invalid', 'bytes_read', 'bytes_total')
+    
+    def __init__(self):
+        self.total = 0
+        self.valid = 0
+        self.invalid = 0
+        self.bytes_read = 0
+        self.bytes_total = 0
+    
+    def add(self, count, valid_count):
+        """Record a validated chunk of count codes."""
+        self.total += count
+        self.valid += valid_count
+        self.invalid += count - valid_count
+    
+    @property
+    def progress(self):
+        """Fraction of the input consumed so far (0.0 - 1.0)."""
+        if not self.bytes_total:
+            return 1.0
+        return min(self.bytes_read / self.bytes_total, 1.0)
+
+
+def _detect_layout(f):
+    """
+    Inspect the first line of a binary file.
+    Returns (is_csv, data_start): CSV files are detected by a comma in the
+    first line, and a first line whose first field has no digits (e.g.
+    'UPC_Code,Product_Name,Brand') is treated as a header and skipped.
+    """
+    f.seek(0)
+    first_line = f.readline()
+    data_start = len(codecs.BOM_UTF8) if first_line.startswith(codecs.BOM_UTF8) else 0
+    
+    text = first_line[data_start:].decode('utf-8', 'replace')
+    is_csv = ',' in text
+    
+    if is_csv:
+        first_field = text.split(',', 1)[0]
+        if not any(char.isdigit() for char in first_field):
+            data_start = len(first_line)
+    
+    return is_csv, data_start
+
+
+def _parse_lines(text, is_csv):
+    """Extract stripped UPC codes from a block of complete lines."""
+    lines = text.splitlines()
+    if is_csv:
+        return [row[0].strip() for row in csv.reader(lines) if row]
+    return [line.strip() for line in lines if line.strip()]
+
+
+def _iter_line_blocks(f, chunk_size):
+    """Read fixed-size blocks and yield them cut at the last newline."""
+    tail = b''
+    while True:
+        block = f.read(chunk_size)
+        if not block:
+            break
+        block = tail + block
+        cut = block.rfind(b'\n') + 1
+        tail = block[cut:]
+        if cut:
+            yield block[:cut]
+    
+    if tail:
+        yield tail
+
+
+def iter_validate_file(path, chunk_size=DEFAULT_CHUNK_SIZE, stats=None, invalid_only=False):
+    """
+    Stream-validate a CSV (first column, optional header) or plain
+    one-code-per-line text file.
+    
+    Reads the file in blocks of chunk_size bytes and yields one ResultChunk
+    (a sequence of UPCResult records) per block, so memory stays bounded
+    regardless of file size. Pass a ValidationStats to get running valid/invalid counts
+    and byte progress while iterating. With invalid_only=True the chunks
+    hold only rejected codes; stats still counts every code.
+    """
+    if stats is None:
+        stats = ValidationStats()
+    
+    with open(path, 'rb') as f:
+        stats.bytes_total = os.fstat(f.fileno()).st_size
+        is_csv, data_start = _detect_layout(f)
+        f.seek(data_start)
+        stats.bytes_read = data_start
+        
+        for block in _iter_line_blocks(f, chunk_size):
+            codes = _parse_lines(block.decode('utf-8', 'replace'), is_csv)
+            valid, errors = _validate_stripped(codes)
+            
+            stats.bytes_read += len(block)
+            stats.add(len(codes), _count_valid(valid))
+            if invalid_only:
+                yield _reject_chunk(codes, _error_bytes(errors))
+            else:
+                yield ResultChunk(codes, _error_bytes(errors))
+
+
+def _read_byte_range(f, start, end, data_start):
+    """
+    Read the complete lines that start inside [start, end).
+    A line straddling start belongs to the previous range; a line
+    straddling end is completed by reading past it.
+    """
+    if start > data_start:
+        f.seek(start - 1)
+        f.readline()
+    else:
+        f.seek(start)
+    
+    position = f.tell()
+    if position >= end:
+        return b''
+    
+    block = f.read(end - position)
+    if block and not block.endswith(b'\n'):
+        block += f.readline()
+    return block
+
+
+def _validate_byte_range(path, start, end, is_csv, data_start, invalid_only):
+    """Worker: validate one byte range of a file (runs in a child process)."""
+    with open(path, 'rb') as f:
+        block = _read_byte_range(f, start, end, data_start)
+    
+    codes = _parse_lines(block.decode('utf-8', 'replace'), is_csv)
+    valid, errors = _validate_stripped(codes)
+    count = len(codes)
+    valid_count = _count_valid(valid)
+    
+    # Returned as columns: one code blob and one error byte per row
+    errors = _error_bytes(errors)
+    if invalid_only:
+        # Ship back only the rejects to keep inter-process traffic small
+        return count, valid_count, _reject_chunk(codes, errors)
+    return count, valid_count, ResultChunk(codes, errors)
+
+
+def iter_validate_file_parallel(path, workers=None, chunk_size=DEFAULT_PARALLEL_CHUNK_SIZE,
+                                stats=None, invalid_only=False):
+    """
+    Validate a file across a pool of worker processes.
+    
+    The file is split into byte ranges of chunk_size bytes (realigned to
+    line boundaries by each worker) and validated with the same logic as
+    iter_validate_file(). ResultChunks are yielded in file order while at
+    most 2 * workers ranges are in flight. Workers send results back as
+    columns, so the parent only joins them. With invalid_only=True only
+    rejected codes are returned, which keeps the parent's serial share and
+    inter-process traffic small; stats still counts every code.
+    """
+    if stats is None:
+        stats = ValidationStats()
+    workers = workers or os.cpu_count() or 1
+    
+    with open(path, 'rb') as f:
+        stats.bytes_total = os.fstat(f.fileno()).st_size
+        is_csv, data_start = _detect_layout(f)
+    stats.bytes_read = data_start
+    
+    ranges = (
+        (start, min(start + chunk_size, stats.bytes_total))
+        for start in range(data_start, stats.bytes_total, chunk_size)
+    )
+    
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    
+    def collect(future, start, end):
+        count, valid_count, chunk = future.result()
+        stats.bytes_read += end - start
+        stats.add(count, valid_count)
+        return chunk
+    
+    try:
+        for start, end in ranges:
+            future = executor.submit(
+                _validate_byte_range, path, start, end, is_csv, data_start, invalid_only
+            )
+            pending.append((future, start, end))
+            if len(pending) >= 2 * workers:
+                yield collect(*pending.popleft())
+        
+        while pending:
+            yield collect(*pending.popleft())
+    finally:
+        # Abandoned iteration (e.g. cancel): drop queued ranges before shutdown
+        for future, _, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+class BatchResultStore:
+    """
+    Append-only, columnar store of batch validation results.
+    Codes and error codes are kept in parallel arrays instead of one object
+    per row; UPCResult records are materialized only for rows that are
+    actually looked at. Filtered and sorted views are arrays of row indices.
+    """
+    
+    SORT_KEYS = ('row', 'upc', 'status', 'product_type')
+    
+    def __init__(self):
+        self.codes = []
+        self.errors = bytearray()
+        self.valid_count = 0
+    
+    def __len__(self):
+        # errors is extended last, so a reader never sees a row without a code
+        return len(self.errors)
+    
+    def __getitem__(self, index):
+        error = self.errors[index]
+        return UPCResult(self.codes[index], error == UPCError.OK, _ERRORS[error])
+    
+    @property
+    def invalid_count(self):
+        return len(self) - self.valid_count
+    
+    def extend(self, results):
+        """Append a ResultChunk (columns copied as is) or a sequence of UPCResult records."""
+        if isinstance(results, ResultChunk):
+            self.codes.extend(results.codes)
+            errors = results.errors
+        else:
+            self.codes.extend([r.upc_code for r in results])
+            errors = bytes([r.error for r in results])
+        self.valid_count += errors.count(UPCError.OK)
+        self.errors.extend(errors)
+    
+    def select(self, invalid_only=False, product_digit=None):
+        """
+        Return an array of row indices matching the filters.
+        product_digit filters on the first digit of the code (its product type).
+        """
+        count = len(self)
+        codes, errors = self.codes, self.errors
+        rows = range(count)
+        
+        if invalid_only:
+            rows = [i for i in rows if errors[i]]
+        if product_digit is not None:
+            rows = [i for i in rows if codes[i][:1] == product_digit]
+        return array('L', rows)
+    
+    def sort(self, rows, key='row', reverse=False):
+        """Return rows (an index array) ordered by one of SORT_KEYS."""
+        codes, errors = self.codes, self.errors
+        
+        if key == 'row':
+            key_func = None
+        elif key == 'upc':
+            key_func = codes.__getitem__
+        elif key == 'status':
+            key_func = errors.__getitem__
+        elif key == 'product_type':
+            key_func = lambda i: (errors[i], codes[i][:1])
+        else:
+            raise ValueError(f"Unknown sort key: {key}")
+        
+        return array('L', sorted(rows, key=key_func, reverse=reverse))
+
+
+class FixedWidthUPCFile:
+    """
+    Memory-mapped reader for fixed-width UPC files (12 digits plus a
+    newline per record, LF or CRLF).
+    
+    Records are validated straight from the mapped bytes; a record is only
+    decoded to str when it is reported as invalid. Record N lives at a
+    fixed offset, so it can be re-validated without rescanning the file.
+    """
+    
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = None
+        self._iterators = weakref.WeakSet()
+        self.size = os.fstat(self._file.fileno()).st_size
+        self.record_size = 13
+        self.terminator = b'\n'
+        
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            newline = self._map.find(b'\n', 0, 16)
+            if newline == 13 and self._map[12:13] == b'\r':
+                self.terminator = b'\r\n'
+            elif newline not in (12, -1) or (newline == -1 and self.size != 12):
+                self.close()
+                raise ValueError(f"Not a fixed-width UPC file: {path}")
+            self.record_size = 12 + len(self.terminator)
+        
+        # The last record may be missing its terminator
+        self._full_records, tail = divmod(self.size, self.record_size)
+        self._count = self._full_records + (1 if tail else 0)
+    
+    def __len__(self):
+        return self._count
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """
+        Unmap and close the underlying file.
+        Unfinished iterators are closed first so they release their views of
+        the map. If a view is still held elsewhere, the map is dropped instead
+        and unmapped once the last view goes away.
+        """
+        for iterator in list(self._iterators):
+            iterator.close()
+        
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+            self._map = None
+        self._file.close()
+    
+    def _track(self, iterator):
+        """Register a generator so close() can finish it before unmapping."""
+        self._iterators.add(iterator)
+        return iterator
+    
+    def record(self, index):
+        """Return the 12 code bytes of record index (no str decoding)."""
+        if not 0 <= index < self._count:
+            raise IndexError("record index out of range")
+        offset = index * self.record_size
+        return self._map[offset:offset + 12]
+    
+    def _record_error(self, index):
+        """Validate record index from its bytes and return a UPCError."""
+        offset = index * self.record_size
+        end = offset + self.record_size
+        terminator = self._map[offset + 12:end]
+        
+        if (terminator != self.terminator and end <= self.size) or offset + 12 > self.size:
+            return UPCError.LENGTH
+        code = self._map[offset:offset + 12]
+        if UPCValidator.is_valid_fast(code):
+            return UPCError.OK
+        return UPCError.NON_DIGIT if not code.isdigit() else UPCError.CHECK_DIGIT
+    
+    def is_valid_record(self, index):
+        """Re-validate record index in place and return a bool."""
+        if not 0 <= index < self._count:
+            raise IndexError("record index out of range")
+        return self._record_error(index) == UPCError.OK
+    
+    def validate_record(self, index):
+        """Re-validate record index and return a UPCResult."""
+        if not 0 <= index < self._count:
+            raise IndexError("record index out of range")
+        error = self._record_error(index)
+        offset = index * self.record_size
+        line = self._map[offset:offset + self.record_size]
+        if error == UPCError.LENGTH:
+            code = line.rstrip(b'\r\n')
+        else:
+            code = line[:12]
+        return UPCResult(code.decode('ascii', 'replace'), error == UPCError.OK, error)
+    
+    def iter_flags(self, chunk_records=1 << 16):
+        """
+        Yield (start_index, valid, errors) arrays for consecutive blocks of
+        records, in the same array formats as validate_many().
+        """
+        return self._track(self._iter_flags(chunk_records))
+    
+    def _iter_flags(self, chunk_records):
+        if NUMPY_AVAILABLE and self._full_records:
+            yield from self._iter_flags_numpy(chunk_records)
+            start = self._full_records
+        else:
+            start = 0
+        
+        for block_start in range(start, self._count, chunk_records):
+            block_end = min(block_start + chunk_records, self._count)
+            errors = bytearray(self._record_error(i) for i in range(block_start, block_end))
+            valid = bytearray(1 if error == UPCError.OK else 0 for error in errors)
+            yield block_start, valid, errors
+    
+    def _iter_flags_numpy(self, chunk_records):
+        """Zero-copy strided view over all complete records."""
+        matrix = np.frombuffer(
+            self._map, dtype=np.uint8, count=self._full_records * self.record_size
+        ).reshape(-1, self.record_size)
+        terminator = np.frombuffer(self.terminator, dtype=np.uint8)
+        block = None
+        
+        try:
+            for start in range(0, self._full_records, chunk_records):
+                block = matrix[start:start + chunk_records]
+                digits = block[:, :12] - 48
+                bad_terminator = (block[:, 12:] != terminator).any(axis=1)
+                non_digit = (digits > 9).any(axis=1)
+                total = digits @ _UPC_WEIGHTS_NP
+                
+                errors = np.where(
+                    bad_terminator,
+                    UPCError.LENGTH,
+                    np.where(
+                        non_digit,
+                        UPCError.NON_DIGIT,
+                        np.where(total % 10 == 0, UPCError.OK, UPCError.CHECK_DIGIT)
+                    )
+                ).astype(np.uint8)
+                yield start, errors == UPCError.OK, errors
+        finally:
+            # Release the exported buffer so the mmap can be closed
+            matrix = block = None
+    
+    def iter_invalid(self, chunk_records=1 << 16, stats=None):
+        """
+        Yield a UPCResult for every invalid record (with its index as
+        (index, result) tuples). Valid records are never decoded.
+        """
+        return self._track(self._iter_invalid(chunk_records, stats))
+    
+    def _iter_invalid(self, chunk_records, stats):
+        for start, valid, errors in self.iter_flags(chunk_records):
+            count = len(errors)
+            valid_count = _count_valid(valid)
+            if stats is not None:
+                stats.add(count, valid_count)
+                stats.bytes_read = min((start + count) * self.record_size, self.size)
+                stats.bytes_total = self.size
+            
+            if valid_count == count:
+                continue
+            for offset, ok in enumerate(valid):
+                if not ok:
+                    yield start + offset, self.validate_record(start + offset)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,306 @@
+"""
+UPC Validator GTIN Module
+Validation and normalization for the whole GTIN family: EAN-8, UPC-A,
+EAN-13 and GTIN-14, plus UPC-E expansion and compression
+Every length is checked by one routine: codes are right-aligned by padding
+to 14 digits with zeros, which lines their check digits up under a single
+weight table, so mixed feeds validate in one pass
+"""
+
+from collections import namedtuple
+
+from upc_core import NUMPY_AVAILABLE, UPCError, UPCValidator, validate_code
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+
+# Valid GTIN lengths and the format each length denotes
+GTIN_LENGTHS = (8, 12, 13, 14)
+GTIN_KINDS = {8: 'EAN-8', 12: 'UPC-A', 13: 'EAN-13', 14: 'GTIN-14'}
+
+# Check-digit weights for a code right-aligned to 14 digits (the check digit
+# always gets 1, the digit before it 3, and so on)
+GTIN_WEIGHTS = (3, 1) * 7
+
+# Weighted sum contributed by the ASCII offset of '0' (48) in all 14 positions
+_ASCII_RESIDUE = (48 * sum(GTIN_WEIGHTS)) % 10
+
+# Lookup table marking valid lengths, indexed by len(code)
+_VALID_LENGTH = bytes(1 if n in GTIN_LENGTHS else 0 for n in range(15))
+
+if NUMPY_AVAILABLE:
+    _GTIN_WEIGHTS_NP = np.array(GTIN_WEIGHTS, dtype=np.int32)
+    _VALID_LENGTH_NP = np.frombuffer(_VALID_LENGTH, dtype=np.uint8).astype(bool)
+
+# A GTIN-14 starting with this is an EAN-8
+_EAN8_PREFIX = '0' * 6
+
+# UPC-E number systems (UPC-A codes starting with 0 or 1 can be compressed)
+UPCE_NUMBER_SYSTEMS = ('0', '1')
+
+# Scanner symbologies and the GTIN lengths they carry
+SYMBOLOGY_LENGTHS = {'EAN8': 8, 'UPCA': 12, 'EAN13': 13, 'UPCE': 8}
+
+
+def _classify_invalid(code):
+    """Return the UPCError explaining why a code is not a valid GTIN."""
+    if len(code) not in GTIN_LENGTHS:
+        return UPCError.LENGTH
+    if not (code.isascii() and code.isdigit()):
+        return UPCError.NON_DIGIT
+    return UPCError.CHECK_DIGIT
+
+
+def _error_message(code, error):
+    """Format the human-readable message for a GTIN UPCError."""
+    if error == UPCError.LENGTH:
+        return f"GTIN must be 8, 12, 13 or 14 digits (got {len(code)})"
+    if error == UPCError.NON_DIGIT:
+        return "GTIN must contain only digits"
+    if error == UPCError.CHECK_DIGIT:
+        return f"Invalid check digit (expected {gtin_check_digit(code[:-1])})"
+    return ""
+
+
+def _is_valid_gtin(code):
+    """Weighted-sum check of a stripped code of any GTIN length, without diagnostics."""
+    if len(code) > 14 or not _VALID_LENGTH[len(code)] or not code.isascii():
+        return False
+    padded = code.rjust(14, '0').encode()
+    if not padded.isdigit():
+        return False
+    return (3 * sum(padded[0::2]) + sum(padded[1::2])) % 10 == _ASCII_RESIDUE
+
+
+def gtin_check_digit(body):
+    """
+    Return the check digit (as a str) completing body, the digits of a GTIN
+    without its check digit. Raises ValueError if body has non-digits.
+    """
+    body = str(body).strip()
+    if not (body.isascii() and body.isdigit()) or len(body) > 13:
+        raise ValueError(f"Not a GTIN body: {body!r}")
+    
+    # Right-aligned to 13 digits, the body takes weights 3, 1, 3, ... ending in 3
+    total = sum(int(digit) * weight for digit, weight in zip(body.rjust(13, '0'), GTIN_WEIGHTS))
+    return str(-total % 10)
+
+
+class GTINResult(namedtuple('GTINResult', ['code', 'is_valid', 'error'])):
+    """
+    Immutable result of validating one GTIN of any length.
+    The format and canonical GTIN-14 are derived from the code on access.
+    """
+    
+    __slots__ = ()
+    
+    @property
+    def kind(self):
+        """'EAN-8', 'UPC-A', 'EAN-13' or 'GTIN-14' ('' for a bad length)."""
+        return GTIN_KINDS.get(len(self.code), '')
+    
+    @property
+    def gtin14(self):
+        """Canonical 14-digit form, or '' for invalid codes."""
+        return self.code.rjust(14, '0') if self.is_valid else ''
+    
+    @property
+    def upc_code(self):
+        """The 12-digit UPC-A for codes that have one (EAN-13 starting with 0), else ''."""
+        return (upca_from_gtin(self.gtin14) or '') if self.is_valid else ''
+    
+    @property
+    def error_message(self):
+        return _error_message(self.code, self.error)
+
+
+def validate_gtin(code):
+    """Validate a single EAN-8, UPC-A, EAN-13 or GTIN-14 code and return a GTINResult."""
+    code = str(code).strip()
+    if _is_valid_gtin(code):
+        return GTINResult(code, True, UPCError.OK)
+    return GTINResult(code, False, _classify_invalid(code))
+
+
+def to_gtin14(code):
+    """Return the canonical GTIN-14 of a valid GTIN. Raises ValueError otherwise."""
+    result = validate_gtin(code)
+    if not result.is_valid:
+        raise ValueError(result.error_message)
+    return result.gtin14
+
+
+def upca_from_gtin(code):
+    """
+    Return the 12-digit UPC-A a valid GTIN denotes (a GTIN-14 or EAN-13
+    with leading zeros), or None if it has no UPC-A form. GTIN-14s with six
+    leading zeros are EAN-8 codes, not UPC-As.
+    """
+    code = str(code).strip()
+    if not _is_valid_gtin(code) or len(code) < 12:
+        return None
+    gtin14 = code.rjust(14, '0')
+    if gtin14[:2] != '00' or gtin14.startswith(_EAN8_PREFIX):
+        return None
+    return gtin14[2:]
+
+
+def expand_upce(upce):
+    """
+    Expand a UPC-E code to its 12-digit UPC-A.
+    
+    Accepts the 6 compressed digits (number system 0 assumed), 7 digits
+    with the number system, or all 8 digits including the check digit,
+    which must match the expanded code. Raises ValueError otherwise.
+    """
+    upce = str(upce).strip()
+    if len(upce) == 6:
+        upce = '0' + upce
+    if len(upce) not in (7, 8) or not (upce.isascii() and upce.isdigit()):
+        raise ValueError(f"UPC-E must be 6, 7 or 8 digits: {upce!r}")
+    if upce[0] not in UPCE_NUMBER_SYSTEMS:
+        raise ValueError(f"UPC-E number system must be 0 or 1 (got {upce[0]})")
+    
+    number_system, d = upce[0], upce[1:7]
+    last = d[5]
+    if last in '012':
+        body = d[0:2] + last + '0000' + d[2:5]
+    elif last == '3':
+        body = d[0:3] + '00000' + d[3:5]
+    elif last == '4':
+        body = d[0:4] + '00000' + d[4]
+    else:
+        body = d[0:5] + '0000' + last
+    
+    upca = number_system + body
+    upca += gtin_check_digit(upca)
+    if len(upce) == 8 and upce[7] != upca[11]:
+        raise ValueError(f"Invalid UPC-E check digit (expected {upca[11]})")
+    return upca
+
+
+def compress_upca(upca):
+    """
+    Return the 8-digit UPC-E for a valid UPC-A, or None if it has no UPC-E
+    form (only number systems 0 and 1 with enough zeros compress).
+    Raises ValueError for invalid UPC-A codes.
+    """
+    result = validate_code(upca)
+    if not result.is_valid:
+        raise ValueError(result.error_message)
+    
+    code = result.upc_code
+    number_system, manufacturer, product, check = code[0], code[1:6], code[6:11], code[11]
+    if number_system not in UPCE_NUMBER_SYSTEMS:
+        return None
+    
+    if manufacturer[2] in '012' and manufacturer[3:] == '00' and product[:2] == '00':
+        digits = manufacturer[:2] + product[2:] + manufacturer[2]
+    elif manufacturer[3:] == '00' and product[:3] == '000':
+        digits = manufacturer[:3] + product[3:] + '3'
+    elif manufacturer[4] == '0' and product[:4] == '0000':
+        digits = manufacturer[:4] + product[4] + '4'
+    elif product[:4] == '0000' and product[4] in '56789':
+        digits = manufacturer + product[4]
+    else:
+        return None
+    return number_system + digits + check
+
+
+def normalize_scanned(data, symbology):
+    """
+    Return the canonical GTIN-14 for a decoded barcode's text, expanding
+    UPC-E first, or None if the data is not a valid GTIN of that symbology.
+    """
+    data = str(data).strip()
+    if symbology == 'UPCE':
+        try:
+            data = expand_upce(data)
+        except ValueError:
+            return None
+    elif SYMBOLOGY_LENGTHS.get(symbology, len(data)) != len(data):
+        return None
+    return to_gtin14(data) if _is_valid_gtin(data) else None
+
+
+def validate_gtins(codes):
+    """
+    Validate a column of mixed-length GTINs in one batched pass.
+    
+    Returns (valid, errors, gtin14s): validity flags and UPCError values as
+    in upc_core.validate_many(), and the canonical GTIN-14 of every code
+    ('' for invalid ones). Codes are right-aligned to 14 digits and checked
+    against one weight vector, so no format is special-cased.
+    """
+    codes = [str(code).strip() for code in codes]
+    if NUMPY_AVAILABLE:
+        valid, errors = _validate_gtins_numpy(codes)
+        flags = valid.tolist()
+    else:
+        valid, errors = _validate_gtins_python(codes)
+        flags = valid
+    gtin14s = [code.rjust(14, '0') if ok else '' for code, ok in zip(codes, flags)]
+    return valid, errors, gtin14s
+
+
+def _validate_gtins_numpy(codes):
+    """Vectorized validation: pad every code to a 14-digit row and reduce the matrix."""
+    count = len(codes)
+    lengths = np.fromiter(map(len, codes), dtype=np.intp, count=count)
+    length_ok = np.zeros(count, dtype=bool)
+    in_range = lengths <= 14
+    length_ok[in_range] = _VALID_LENGTH_NP[lengths[in_range]]
+    
+    errors = np.full(count, UPCError.LENGTH, dtype=np.uint8)
+    rows = np.flatnonzero(length_ok)
+    
+    if rows.size:
+        # Non-ASCII characters become b'?' so every row stays 14 bytes wide
+        buffer = ''.join([codes[i].rjust(14, '0') for i in rows]).encode('ascii', 'replace')
+        digits = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, 14) - 48
+        
+        # Bytes below '0' wrap around in uint8, so one comparison catches both ends
+        non_digit = (digits > 9).any(axis=1)
+        total = digits @ _GTIN_WEIGHTS_NP
+        
+        errors[rows] = np.where(
+            non_digit,
+            UPCError.NON_DIGIT,
+            np.where(total % 10 == 0, UPCError.OK, UPCError.CHECK_DIGIT)
+        )
+    
+    return errors == UPCError.OK, errors
+
+
+def _validate_gtins_python(codes):
+    """Pure-Python fallback for validate_gtins()."""
+    count = len(codes)
+    valid = bytearray(count)
+    errors = bytearray(count)
+    
+    for i, code in enumerate(codes):
+        if _is_valid_gtin(code):
+            valid[i] = 1
+        else:
+            errors[i] = _classify_invalid(code)
+    
+    return valid, errors
+
+
+def describe_gtin(code):
+    """
+    Return a dict describing a valid GTIN for display: kind, gtin14, the
+    UPC-A (if any), its UPC-E form (if compressible) and the product type
+    for UPC-A codes. Raises ValueError for invalid codes.
+    """
+    gtin14 = to_gtin14(code)
+    code = str(code).strip()
+    upca = upca_from_gtin(gtin14)
+    return {
+        'kind': GTIN_KINDS[len(code)],
+        'gtin14': gtin14,
+        'upca': upca or '',
+        'upce': (compress_upca(upca) or '') if upca else '',
+        'product_type': UPCValidator.PRODUCT_TYPES.get(upca[0], 'Unknown') if upca else '',
+    }
@@ -0,0 +1,790 @@
+"""
+UPC Validator History Module
+SQLite storage for validation history without GUI dependencies
+Keeps long-lived, WAL-mode connections instead of reconnecting per query
+and buffers inserts so they are written in batched transactions
+Expired rows are moved to gzip CSV archives to keep the live database small
+"""
+
+import csv
+import gzip
+import io
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from upc_core import UPCValidator
+
+# Optional PDF report support
+try:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.pdfgen import canvas
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+DEFAULT_DB_PATH = 'upc_history.db'
+
+# Buffered validations are flushed once this many are pending
+DEFAULT_FLUSH_SIZE = 100
+
+# Rows fetched per keyset page when iterating the whole history
+DEFAULT_PAGE_SIZE = 5000
+
+# Rows per fetchmany() block when streaming exports
+EXPORT_BATCH_SIZE = 5000
+
+# Buffer size for export writers
+EXPORT_BUFFER_SIZE = 1 << 20
+
+# Largest range drawn row by row in a PDF report. reportlab keeps every page
+# in memory until save() (about 30 MB per 100k rows), so larger ranges get
+# the summary only; CSV export has no limit
+PDF_MAX_DETAIL_ROWS = 50000
+
+# Directory for archived (expired) history rows
+DEFAULT_ARCHIVE_DIR = 'upc_history_archive'
+
+# Free pages returned to the OS per incremental vacuum step
+DEFAULT_VACUUM_PAGES = 1000
+
+# UPCs per IN (...) query when looking up known codes (SQLite's default
+# limit is 999 parameters)
+KNOWN_LOOKUP_BATCH = 500
+
+# PRAGMA user_version of the current schema
+SCHEMA_VERSION = 1
+
+# Legacy rows copied per INSERT ... SELECT when migrating (progress is
+# reported between batches)
+MIGRATION_BATCH_SIZE = 100000
+
+# Dividing a 12-digit UPC stored as INTEGER by this gives its first digit
+_FIRST_DIGIT_DIVISOR = 10 ** 11
+
+
+# One history entry; timestamp is Unix epoch seconds
+HistoryRow = namedtuple('HistoryRow', ['id', 'upc_code', 'is_valid', 'product_type', 'timestamp'])
+
+
+def _encode_upc(upc):
+    """
+    Split a UPC string into (upc_code, upc_text) columns.
+    Canonical 12-digit codes are stored only as an INTEGER; anything else
+    (wrong length, letters) also keeps its original text so it round-trips.
+    """
+    if upc.isascii() and upc.isdigit() and len(upc) <= 18:
+        return int(upc), (None if len(upc) == 12 else upc)
+    return None, upc
+
+
+class HistoryStore:
+    """
+    Validation history storage layer.
+    Holds one long-lived connection per thread (a small pool shared by the
+    UI thread and background workers, which release() theirs when done). Statements are fixed SQL strings so
+    sqlite3's per-connection statement cache reuses the prepared statements.
+    
+    Inserts are write-behind: add() only appends to an in-memory buffer,
+    which flush() writes with executemany in a single transaction. The
+    buffer is flushed automatically every flush_size records, before reads,
+    and on close(); callers add a time-based flush (e.g. a Tk after() timer).
+    
+    Schema: UPCs are stored as INTEGER (original text only for
+    non-canonical input), timestamps as integer epoch seconds, and product
+    types are looked up from the first digit instead of being stored per
+    row. Indexes on upc_code and timestamp plus keyset pagination by id keep
+    lookups fast on very large histories.
+    """
+    
+    # Applied to every new connection
+    PRAGMAS = (
+        ('auto_vacuum', 'INCREMENTAL'),  # New databases only; init_schema() converts old ones
+        ('journal_mode', 'WAL'),      # Readers don't block the writer
+        ('synchronous', 'NORMAL'),    # Safe with WAL, avoids fsync per commit
+        ('cache_size', -16000),       # ~16 MB page cache
+        ('temp_store', 'MEMORY'),
+    )
+    
+    SCHEMA_SQL = (
+        '''
+        CREATE TABLE IF NOT EXISTS validation_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            upc_code INTEGER,
+            upc_text TEXT,
+            is_valid INTEGER NOT NULL,
+            timestamp INTEGER NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS product_types (
+            digit INTEGER PRIMARY KEY,
+            name TEXT NOT NULL
+        )
+        ''',
+    )
+    
+    # Created after a migration's bulk copy rather than updated row by row
+    INDEX_SQL = (
+        'CREATE INDEX IF NOT EXISTS idx_history_upc ON validation_history (upc_code)',
+        'CREATE INDEX IF NOT EXISTS idx_history_timestamp ON validation_history (timestamp)',
+    )
+    
+    INSERT_SQL = (
+        'INSERT INTO validation_history (upc_code, upc_text, is_valid, timestamp) '
+        'VALUES (?, ?, ?, ?)'
+    )
+    
+    # Decoded row: UPC text rebuilt from the INTEGER, product type joined by first digit
+    SELECT_SQL = (
+        "SELECT h.id, COALESCE(h.upc_text, printf('%012d', h.upc_code)), h.is_valid, "
+        "CASE WHEN h.is_valid THEN p.name ELSE '' END, h.timestamp "
+        "FROM validation_history h "
+        f"LEFT JOIN product_types p ON p.digit = h.upc_code / {_FIRST_DIGIT_DIVISOR} "
+    )
+    
+    # v0 rows in an id range, converted in SQL: UPCs split as by _encode_upc(),
+    # naive local ISO timestamps to epoch seconds (0 if unparseable)
+    MIGRATE_V0_SQL = (
+        'INSERT INTO validation_history (id, upc_code, upc_text, is_valid, timestamp) '
+        'SELECT id, '
+        "CASE WHEN length(upc_code) BETWEEN 1 AND 18 AND trim(upc_code, '0123456789') = '' "
+        'THEN CAST(upc_code AS INTEGER) END, '
+        "CASE WHEN length(upc_code) = 12 AND trim(upc_code, '0123456789') = '' "
+        "THEN NULL ELSE COALESCE(upc_code, '') END, "
+        "is_valid, COALESCE(CAST(strftime('%s', timestamp, 'utc') AS INTEGER), 0) "
+        'FROM validation_history_v0 WHERE id > ? AND id <= ?'
+    )
+    
+    def __init__(self, db_path=DEFAULT_DB_PATH, flush_size=DEFAULT_FLUSH_SIZE,
+                 max_age=None, max_rows=None, archive_dir=DEFAULT_ARCHIVE_DIR, progress=None):
+        self.db_path = db_path
+        self.flush_size = flush_size
+        # Retention limits: max_age in seconds, max_rows newest rows kept (None = unlimited)
+        self.max_age = max_age
+        self.max_rows = max_rows
+        self.archive_dir = archive_dir
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self.init_schema(progress)
+    
+    @staticmethod
+    def needs_upgrade(db_path):
+        """
+        Return True if opening db_path will migrate a legacy history table or
+        convert it to incremental auto-vacuum, which takes a while on large
+        histories (callers can show progress).
+        """
+        if not os.path.exists(db_path):
+            return False
+        conn = sqlite3.connect(db_path)
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            history = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'validation_history'"
+            ).fetchone()
+            if history is None:
+                return False
+            return version < SCHEMA_VERSION or conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2
+        finally:
+            conn.close()
+    
+    def connection(self):
+        """Return this thread's connection, opening and configuring it once."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Each connection is only used by the thread that opened it;
+            # check_same_thread=False just lets close() run from any thread
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+            for name, value in self.PRAGMAS:
+                conn.execute(f'PRAGMA {name}={value}')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    def release(self):
+        """
+        Close the calling thread's connection. Worker threads call this when
+        they finish with the store; the pool otherwise keeps every
+        connection (and its page cache) open until close().
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+    
+    def init_schema(self, progress=None):
+        """
+        Create the schema, migrating databases from older versions.
+        progress(rows_copied, total_rows) is called between migration batches.
+        Databases created without auto_vacuum (legacy and migrated ones) are
+        converted here with a one-time full VACUUM, so background compact()
+        never has to hold the write lock for a whole-file rewrite.
+        """
+        conn = self.connection()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        
+        if version < SCHEMA_VERSION:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                legacy = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'validation_history'"
+                ).fetchone()
+                if legacy:
+                    conn.execute('ALTER TABLE validation_history RENAME TO validation_history_v0')
+                    for statement in self.SCHEMA_SQL:
+                        conn.execute(statement)
+                    self._migrate_v0(conn, progress)
+                    conn.execute('DROP TABLE validation_history_v0')
+                    for statement in self.INDEX_SQL:
+                        conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        for statement in self.SCHEMA_SQL + self.INDEX_SQL:
+            conn.execute(statement)
+        conn.executemany(
+            'INSERT OR REPLACE INTO product_types (digit, name) VALUES (?, ?)',
+            [(int(digit), name) for digit, name in UPCValidator.PRODUCT_TYPES.items()]
+        )
+        conn.commit()
+        
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+    
+    def _migrate_v0(self, conn, progress=None):
+        """
+        Copy rows from the original TEXT schema in id-ordered batches,
+        converting them in SQL (see MIGRATE_V0_SQL).
+        """
+        total = conn.execute('SELECT COUNT(*) FROM validation_history_v0').fetchone()[0]
+        last_id = -(1 << 63)
+        copied = 0
+        while copied < total:
+            # Upper id of the next batch, found by walking the rowid b-tree
+            row = conn.execute(
+                'SELECT id FROM validation_history_v0 WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?',
+                (last_id, MIGRATION_BATCH_SIZE - 1)
+            ).fetchone()
+            upper = row[0] if row else (1 << 63) - 1
+            copied += conn.execute(self.MIGRATE_V0_SQL, (last_id, upper)).rowcount
+            last_id = upper
+            if progress:
+                progress(copied, total)
+    
+    def add(self, upc, is_valid):
+        """
+        Buffer one validation for the next flush.
+        Returns the (upc_code, is_valid, timestamp) entry for display.
+        """
+        timestamp = int(time.time())
+        row = _encode_upc(upc) + (1 if is_valid else 0, timestamp)
+        with self._pending_lock:
+            self._pending.append(row)
+            should_flush = len(self._pending) >= self.flush_size
+        
+        if should_flush:
+            self.flush()
+        return upc, is_valid, timestamp
+    
+    @property
+    def pending_count(self):
+        return len(self._pending)
+    
+    def flush(self):
+        """Write all buffered validations in one transaction. Returns the row count."""
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        
+        if not rows:
+            return 0
+        
+        conn = self.connection()
+        try:
+            with conn:
+                conn.executemany(self.INSERT_SQL, rows)
+        except sqlite3.Error:
+            # Keep the rows for the next attempt
+            with self._pending_lock:
+                self._pending[:0] = rows
+            raise
+        return len(rows)
+    
+    def _where(self, before_id=None, after_id=None, upc=None, start=None, end=None, valid=None):
+        """Build a WHERE clause and parameters for the common history filters."""
+        clauses = []
+        params = []
+        
+        if before_id is not None:
+            clauses.append('h.id < ?')
+            params.append(before_id)
+        if after_id is not None:
+            clauses.append('h.id > ?')
+            params.append(after_id)
+        if upc is not None:
+            upc_code, upc_text = _encode_upc(upc)
+            if upc_code is None:
+                clauses.append('h.upc_code IS NULL AND h.upc_text = ?')
+                params.append(upc_text)
+            else:
+                clauses.append('h.upc_code = ? AND h.upc_text IS ?')
+                params.extend((upc_code, upc_text))
+        if start is not None:
+            clauses.append('h.timestamp >= ?')
+            params.append(int(start))
+        if end is not None:
+            clauses.append('h.timestamp < ?')
+            params.append(int(end))
+        if valid is not None:
+            clauses.append('h.is_valid = ?')
+            params.append(1 if valid else 0)
+        
+        where = ('WHERE ' + ' AND '.join(clauses) + ' ') if clauses else ''
+        return where, params
+    
+    def page(self, before_id=None, after_id=None, limit=50, **filters):
+        """
+        Return one keyset page of HistoryRow entries, newest first.
+        
+        before_id gives the next (older) page after a page whose last id it
+        is; after_id gives the previous (newer) page before a page whose first
+        id it is. Filters: upc, start/end (epoch seconds) and valid.
+        """
+        self.flush()
+        where, params = self._where(before_id=before_id, after_id=after_id, **filters)
+        
+        # Newer pages are read upwards from after_id, then flipped
+        order = 'ASC' if after_id is not None and before_id is None else 'DESC'
+        rows = self.connection().execute(
+            f'{self.SELECT_SQL}{where}ORDER BY h.id {order} LIMIT ?',
+            params + [limit]
+        ).fetchall()
+        
+        if order == 'ASC':
+            rows.reverse()
+        return [HistoryRow(*row) for row in rows]
+    
+    def recent(self, limit=50):
+        """Return the latest HistoryRow entries, newest first."""
+        return self.page(limit=limit)
+    
+    def iter_rows(self, page_size=DEFAULT_PAGE_SIZE, **filters):
+        """Iterate every matching HistoryRow, newest first, one keyset page at a time."""
+        before_id = None
+        while True:
+            rows = self.page(before_id=before_id, limit=page_size, **filters)
+            if not rows:
+                return
+            yield from rows
+            before_id = rows[-1].id
+    
+    def count(self, **filters):
+        """Return the number of rows matching the history filters."""
+        self.flush()
+        where, params = self._where(**filters)
+        return self.connection().execute(
+            f'SELECT COUNT(*) FROM validation_history h {where}', params
+        ).fetchone()[0]
+    
+    def known_codes(self, codes):
+        """
+        Return the subset of codes that have been validated as valid before.
+        Used as a known-products index when ranking corrections; lookups go
+        through the upc_code index in batches of KNOWN_LOOKUP_BATCH codes.
+        """
+        numbers = sorted({int(code) for code in codes if len(code) == 12 and code.isascii() and code.isdigit()})
+        if not numbers:
+            return set()
+        
+        self.flush()
+        conn = self.connection()
+        known = set()
+        for start in range(0, len(numbers), KNOWN_LOOKUP_BATCH):
+            batch = numbers[start:start + KNOWN_LOOKUP_BATCH]
+            placeholders = ', '.join('?' * len(batch))
+            known.update(
+                f'{number:012d}' for (number,) in conn.execute(
+                    'SELECT DISTINCT upc_code FROM validation_history '
+                    f'WHERE is_valid = 1 AND upc_text IS NULL AND upc_code IN ({placeholders})',
+                    batch
+                )
+            )
+        return known
+    
+    def export_csv(self, path, compress=None, progress=None, cancel_event=None,
+                   batch_size=EXPORT_BATCH_SIZE, **filters):
+        """
+        Stream matching history rows (newest first) to a CSV file.
+        
+        Rows are read from one cursor in fetchmany() blocks with formatting
+        and filters (start/end epoch seconds, valid) done in SQL, and written
+        through a buffered writer, so memory use is independent of history
+        size. compress=None gzips when path ends in '.gz'. progress is called
+        as progress(rows_written, total_rows) after each block; setting
+        cancel_event stops the export and removes the partial file.
+        Safe to call from a worker thread (it uses that thread's connection).
+        Returns the number of rows written, or None if cancelled.
+        """
+        if compress is None:
+            compress = path.endswith('.gz')
+        
+        total = self.count(**filters)
+        where, params = self._where(**filters)
+        cursor = self.connection().execute(
+            "SELECT COALESCE(h.upc_text, printf('%012d', h.upc_code)), "
+            "CASE WHEN h.is_valid THEN 'Yes' ELSE 'No' END, "
+            "CASE WHEN h.is_valid THEN COALESCE(p.name, '') ELSE '' END, "
+            "datetime(h.timestamp, 'unixepoch', 'localtime') "
+            "FROM validation_history h "
+            f"LEFT JOIN product_types p ON p.digit = h.upc_code / {_FIRST_DIGIT_DIVISOR} "
+            f"{where}ORDER BY h.id DESC",
+            params
+        )
+        
+        if compress:
+            raw = gzip.open(path, 'wb')
+            f = io.TextIOWrapper(io.BufferedWriter(raw, EXPORT_BUFFER_SIZE), encoding='utf-8', newline='')
+        else:
+            f = open(path, 'w', encoding='utf-8', newline='', buffering=EXPORT_BUFFER_SIZE)
+        
+        written = 0
+        cancelled = False
+        try:
+            writer = csv.writer(f)
+            writer.writerow(['UPC Code', 'Valid', 'Product Type', 'Timestamp'])
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                written += len(rows)
+                
+                if progress:
+                    progress(written, total)
+                if cancel_event is not None and cancel_event.is_set():
+                    cancelled = True
+                    break
+        finally:
+            cursor.close()
+            f.close()
+        
+        if cancelled:
+            os.remove(path)
+            return None
+        return written
+    
+    def summary(self, **filters):
+        """
+        Aggregate matching history with SQL instead of loading rows.
+        Returns a dict with total/valid/invalid counts, by_product_type as
+        (product type, count) pairs and by_day as (day, valid, invalid) tuples.
+        """
+        self.flush()
+        where, params = self._where(**filters)
+        conn = self.connection()
+        
+        total, valid = conn.execute(
+            f'SELECT COUNT(*), COALESCE(SUM(h.is_valid), 0) FROM validation_history h {where}',
+            params
+        ).fetchone()
+        
+        by_product_type = conn.execute(
+            "SELECT CASE WHEN h.is_valid THEN COALESCE(p.name, 'Unknown') ELSE 'Invalid' END AS kind, "
+            "COUNT(*) FROM validation_history h "
+            f"LEFT JOIN product_types p ON p.digit = h.upc_code / {_FIRST_DIGIT_DIVISOR} "
+            f"{where}GROUP BY kind ORDER BY COUNT(*) DESC",
+            params
+        ).fetchall()
+        
+        by_day = conn.execute(
+            "SELECT date(h.timestamp, 'unixepoch', 'localtime') AS day, "
+            "SUM(h.is_valid), COUNT(*) - SUM(h.is_valid) "
+            f"FROM validation_history h {where}GROUP BY day ORDER BY day DESC",
+            params
+        ).fetchall()
+        
+        return {
+            'total': total,
+            'valid': valid,
+            'invalid': total - valid,
+            'by_product_type': by_product_type,
+            'by_day': by_day,
+        }
+    
+    def export_pdf(self, path, summary_only=False, progress=None, cancel_event=None,
+                   page_size=DEFAULT_PAGE_SIZE, max_detail_rows=PDF_MAX_DETAIL_ROWS, **filters):
+        """
+        Write a PDF history report, streaming rows from SQLite page by page.
+        
+        The report starts with SQL-aggregated summaries (counts per product
+        type, valid/invalid per day). Unless summary_only is set, the rows
+        follow, drawn one PDF page at a time with a single text object per
+        page. reportlab holds the drawn pages until the file is saved, so
+        memory grows with the rows drawn; ranges over max_detail_rows get
+        the summary only, with a note pointing to CSV export.
+        progress(rows_drawn, total_rows) is called after each PDF page
+        and cancel_event aborts without writing the file.
+        Returns the number of rows drawn, or None if cancelled.
+        """
+        if not PDF_AVAILABLE:
+            raise RuntimeError("PDF export requires reportlab (pip install reportlab)")
+        
+        summary = self.summary(**filters)
+        too_many = not summary_only and summary['total'] > max_detail_rows
+        summary_only = summary_only or too_many
+        total = 0 if summary_only else summary['total']
+        
+        c = canvas.Canvas(path, pagesize=letter, pageCompression=1)
+        width, height = letter
+        top = height - 1*inch
+        line_height = 0.2*inch
+        
+        # Title and metadata
+        c.setFont("Helvetica-Bold", 16)
+        c.drawString(1*inch, top, "UPC Validation History Report")
+        c.setFont("Helvetica", 10)
+        c.drawString(1*inch, top - 0.3*inch, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        c.drawString(
+            1*inch, top - 0.5*inch,
+            f"Total Records: {summary['total']}   Valid: {summary['valid']}   Invalid: {summary['invalid']}"
+        )
+        if too_many:
+            c.drawString(
+                1*inch, top - 0.7*inch,
+                f"Row detail omitted (over {max_detail_rows:,} records); use CSV export for every row"
+            )
+        
+        # Summary sections as (font, columns) lines
+        lines = [("Helvetica-Bold", [(1, "Product Type"), (4, "Count")])]
+        lines += [("Helvetica", [(1, name), (4, str(count))]) for name, count in summary['by_product_type']]
+        lines.append(None)
+        lines.append(("Helvetica-Bold", [(1, "Day"), (2.5, "Valid"), (3.5, "Invalid"), (4.5, "Valid Rate")]))
+        for day, valid, invalid in summary['by_day']:
+            rate = valid / (valid + invalid) * 100 if valid + invalid else 0.0
+            lines.append(("Helvetica", [(1, day or ''), (2.5, str(valid)), (3.5, str(invalid)), (4.5, f"{rate:.1f}%")]))
+        
+        y = top - 1*inch
+        for line in lines:
+            if y < 1*inch:
+                c.showPage()
+                y = top
+            if line is not None:
+                font, columns = line
+                c.setFont(font, 10 if font.endswith('Bold') else 9)
+                for x, text in columns:
+                    c.drawString(x*inch, y, text)
+            y -= line_height
+        
+        drawn = 0
+        if not summary_only:
+            rows_per_page = int((top - 1*inch) / line_height)
+            page_rows = []
+            
+            def draw_page(rows):
+                c.showPage()
+                c.setFont("Helvetica-Bold", 10)
+                for x, heading in ((1, "UPC Code"), (2.5, "Valid"), (3.5, "Product Type"), (5, "Timestamp")):
+                    c.drawString(x*inch, top, heading)
+                
+                text = c.beginText()
+                text.setFont("Helvetica", 9)
+                y = top - line_height
+                for row in rows:
+                    timestamp = datetime.fromtimestamp(row.timestamp).strftime('%Y-%m-%d %H:%M')
+                    for x, value in ((1, row.upc_code), (2.5, "Yes" if row.is_valid else "No"),
+                                     (3.5, row.product_type or "N/A"), (5, timestamp)):
+                        text.setTextOrigin(x*inch, y)
+                        text.textOut(value)
+                    y -= line_height
+                c.drawText(text)
+            
+            for row in self.iter_rows(page_size=page_size, **filters):
+                page_rows.append(row)
+                if len(page_rows) == rows_per_page:
+                    draw_page(page_rows)
+                    drawn += len(page_rows)
+                    page_rows = []
+                    if progress:
+                        progress(drawn, total)
+                    if cancel_event is not None and cancel_event.is_set():
+                        return None
+            
+            if page_rows:
+                draw_page(page_rows)
+                drawn += len(page_rows)
+                if progress:
+                    progress(drawn, total)
+        
+        c.save()
+        return drawn
+    
+    def _expired_where(self, max_age=None, max_rows=None, now=None):
+        """
+        Build the WHERE clause selecting rows outside the retention limits,
+        or return None if no row is.
+        max_rows keeps the newest rows by id; max_age filters on the indexed
+        timestamp column, since ids don't follow timestamps (migrated rows
+        with unparseable dates get epoch 0, and the clock can step back).
+        """
+        self.flush()
+        conn = self.connection()
+        clauses = []
+        params = []
+        
+        if max_age is not None:
+            now = time.time() if now is None else now
+            clauses.append('timestamp < ?')
+            params.append(int(now - max_age))
+        if max_rows is not None:
+            row = conn.execute(
+                'SELECT id FROM validation_history ORDER BY id DESC LIMIT 1 OFFSET ?',
+                (max_rows,)
+            ).fetchone()
+            if row:
+                clauses.append('id <= ?')
+                params.append(row[0])
+        
+        if not clauses:
+            return None
+        return ' OR '.join(clauses), params
+    
+    def archive_expired(self, max_age=None, max_rows=None, archive_dir=None, now=None,
+                        cancel_event=None, batch_size=EXPORT_BATCH_SIZE):
+        """
+        Move rows outside the retention limits into a gzip CSV archive.
+        
+        Limits default to the store's max_age/max_rows. Expired rows are
+        streamed in id order into archive_dir/history_<first>-<last>.csv.gz
+        (ids, original UPC text, validity and epoch timestamps, so nothing is
+        lost), and the file is completed and renamed into place before the
+        rows are deleted in batched transactions. A crash in between leaves
+        rows in both places, never in neither. cancel_event aborts before
+        anything is deleted.
+        Returns (rows archived, archive path), or (0, None) if nothing expired.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        max_rows = self.max_rows if max_rows is None else max_rows
+        archive_dir = archive_dir or self.archive_dir
+        
+        where = self._expired_where(max_age, max_rows, now)
+        if where is None:
+            return 0, None
+        clause, params = where
+        
+        conn = self.connection()
+        os.makedirs(archive_dir, exist_ok=True)
+        tmp_path = os.path.join(archive_dir, 'history_archive.csv.gz.tmp')
+        
+        cursor = conn.execute(
+            "SELECT id, COALESCE(upc_text, printf('%012d', upc_code)), is_valid, timestamp "
+            f"FROM validation_history WHERE {clause} ORDER BY id",
+            params
+        )
+        archived = 0
+        first_id = last_id = None
+        cancelled = False
+        try:
+            with gzip.open(tmp_path, 'wt', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['ID', 'UPC Code', 'Valid', 'Timestamp'])
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+                    archived += len(rows)
+                    if first_id is None:
+                        first_id = rows[0][0]
+                    last_id = rows[-1][0]
+                    if cancel_event is not None and cancel_event.is_set():
+                        cancelled = True
+                        break
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        finally:
+            cursor.close()
+        
+        if cancelled or not archived:
+            os.remove(tmp_path)
+            return 0, None
+        path = os.path.join(archive_dir, f'history_{first_id:012d}-{last_id:012d}.csv.gz')
+        os.replace(tmp_path, path)
+        
+        # Short delete transactions so the UI thread's writes aren't blocked for long;
+        # bounded by the last archived id so rows added meanwhile are never deleted
+        while True:
+            with conn:
+                deleted = conn.execute(
+                    'DELETE FROM validation_history WHERE id IN '
+                    f'(SELECT id FROM validation_history WHERE id <= ? AND ({clause}) ORDER BY id LIMIT ?)',
+                    (last_id, *params, batch_size)
+                ).rowcount
+            if deleted < batch_size:
+                break
+        return archived, path
+    
+    def compact(self, pages=DEFAULT_VACUUM_PAGES):
+        """
+        Return up to pages free pages to the filesystem (incremental vacuum).
+        Each step is short, so it can run in the background while the UI
+        writes. Returns the number of pages freed.
+        """
+        conn = self.connection()
+        freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        
+        if freelist:
+            # executescript steps the pragma to completion (execute() frees one page)
+            conn.executescript(f'PRAGMA incremental_vacuum({int(pages)})')
+        return freelist - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    
+    def maintain(self, cancel_event=None, vacuum_pages=DEFAULT_VACUUM_PAGES, now=None):
+        """
+        Apply the store's retention limits, then run one incremental vacuum step.
+        Meant to be called periodically from a background thread.
+        Returns a dict with the rows archived, the archive path and pages freed.
+        """
+        archived, path = self.archive_expired(now=now, cancel_event=cancel_event)
+        pages_freed = 0
+        if cancel_event is None or not cancel_event.is_set():
+            pages_freed = self.compact(vacuum_pages)
+        return {'archived': archived, 'archive_path': path, 'pages_freed': pages_freed}
+    
+    def clear(self):
+        """Delete all validation history, including buffered rows."""
+        with self._pending_lock:
+            self._pending = []
+        conn = self.connection()
+        conn.execute('DELETE FROM validation_history')
+        conn.commit()
+    
+    def close(self):
+        """Flush buffered rows and close every pooled connection."""
+        self.flush()
+        try:
+            # Let SQLite refresh planner statistics for the indexes if needed
+            self.connection().execute('PRAGMA optimize')
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
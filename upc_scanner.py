@@ -0,0 +1,663 @@
+"""
+UPC Validator Scanner Module
+Barcode decoding for camera frames without GUI dependencies
+Frames are converted to grayscale, optionally downsampled and decoded only
+every Nth frame; after a hit, decoding is limited to a region of interest
+around the barcode's last position
+Live scanning runs as a capture -> decode pool -> display pipeline connected
+by latest-frame-wins queues, with per-stage latency metrics
+Continuous scanning reports each UPC once per hold-off window
+Offline mode decodes image folders and video files across a process pool
+"""
+
+import csv
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from upc_gtin import normalize_scanned, upca_from_gtin, validate_gtin
+
+# Optional imports with error handling
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+try:
+    from pyzbar import pyzbar
+    from pyzbar.pyzbar import ZBarSymbol
+    PYZBAR_AVAILABLE = True
+except ImportError:
+    PYZBAR_AVAILABLE = False
+
+# Decode one frame in this many (1 = every frame)
+DEFAULT_DECODE_EVERY = 2
+
+# Frames wider than this are downsampled before full-frame decoding (None = never)
+DEFAULT_MAX_WIDTH = 640
+
+# Pixels added around the last barcode polygon to form the region of interest
+DEFAULT_ROI_MARGIN = 48
+
+# Symbologies zbar looks for (restricting them makes decoding cheaper):
+# the GTIN family, which upc_gtin validates and normalizes
+UPC_SYMBOLS = ('UPCA', 'UPCE', 'EAN13', 'EAN8')
+
+# Decode worker threads (zbar releases the GIL while decoding)
+DEFAULT_DECODE_WORKERS = 2
+
+# Continuous scanning: a UPC is reported again only after this many seconds out of view
+DEFAULT_HOLD_OFF = 3.0
+
+# Offline decoding: images per worker task, video frames per worker range
+OFFLINE_IMAGE_BATCH = 16
+OFFLINE_VIDEO_RANGE = 256
+
+# A UPC seen again within this many frames of its last sighting is the same item
+DEFAULT_DEDUPE_GAP = 15
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+
+
+# One decoded barcode; polygon is a tuple of (x, y) points in frame pixels
+Detection = namedtuple('Detection', ['data', 'type', 'polygon'])
+
+# One validated offline hit; frame is the video frame index (0 for images)
+OfflineHit = namedtuple('OfflineHit', ['source', 'frame', 'upc_code', 'symbology', 'is_valid', 'error'])
+
+
+def upc_from_detection(detection):
+    """
+    Return the UPC-A text for a decoded barcode where it has one.
+    zbar reports UPC-A symbols as EAN-13 with a leading 0 and UPC-E in its
+    8-digit compressed form; both become the 12-digit UPC-A. Other GTINs
+    (EAN-8, EAN-13) and unreadable data are returned unchanged.
+    """
+    gtin14 = normalize_scanned(detection.data, detection.type)
+    return (upca_from_gtin(gtin14) if gtin14 else None) or detection.data
+
+
+def zbar_decoder(symbols=UPC_SYMBOLS):
+    """Return a decode(image) function using pyzbar, limited to the given symbologies."""
+    zbar_symbols = [getattr(ZBarSymbol, symbol) for symbol in symbols] if symbols else None
+    
+    def decode(image):
+        return pyzbar.decode(image, symbols=zbar_symbols)
+    return decode
+
+
+class FrameDecoder:
+    """
+    Decode barcodes from a stream of camera frames.
+    
+    Only every decode_every-th frame is decoded; the others return None so
+    the caller can still display them. Decoded frames are converted to
+    grayscale. While a barcode was seen on the last decoded frame, only the
+    region around its polygon (plus roi_margin pixels) is decoded at full
+    resolution; otherwise, or if the region yields nothing, the whole frame
+    is decoded after downsampling to at most max_width pixels. Detection
+    polygons are always mapped back to full-frame coordinates.
+    
+    decode(image) must return objects with data (bytes), type and polygon
+    (points with x/y) like pyzbar.decode, which is the default.
+    """
+    
+    def __init__(self, decode_every=DEFAULT_DECODE_EVERY, max_width=DEFAULT_MAX_WIDTH,
+                 roi_margin=DEFAULT_ROI_MARGIN, track_roi=True, symbols=UPC_SYMBOLS, decode=None):
+        self.decode_every = max(1, decode_every)
+        self.max_width = max_width
+        self.roi_margin = roi_margin
+        self.track_roi = track_roi
+        self._decode = decode or zbar_decoder(symbols)
+        self._lock = threading.Lock()
+        self.roi = None    # (x0, y0, x1, y1) in frame pixels
+        self.reset_stats()
+    
+    def reset_stats(self):
+        self.frames = 0
+        self.decoded = 0
+        self.roi_decodes = 0
+        self.roi_hits = 0
+        self.decode_seconds = 0.0
+    
+    def process(self, frame):
+        """Return a list of Detections for frame, or None if the frame was skipped."""
+        self.frames += 1
+        if (self.frames - 1) % self.decode_every:
+            return None
+        return self.decode(frame)
+    
+    def decode(self, frame):
+        """
+        Decode one frame unconditionally and return its Detections.
+        Safe to call from several threads (they share the ROI and counters).
+        """
+        started = time.perf_counter()
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        roi = self.roi
+        
+        detections = []
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            detections = self._decode_region(gray[y0:y1, x0:x1], x0, y0, 1.0)
+        roi_hit = bool(detections)
+        
+        if not detections:
+            height, width = gray.shape[:2]
+            image, scale = gray, 1.0
+            if self.max_width and width > self.max_width:
+                scale = self.max_width / width
+                image = cv2.resize(gray, (self.max_width, max(1, round(height * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            detections = self._decode_region(image, 0, 0, scale)
+        
+        with self._lock:
+            self.decoded += 1
+            if roi is not None:
+                self.roi_decodes += 1
+                self.roi_hits += roi_hit
+            self.roi = self._roi_around(detections, gray.shape) if self.track_roi else None
+            self.decode_seconds += time.perf_counter() - started
+        return detections
+    
+    def _decode_region(self, image, x_offset, y_offset, scale):
+        """Decode image and map polygons back to full-frame coordinates."""
+        detections = []
+        for symbol in self._decode(image):
+            polygon = tuple(
+                (round(point.x / scale) + x_offset, round(point.y / scale) + y_offset)
+                for point in symbol.polygon
+            )
+            data = symbol.data.decode('utf-8', 'replace') if isinstance(symbol.data, bytes) else symbol.data
+            detections.append(Detection(data, symbol.type, polygon))
+        return detections
+    
+    def _roi_around(self, detections, shape):
+        """Bounding box of all detection polygons plus the margin, clamped to the frame."""
+        points = [point for detection in detections for point in detection.polygon]
+        if not points:
+            return None
+        
+        height, width = shape[:2]
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        return (
+            max(0, min(xs) - self.roi_margin),
+            max(0, min(ys) - self.roi_margin),
+            min(width, max(xs) + self.roi_margin + 1),
+            min(height, max(ys) + self.roi_margin + 1),
+        )
+    
+    @property
+    def skip_rate(self):
+        frames = max(self.frames, self.decoded)
+        return 1 - self.decoded / frames if frames else 0.0
+    
+    def stats(self):
+        """Return a snapshot of the decoding counters."""
+        return {
+            'frames': self.frames,
+            'decoded': self.decoded,
+            'skip_rate': self.skip_rate,
+            'roi_decodes': self.roi_decodes,
+            'roi_hits': self.roi_hits,
+            'avg_decode_ms': self.decode_seconds / self.decoded * 1000 if self.decoded else 0.0,
+        }
+
+
+class LatestFrameQueue:
+    """
+    Bounded queue whose put() never blocks: when full, the oldest item is
+    dropped, so slow consumers always get the freshest frames. get()
+    returns None on timeout or once the queue is closed and drained.
+    """
+    
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+    
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+    
+    def get(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self.closed, timeout)
+            return self._items.popleft() if self._items else None
+    
+    def close(self):
+        """Wake up all consumers; get() returns None once the queue is empty."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+    
+    def __len__(self):
+        return len(self._items)
+
+
+class PipelineMetrics:
+    """Thread-safe latency counters per pipeline stage."""
+    
+    def __init__(self):
+        self._stages = {}    # stage -> [count, total seconds, max seconds]
+        self._lock = threading.Lock()
+    
+    def record(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+    
+    def count(self, stage):
+        entry = self._stages.get(stage)
+        return entry[0] if entry else 0
+    
+    def snapshot(self):
+        """Return {stage: {'count', 'avg_ms', 'max_ms'}}."""
+        with self._lock:
+            return {
+                stage: {'count': count, 'avg_ms': total / count * 1000, 'max_ms': peak * 1000}
+                for stage, (count, total, peak) in self._stages.items()
+            }
+
+
+class ScanDebouncer:
+    """
+    Time-windowed dedupe cache for continuous scanning.
+    accept(upc) is True for a UPC not seen within the last hold_off
+    seconds; every sighting restarts its window, so a barcode held in
+    view is reported once and again only after it has left the frame
+    for hold_off seconds. Expired entries are pruned as codes arrive.
+    """
+    
+    def __init__(self, hold_off=DEFAULT_HOLD_OFF, clock=time.monotonic):
+        self.hold_off = hold_off
+        self.clock = clock
+        self._last_seen = {}
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.suppressed = 0
+    
+    def accept(self, upc):
+        """Record a sighting; return True if the UPC should be reported."""
+        now = self.clock()
+        with self._lock:
+            last = self._last_seen.get(upc)
+            self._last_seen[upc] = now
+            if last is not None and now - last < self.hold_off:
+                self.suppressed += 1
+                return False
+            
+            self.accepted += 1
+            if len(self._last_seen) > 64:
+                self._prune(now)
+            return True
+    
+    def _prune(self, now):
+        expired = [upc for upc, seen in self._last_seen.items() if now - seen >= self.hold_off]
+        for upc in expired:
+            del self._last_seen[upc]
+    
+    def reset(self):
+        with self._lock:
+            self._last_seen.clear()
+    
+    def __len__(self):
+        return len(self._last_seen)
+
+
+def open_camera(source=0, frame_size=None):
+    """Open a cv2.VideoCapture, optionally requesting a (width, height) resolution."""
+    capture = cv2.VideoCapture(source)
+    if frame_size and capture.isOpened():
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, frame_size[0])
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_size[1])
+    return capture
+
+
+class ScannerPipeline:
+    """
+    Live scanning as decoupled stages so a slow decode never stalls capture
+    or the preview:
+        
+        capture thread --> frames (latest wins, 1 slot) --> display loop
+                       +-> decode queue (latest wins, `workers` slots) --> decode workers
+    
+    The capture thread reads frames and queues every decode_every-th one
+    for decoding. Decode worker threads share one FrameDecoder (ROI
+    tracking included); the freshest result is kept in detections and
+    on_detections(frame_index, detections) is called from the worker for
+    every frame with hits. The caller runs the display loop on frames.
+    
+    Metrics: capture (read time), queue_wait (capture to decode start),
+    decode, latency (capture to result) and whatever the display loop
+    records, plus queue depths and dropped frame counts from stats().
+    """
+    
+    def __init__(self, source=0, on_detections=None, workers=DEFAULT_DECODE_WORKERS,
+                 decode_every=DEFAULT_DECODE_EVERY, frame_size=None, capture=None, **decoder_options):
+        self.source = source
+        self.on_detections = on_detections
+        self.workers = max(1, workers)
+        self.decode_every = max(1, decode_every)
+        self.frame_size = frame_size
+        self.capture = capture
+        self.decoder = FrameDecoder(decode_every=1, **decoder_options)
+        self.frames = LatestFrameQueue(1)
+        self.decode_queue = LatestFrameQueue(self.workers)
+        self.metrics = PipelineMetrics()
+        self.detections = []
+        self._detections_index = -1
+        self._detections_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self.captured = 0
+        self.started_at = None
+    
+    def start(self):
+        """Open the capture device and start the capture and decode threads."""
+        if self.capture is None:
+            self.capture = open_camera(self.source, self.frame_size)
+        if not self.capture.isOpened():
+            raise RuntimeError("Could not open webcam")
+        
+        self.started_at = time.perf_counter()
+        self._threads = [threading.Thread(target=self._capture_loop, daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._decode_loop, daemon=True) for _ in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self):
+        """Stop all stages and release the capture device (callable from any thread)."""
+        self._stop.set()
+        current = threading.current_thread()
+        for thread in self._threads:
+            if thread is not current:
+                thread.join()
+    
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+    
+    def _capture_loop(self):
+        index = 0
+        try:
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                ok, frame = self.capture.read()
+                captured_at = time.perf_counter()
+                if not ok:
+                    break
+                self.metrics.record('capture', captured_at - started)
+                self.captured += 1
+                
+                item = (index, captured_at, frame)
+                self.frames.put(item)
+                if index % self.decode_every == 0:
+                    self.decode_queue.put(item)
+                index += 1
+        finally:
+            self.capture.release()
+            self.frames.close()
+            self.decode_queue.close()
+    
+    def _decode_loop(self):
+        while not self._stop.is_set():
+            item = self.decode_queue.get(timeout=0.1)
+            if item is None:
+                if self.decode_queue.closed:
+                    return
+                continue
+            
+            index, captured_at, frame = item
+            started = time.perf_counter()
+            detections = self.decoder.decode(frame)
+            finished = time.perf_counter()
+            self.metrics.record('queue_wait', started - captured_at)
+            self.metrics.record('decode', finished - started)
+            self.metrics.record('latency', finished - captured_at)
+            
+            with self._detections_lock:
+                # Workers can finish out of order; keep the newest frame's result
+                if index > self._detections_index:
+                    self._detections_index = index
+                    self.detections = detections
+            
+            if detections and self.on_detections:
+                self.on_detections(index, detections)
+    
+    def stats(self):
+        """Return per-stage latencies, queue depths, dropped frames and capture fps."""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {
+            'stages': self.metrics.snapshot(),
+            'capture_fps': self.captured / elapsed if elapsed else 0.0,
+            'decode_queue_depth': len(self.decode_queue),
+            'decode_dropped': self.decode_queue.dropped,
+            'display_dropped': self.frames.dropped,
+            'decoder': self.decoder.stats(),
+        }
+
+
+class OfflineDecodeReport(namedtuple('OfflineDecodeReport', ['kind', 'items', 'hits', 'valid', 'errors', 'elapsed'])):
+    """
+    Outcome of decode_offline(). kind is 'images' or 'frames'; items counts
+    the images or video frames decoded; errors lists (source, reason) for
+    unreadable files.
+    """
+    
+    __slots__ = ()
+    
+    @property
+    def rate(self):
+        """Images or frames decoded per second."""
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+
+def _offline_decoder(decoder_options):
+    # Each image/frame stands alone: no ROI carried over between them
+    return FrameDecoder(decode_every=1, track_roi=False, **decoder_options)
+
+
+def _decode_images(paths, decoder_options):
+    """Worker: decode a batch of image files. Returns (path, detections or None, error) tuples."""
+    decoder = _offline_decoder(decoder_options)
+    results = []
+    for path in paths:
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            results.append((path, None, "Unreadable image"))
+            continue
+        try:
+            results.append((path, decoder.decode(image), None))
+        except Exception as e:
+            results.append((path, None, str(e) or type(e).__name__))
+    return results
+
+
+def _decode_video_range(path, start, end, step, decoder_options):
+    """
+    Worker: decode every step-th frame in [start, end) of a video (end=None
+    reads to the end). Returns (frame index, detections) tuples.
+    """
+    decoder = _offline_decoder(decoder_options)
+    capture = cv2.VideoCapture(path)
+    results = []
+    try:
+        if start:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        index = start
+        while end is None or index < end:
+            if index % step:
+                # grab() skips a frame without decoding it into an image
+                if not capture.grab():
+                    break
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                results.append((index, decoder.decode(frame)))
+            index += 1
+    finally:
+        capture.release()
+    return results
+
+
+def _iter_in_order(tasks, workers):
+    """
+    Run (function, args) tasks in a process pool and yield their results in
+    order with at most 2 * workers in flight; workers=1 runs them inline.
+    """
+    if workers == 1:
+        for function, args in tasks:
+            yield function(*args)
+        return
+    
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for function, args in tasks:
+            pending.append(executor.submit(function, *args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Abandoned iteration (e.g. cancel): drop queued tasks before shutdown
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def decode_offline(source, output=None, history=None, workers=None, step=1,
+                   dedupe_gap=DEFAULT_DEDUPE_GAP, progress=None, cancel_event=None,
+                   **decoder_options):
+    """
+    Decode every image in a directory, or the frames of a video file,
+    across a pool of worker processes.
+    
+    Each hit is validated with upc_core and streamed, in source order, to
+    a CSV file at output and/or a HistoryStore (history.add()). In videos a
+    UPC seen again within dedupe_gap frames of its last sighting is
+    reported only once; in images each UPC is reported once per image.
+    step decodes every step-th video frame. Videos with a known frame count
+    are split into frame ranges that each worker seeks to; others are read
+    sequentially. decoder_options go to FrameDecoder (max_width, symbols).
+    progress(done, total) is called per completed task and cancel_event
+    stops early. Returns an OfflineDecodeReport.
+    """
+    if not CV2_AVAILABLE:
+        raise RuntimeError("Offline decoding requires OpenCV (pip install opencv-python)")
+    
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    step = max(1, step)
+    
+    if os.path.isdir(source):
+        kind = 'images'
+        paths = sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        total = len(paths)
+        tasks = [
+            (_decode_images, (paths[i:i + OFFLINE_IMAGE_BATCH], decoder_options))
+            for i in range(0, total, OFFLINE_IMAGE_BATCH)
+        ]
+    else:
+        kind = 'frames'
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            raise RuntimeError(f"Could not open video: {source}")
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        capture.release()
+        
+        if frame_count > 0 and workers > 1:
+            total = frame_count
+            tasks = [
+                (_decode_video_range, (source, start, min(start + OFFLINE_VIDEO_RANGE, frame_count), step,
+                                       decoder_options))
+                for start in range(0, frame_count, OFFLINE_VIDEO_RANGE)
+            ]
+        else:
+            total = max(frame_count, 0)
+            tasks = [(_decode_video_range, (source, 0, None, step, decoder_options))]
+    
+    out = writer = None
+    if output:
+        out = open(output, 'w', newline='', encoding='utf-8')
+        writer = csv.writer(out)
+        writer.writerow(['Source', 'Frame', 'UPC Code', 'Symbology', 'Valid', 'Error'])
+    
+    items = hits = valid = 0
+    errors = []
+    last_seen = {}
+    done = 0
+    
+    def emit(source_name, frame, detections):
+        nonlocal hits, valid
+        for detection in detections:
+            upc = upc_from_detection(detection)
+            previous = last_seen.get(upc)
+            last_seen[upc] = frame
+            if previous is not None and frame - previous <= dedupe_gap:
+                continue
+            
+            result = validate_gtin(upc)
+            hit = OfflineHit(source_name, frame, upc, detection.type, result.is_valid,
+                             '' if result.is_valid else result.error_message)
+            hits += 1
+            valid += hit.is_valid
+            if writer:
+                writer.writerow([hit.source, hit.frame, hit.upc_code, hit.symbology,
+                                 'Yes' if hit.is_valid else 'No', hit.error])
+            if history is not None:
+                history.add(hit.upc_code, hit.is_valid)
+    
+    results = _iter_in_order(tasks, workers)
+    try:
+        for batch in results:
+            if kind == 'images':
+                for path, detections, error in batch:
+                    if error is not None:
+                        errors.append((path, error))
+                        continue
+                    items += 1
+                    # Dedupe within one image only
+                    last_seen.clear()
+                    emit(os.path.basename(path), 0, detections)
+                done += len(batch)
+            else:
+                for index, detections in batch:
+                    items += 1
+                    emit(os.path.basename(source), index, detections)
+                done = max(done, batch[-1][0] + 1 if batch else done)
+            
+            if progress:
+                progress(done, max(total, done))
+            if cancel_event is not None and cancel_event.is_set():
+                break
+    finally:
+        results.close()
+        if out:
+            out.close()
+        if history is not None:
+            history.flush()
+    
+    return OfflineDecodeReport(kind, items, hits, valid, errors, time.perf_counter() - started)
@@ -16,117 +16,78 @@ Features:
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, scrolledtext
+from tkinter import ttk, messagebox, filedialog, scrolledtext, simpledialog
 import re
-import csv
-import sqlite3
 import os
-import io
 from datetime import datetime
 from pathlib import Path
 import threading
 import time
+import queue
 
 # Optional imports with error handling
 try:
-    from PIL import Image, ImageTk
+    from PIL import ImageTk
     PIL_AVAILABLE = True
 except ImportError:
     PIL_AVAILABLE = False
 
-try:
-    import barcode
-    from barcode.writer import ImageWriter
-    BARCODE_AVAILABLE = True
-except ImportError:
-    BARCODE_AVAILABLE = False
-
 try:
     import cv2
+    import numpy as np    # OpenCV frames are NumPy arrays
     CV2_AVAILABLE = True
 except ImportError:
     CV2_AVAILABLE = False
 
-try:
-    from pyzbar import pyzbar
-    PYZBAR_AVAILABLE = True
-except ImportError:
-    PYZBAR_AVAILABLE = False
-
-try:
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.units import inch
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-
 # Import core UPC validation logic
-from upc_core import UPCValidator
-
-
-class BarcodeGenerator:
-    """
-    Generate barcode images for valid UPC codes.
-    Uses python-barcode library to create UPC-A barcode images.
-    """
-    
-    def __init__(self):
-        self.last_image = None
-    
-    def generate(self, upc_code, output_path=None):
-        """
-        Generate barcode image for UPC code.
-        Returns PIL Image object or None if generation fails.
-        """
-        if not BARCODE_AVAILABLE or not PIL_AVAILABLE:
-            return None
-        
-        try:
-            # Create UPC-A barcode
-            upc_class = barcode.get_barcode_class('upca')
-            
-            # UPC-A expects 11 digits (adds check digit automatically)
-            # But our UPC already has check digit, so we use it as-is
-            upc_instance = upc_class(upc_code[:-1], writer=ImageWriter())
-            
-            # Generate to buffer
-            buffer = io.BytesIO()
-            upc_instance.write(buffer, options={
-                'module_width': 0.3,
-                'module_height': 10.0,
-                'quiet_zone': 6.5,
-                'font_size': 8,
-                'text_distance': 3
-            })
-            
-            # Load image from buffer
-            buffer.seek(0)
-            image = Image.open(buffer)
-            self.last_image = image
-            
-            # Save to file if path provided
-            if output_path:
-                image.save(output_path)
-            
-            return image
-            
-        except Exception as e:
-            print(f"Error generating barcode: {e}")
-            return None
+from upc_core import (
+    BatchResultStore, UPCValidator, ValidationStats, iter_validate_file, iter_validate_file_parallel,
+    UPCError, count_completions, solve_missing_digits, suggest_corrections, write_corrections,
+    DEFAULT_PARALLEL_CHUNK_SIZE
+)
+from upc_gtin import GTIN_LENGTHS, compress_upca, describe_gtin, validate_gtin
+from upc_history import PDF_AVAILABLE, PDF_MAX_DETAIL_ROWS, HistoryStore
+from upc_scanner import (
+    DEFAULT_DECODE_EVERY, DEFAULT_DECODE_WORKERS, DEFAULT_HOLD_OFF, DEFAULT_MAX_WIDTH,
+    DEFAULT_ROI_MARGIN, PYZBAR_AVAILABLE, UPC_SYMBOLS, ScanDebouncer, ScannerPipeline,
+    decode_offline, upc_from_detection
+)
+from upc_barcode import (
+    DEFAULT_SHEET_COLUMNS, DEFAULT_SHEET_ROWS, VECTOR_FORMATS, BarcodeGenerator, generate_batch
+)
 
 
 class BarcodeScanner:
     """
     Scan barcodes using webcam with OpenCV and pyzbar.
     Runs in separate thread to avoid blocking UI.
+    Capture, decoding (a small pool of worker threads) and the preview
+    window are separate ScannerPipeline stages, so a slow decode never
+    stalls the preview; the overlay shows per-stage timings.
+    In continuous mode the camera stays open and every distinct valid UPC
+    is reported once per hold-off window; otherwise scanning stops after
+    the first UPC. Results are posted to self.results as ('scan', upc),
+    ('error', message) and finally ('stopped', None), for the UI to poll
+    with root.after().
     """
     
-    def __init__(self, callback=None):
-        self.callback = callback
+    def __init__(self, results=None, continuous=True, hold_off=DEFAULT_HOLD_OFF,
+                 decode_every=DEFAULT_DECODE_EVERY, max_width=DEFAULT_MAX_WIDTH,
+                 roi_margin=DEFAULT_ROI_MARGIN, frame_size=None, workers=DEFAULT_DECODE_WORKERS):
+        self.results = results if results is not None else queue.Queue()
+        self.continuous = continuous
+        self.debouncer = ScanDebouncer(hold_off)
         self.running = False
         self.thread = None
-        self.cap = None
+        self.pipeline = None
+        self.frame_size = frame_size
+        self.workers = workers
+        self.decoder_options = {
+            'decode_every': decode_every,
+            'max_width': max_width,
+            'roi_margin': roi_margin,
+        }
+        self._lock = threading.Lock()
     
     def start(self):
         """Start webcam scanning in separate thread."""
@@ -139,55 +100,86 @@ class BarcodeScanner:
             return False
         
         self.running = True
+        self.debouncer.reset()
         self.thread = threading.Thread(target=self._scan_loop, daemon=True)
         self.thread.start()
         return True
     
     def stop(self):
-        """Stop webcam scanning."""
+        """Stop webcam scanning (the display loop shuts the pipeline down)."""
         self.running = False
-        if self.cap:
-            self.cap.release()
-            self.cap = None
-        cv2.destroyAllWindows()
+    
+    def stats(self):
+        """Pipeline metrics of the current or last scan, or None."""
+        return self.pipeline.stats() if self.pipeline else None
+    
+    def _on_detections(self, index, detections):
+        """Decode worker callback: post new UPCs to the result queue."""
+        for detection in detections:
+            # Check if it's a UPC
+            if detection.type not in UPC_SYMBOLS:
+                continue
+            upc = upc_from_detection(detection)
+            
+            if self.continuous:
+                # Misreads are dropped and a code in view is reported once
+                if not validate_gtin(upc).is_valid or not self.debouncer.accept(upc):
+                    continue
+            else:
+                with self._lock:
+                    if not self.running:
+                        return
+                    self.running = False
+            
+            self.results.put(('scan', upc))
+            if not self.continuous:
+                return
+    
+    def _draw_overlay(self, frame):
+        """Draw the latest barcode outlines and per-stage timings onto a preview frame."""
+        for detection in self.pipeline.detections:
+            if len(detection.polygon) == 4:
+                pts = np.array(detection.polygon, dtype=np.int32)
+                cv2.polylines(frame, [cv2.convexHull(pts)], True, (0, 255, 0), 2)
+        
+        stats = self.pipeline.stats()
+        stages = stats['stages']
+        text = (
+            f"{stats['capture_fps']:.0f} fps  "
+            f"decode {stages.get('decode', {}).get('avg_ms', 0):.0f} ms  "
+            f"latency {stages.get('latency', {}).get('avg_ms', 0):.0f} ms  "
+            f"queue {stats['decode_queue_depth']}  dropped {stats['decode_dropped']}"
+        )
+        cv2.putText(frame, text, (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+        if self.continuous:
+            cv2.putText(frame, f"scanned {self.debouncer.accepted}  (ESC to stop)", (10, 40),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
     
     def _scan_loop(self):
-        """Main scanning loop running in separate thread."""
+        """Display loop running in separate thread; capture and decoding run in the pipeline."""
         try:
-            self.cap = cv2.VideoCapture(0)
-            
-            if not self.cap.isOpened():
-                if self.callback:
-                    self.callback(None, "Could not open webcam")
+            self.pipeline = ScannerPipeline(
+                on_detections=self._on_detections,
+                workers=self.workers,
+                frame_size=self.frame_size,
+                **self.decoder_options
+            )
+            try:
+                self.pipeline.start()
+            except RuntimeError as e:
+                self.results.put(('error', str(e)))
                 return
             
             while self.running:
-                ret, frame = self.cap.read()
-                if not ret:
-                    break
-                
-                # Decode barcodes in frame
-                barcodes = pyzbar.decode(frame)
+                item = self.pipeline.frames.get(timeout=0.5)
+                if item is None:
+                    if self.pipeline.frames.closed:
+                        break
+                    continue
                 
-                for barcode_obj in barcodes:
-                    # Extract barcode data
-                    barcode_data = barcode_obj.data.decode('utf-8')
-                    barcode_type = barcode_obj.type
-                    
-                    # Check if it's a UPC
-                    if barcode_type in ['UPCA', 'EAN13'] and len(barcode_data) >= 12:
-                        # Get 12-digit UPC
-                        upc = barcode_data[:12]
-                        if self.callback:
-                            self.callback(upc, None)
-                        self.stop()
-                        return
-                    
-                    # Draw rectangle around barcode
-                    points = barcode_obj.polygon
-                    if len(points) == 4:
-                        pts = [(p.x, p.y) for p in points]
-                        cv2.polylines(frame, [cv2.convexHull(cv2.UMat(pts))], True, (0, 255, 0), 2)
+                started = time.perf_counter()
+                _, _, frame = item
+                self._draw_overlay(frame)
                 
                 # Display frame
                 cv2.imshow('UPC Scanner - Position barcode in view', frame)
@@ -195,16 +187,276 @@ class BarcodeScanner:
                 # Check for ESC key to exit
                 if cv2.waitKey(1) & 0xFF == 27:
                     break
-            
+                self.pipeline.metrics.record('display', time.perf_counter() - started)
+        
         except Exception as e:
-            if self.callback:
-                self.callback(None, f"Scanner error: {e}")
+            self.results.put(('error', f"Scanner error: {e}"))
         finally:
-            if self.cap:
-                self.cap.release()
+            self.running = False
+            if self.pipeline:
+                self.pipeline.stop()
+            self.results.put(('stopped', None))
             cv2.destroyAllWindows()
 
 
+class BackgroundTask:
+    """
+    Run a long operation (export, report) in a background thread.
+    The function is called as func(progress, cancel_event); the latest
+    progress(done, total) values and the final outcome are picked up by
+    the UI, which polls with root.after(). cleanup() runs on the worker
+    thread when it finishes, e.g. to release its history connection.
+    """
+    
+    def __init__(self, func, cleanup=None):
+        self.func = func
+        self.cleanup = cleanup
+        self.queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+        self.done = 0
+        self.total = 0
+    
+    def start(self):
+        """Start the task in a separate thread."""
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def cancel(self):
+        """Request cancellation; the function checks cancel_event between blocks."""
+        self.cancel_event.set()
+    
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+    
+    def progress(self, done, total):
+        """Progress callback handed to the task function."""
+        self.done = done
+        self.total = total
+    
+    def _run(self):
+        try:
+            result = self.func(self.progress, self.cancel_event)
+            self.queue.put(('cancelled' if self.cancel_event.is_set() else 'done', result))
+        except Exception as e:
+            self.queue.put(('error', str(e)))
+        finally:
+            if self.cleanup:
+                self.cleanup()
+
+
+class BatchValidationJob:
+    """
+    Validate a file in a background thread.
+    Results accumulate in self.results and progress events are posted to
+    self.queue so the UI can poll them with root.after(). With invalid_only
+    (the default) only rejected codes are kept and valid ones are just
+    counted in self.stats, so memory follows the rejects, not the file size.
+    """
+    
+    def __init__(self, file_path, workers=1, chunk_size=DEFAULT_PARALLEL_CHUNK_SIZE,
+                 parallel_threshold=None, invalid_only=True):
+        self.file_path = file_path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.parallel_threshold = parallel_threshold
+        self.invalid_only = invalid_only
+        self.stats = ValidationStats()
+        self.results = BatchResultStore()
+        self.queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+        self.start_time = None
+        self.end_time = None
+    
+    def start(self):
+        """Start validation in a separate thread."""
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def cancel(self):
+        """Request cancellation; the worker stops after the current chunk."""
+        self.cancel_event.set()
+    
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+    
+    @property
+    def throughput(self):
+        """Validated codes per second so far."""
+        end = self.end_time or time.perf_counter()
+        elapsed = end - (self.start_time or end)
+        return self.stats.total / elapsed if elapsed > 0 else 0.0
+    
+    def _run(self):
+        """Worker loop: stream chunks and report progress."""
+        chunks = None
+        try:
+            use_parallel = (
+                self.workers > 1 and self.parallel_threshold is not None
+                and os.path.getsize(self.file_path) > self.parallel_threshold
+            )
+            if use_parallel:
+                chunks = iter_validate_file_parallel(
+                    self.file_path,
+                    workers=self.workers,
+                    chunk_size=self.chunk_size,
+                    stats=self.stats,
+                    invalid_only=self.invalid_only
+                )
+            else:
+                chunks = iter_validate_file(self.file_path, stats=self.stats, invalid_only=self.invalid_only)
+            
+            for chunk in chunks:
+                self.results.extend(chunk)
+                self.queue.put(('progress', None))
+                if self.cancel_event.is_set():
+                    self.queue.put(('cancelled', None))
+                    return
+            
+            self.queue.put(('done', None))
+        except Exception as e:
+            self.queue.put(('error', str(e)))
+        finally:
+            if chunks is not None:
+                chunks.close()
+            self.end_time = time.perf_counter()
+
+
+class VirtualResultView:
+    """
+    Virtualized table over a BatchResultStore.
+    A fixed set of Treeview rows is reused and refilled from the store as the
+    user scrolls, so opening a million-row result costs the same as ten rows.
+    Filtering and sorting only swap the index array being displayed.
+    """
+    
+    COLUMNS = (
+        ('row', '#', 70),
+        ('upc', 'UPC Code', 130),
+        ('status', 'Status', 90),
+        ('product_type', 'Details', 360),
+    )
+    
+    def __init__(self, parent, store, page_size=20):
+        self.store = store
+        self.rows = None            # None = every row in file order (grows live)
+        self.offset = 0
+        self.sort_key = 'row'
+        self.sort_reverse = False
+        self.invalid_only = False
+        self.product_digit = None
+        
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(
+            self.frame,
+            columns=[c[0] for c in self.COLUMNS],
+            show='headings',
+            selectmode='browse',
+            height=page_size
+        )
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=width, stretch=(column == 'product_type'))
+        
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.items = []
+        self._resize_items(page_size)
+        
+        self.tree.bind('<Configure>', self._on_configure)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.render()
+    
+    def _resize_items(self, count):
+        """Keep exactly count reusable Treeview rows."""
+        while len(self.items) < count:
+            self.items.append(self.tree.insert('', tk.END, values=()))
+        while len(self.items) > count:
+            self.tree.delete(self.items.pop())
+    
+    def _on_configure(self, event):
+        row_height = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        count = max(1, (event.height - 25) // int(row_height))
+        if count != len(self.items):
+            self._resize_items(count)
+            self.render()
+    
+    def _row_count(self):
+        return len(self.store) if self.rows is None else len(self.rows)
+    
+    def _on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.offset = int(float(amount) * self._row_count())
+            self.render()
+        elif unit == 'pages':
+            self.scroll(int(amount) * len(self.items))
+        else:
+            self.scroll(int(amount))
+    
+    def scroll(self, delta):
+        self.offset += delta
+        self.render()
+    
+    def render(self):
+        """Fill the visible rows from the store and update the scrollbar."""
+        total = self._row_count()
+        visible = len(self.items)
+        self.offset = max(0, min(self.offset, total - visible))
+        
+        for k, item in enumerate(self.items):
+            position = self.offset + k
+            if position >= total:
+                self.tree.item(item, values=('', '', '', ''))
+                continue
+            
+            row = position if self.rows is None else self.rows[position]
+            result = self.store[row]
+            if result.is_valid:
+                values = (row + 1, result.upc_code, "✓ VALID", result.product_type)
+            else:
+                values = (row + 1, result.upc_code, "✗ INVALID", result.error_message)
+            self.tree.item(item, values=values)
+        
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def _rebuild_rows(self):
+        """Recompute the index array for the current filter and sort."""
+        if not self.invalid_only and self.product_digit is None and self.sort_key == 'row' \
+                and not self.sort_reverse:
+            self.rows = None
+        else:
+            rows = self.store.select(self.invalid_only, self.product_digit)
+            self.rows = self.store.sort(rows, self.sort_key, self.sort_reverse)
+        self.offset = 0
+        self.render()
+    
+    def set_filter(self, invalid_only=False, product_digit=None):
+        """Show only invalid rows and/or rows whose code starts with product_digit."""
+        self.invalid_only = invalid_only
+        self.product_digit = product_digit
+        self._rebuild_rows()
+    
+    def sort_by(self, key):
+        """Sort by a column; clicking the same column again reverses the order."""
+        if key == self.sort_key:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_key = key
+            self.sort_reverse = False
+        self._rebuild_rows()
+
+
 class UPCValidatorApp:
     """
     Main application class for UPC Validator.
@@ -230,6 +482,34 @@ class UPCValidatorApp:
         self.history = []
         self.barcode_generator = BarcodeGenerator()
         
+        # Multi-digit solver: completions listed in the details panel
+        self.solver_display_limit = 100
+        
+        # Typo correction: suggestions shown for a failed check digit
+        self.correction_display_limit = 5
+        
+        # Webcam decoding: every Nth frame, downsampled full frames, ROI around the last hit
+        self.scanner_options = {
+            'decode_every': DEFAULT_DECODE_EVERY,
+            'max_width': DEFAULT_MAX_WIDTH,
+            'roi_margin': DEFAULT_ROI_MARGIN,
+            'frame_size': None,    # e.g. (1280, 720) to request a capture resolution
+            'workers': DEFAULT_DECODE_WORKERS,
+            # Keep the camera open and report each UPC once per hold-off window
+            'continuous': True,
+            'hold_off': DEFAULT_HOLD_OFF,
+        }
+        self.scanner_poll_ms = 100
+        
+        # Batch validation: files larger than the threshold use a process pool
+        self.batch_workers = os.cpu_count() or 1
+        self.batch_chunk_size = DEFAULT_PARALLEL_CHUNK_SIZE
+        self.batch_parallel_threshold = 64 << 20
+        self.batch_job = None
+        
+        # Running BackgroundTasks (exports, decoding, maintenance), stopped before exit
+        self.background_tasks = []
+        
         # Color schemes
         self.light_colors = {
             'bg': '#f0f0f0',
@@ -271,25 +551,81 @@ class UPCValidatorApp:
         # Apply initial theme
         self.apply_theme()
         
-        # Load history
+        # Load history and start the periodic write-behind flush and retention
         self.load_history()
+        self.root.after(self.history_flush_ms, self.flush_history)
+        self.root.after(self.history_maintenance_delay_ms, self.maintain_history)
+        
+        # Closing the window goes through exit_app so buffered history is flushed
+        self.root.protocol("WM_DELETE_WINDOW", self.exit_app)
     
     def init_database(self):
         """Initialize SQLite database for history storage."""
         self.db_path = 'upc_history.db'
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS validation_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                upc_code TEXT NOT NULL,
-                is_valid INTEGER NOT NULL,
-                product_type TEXT,
-                timestamp TEXT NOT NULL
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        
+        # Retention: rows older than a year or beyond the newest million are archived
+        self.history_store = self.open_history_store(
+            max_age=365 * 24 * 3600,
+            max_rows=1_000_000,
+            archive_dir='upc_history_archive'
+        )
+        
+        # Write-behind history: flushed every N records or every T milliseconds
+        self.history_limit = 50
+        self.history_flush_ms = 2000
+        
+        # Background archival and incremental vacuum (first run shortly after startup)
+        self.history_maintenance_delay_ms = 30 * 1000
+        self.history_maintenance_ms = 10 * 60 * 1000
+        self.history_maintenance_task = None
+        
+        # Keyset paging state for the history panel (None = newest page)
+        self.history_before_id = None
+        self.history_page_ids = None
+    
+    def open_history_store(self, **options):
+        """
+        Open the history database. Migrating a legacy database can take
+        minutes on a large history, so it runs in a worker thread behind a
+        progress window instead of freezing startup.
+        """
+        if not HistoryStore.needs_upgrade(self.db_path):
+            return HistoryStore(self.db_path, **options)
+        
+        def upgrade(progress, cancel_event):
+            store = HistoryStore(self.db_path, progress=progress, **options)
+            store.release()
+            return store
+        
+        task = BackgroundTask(upgrade)
+        task.start()
+        
+        self.root.withdraw()
+        splash = tk.Toplevel(self.root)
+        splash.title("UPC Validator")
+        splash.geometry("420x120")
+        tk.Label(splash, text="Upgrading history database...", font=('Segoe UI', 11)).pack(pady=(20, 5))
+        progress_bar = ttk.Progressbar(splash, mode='determinate', maximum=1000)
+        progress_bar.pack(fill=tk.X, padx=20, pady=5)
+        status_label = tk.Label(splash, font=('Consolas', 10))
+        status_label.pack(pady=5)
+        # The migration is one transaction and can't be interrupted
+        splash.protocol("WM_DELETE_WINDOW", lambda: None)
+        
+        # The main window isn't built yet, so pump events here until the worker finishes
+        while task.running:
+            if task.total:
+                progress_bar['value'] = task.done * 1000 / task.total
+                status_label.config(text=f"{task.done:,} / {task.total:,} rows")
+            splash.update()
+            time.sleep(0.05)
+        splash.destroy()
+        self.root.deiconify()
+        
+        kind, payload = task.queue.get()
+        if kind == 'error':
+            raise RuntimeError(f"Failed to upgrade history database: {payload}")
+        return payload
     
     def create_widgets(self):
         """Create all UI widgets."""
@@ -413,6 +749,19 @@ class UPCValidatorApp:
             command=self.batch_validate
         ).pack(side=tk.LEFT, padx=5)
         
+        tk.Button(
+            button_frame,
+            text="🎞 Decode Media",
+            font=('Segoe UI', 10),
+            bg='#8e44ad',
+            fg='white',
+            relief=tk.FLAT,
+            padx=20,
+            pady=8,
+            cursor='hand2',
+            command=self.decode_media
+        ).pack(side=tk.LEFT, padx=5)
+        
         # ===== RESULTS SECTION =====
         results_frame = tk.LabelFrame(
             left_panel,
@@ -471,6 +820,19 @@ class UPCValidatorApp:
             command=self.generate_barcode
         ).pack(pady=5)
         
+        tk.Button(
+            results_frame,
+            text="🏷 Batch Barcode Sheets",
+            font=('Segoe UI', 9),
+            bg='#16a085',
+            fg='white',
+            relief=tk.FLAT,
+            padx=15,
+            pady=5,
+            cursor='hand2',
+            command=self.generate_barcode_batch
+        ).pack(pady=5)
+        
         # ===== RIGHT PANEL (History & Settings) =====
         right_panel = tk.Frame(main_container, bg=self.colors['bg'], width=300)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(5, 0))
@@ -555,6 +917,32 @@ class UPCValidatorApp:
         )
         self.history_listbox.pack(fill=tk.BOTH, expand=True)
         
+        # Keyset paging through older history
+        history_nav = tk.Frame(history_frame, bg=self.colors['frame_bg'])
+        history_nav.pack(fill=tk.X, pady=(5, 0))
+        
+        tk.Button(
+            history_nav,
+            text="◀ Newer",
+            font=('Segoe UI', 8),
+            bg='#7f8c8d',
+            fg='white',
+            relief=tk.FLAT,
+            cursor='hand2',
+            command=self.history_newer
+        ).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 2))
+        
+        tk.Button(
+            history_nav,
+            text="Older ▶",
+            font=('Segoe UI', 8),
+            bg='#7f8c8d',
+            fg='white',
+            relief=tk.FLAT,
+            cursor='hand2',
+            command=self.history_older
+        ).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(2, 0))
+        
         tk.Button(
             history_frame,
             text="🗑 Clear History",
@@ -598,6 +986,16 @@ class UPCValidatorApp:
             self.status_label.config(text="Enter a UPC code to validate", fg=self.colors['fg'])
             return
         
+        # EAN-8, EAN-13 and GTIN-14 codes are accepted as well
+        if len(upc) != 12 and len(upc) in GTIN_LENGTHS:
+            result = validate_gtin(upc)
+            if result.is_valid:
+                self.status_label.config(
+                    text=f"✓ Valid {result.kind} - press Enter for details",
+                    fg=self.colors['valid_fg']
+                )
+                return
+        
         # Show length feedback
         if len(upc) < 12:
             self.status_label.config(
@@ -605,10 +1003,22 @@ class UPCValidatorApp:
                 fg='#f39c12'
             )
         elif len(upc) == 12:
-            self.status_label.config(
-                text="✓ Ready to validate",
-                fg=self.colors['valid_fg']
-            )
+            if UPCValidator.is_valid_fast(upc):
+                self.status_label.config(
+                    text="✓ Valid check digit - press Enter for details",
+                    fg=self.colors['valid_fg']
+                )
+            elif '?' in upc or '_' in upc:
+                solutions = count_completions(upc)
+                self.status_label.config(
+                    text=f"✓ Ready to solve missing digits ({solutions:,} possible)",
+                    fg=self.colors['valid_fg'] if solutions else self.colors['invalid_fg']
+                )
+            else:
+                self.status_label.config(
+                    text="✗ Invalid UPC - press Enter for details",
+                    fg=self.colors['invalid_fg']
+                )
         else:
             self.status_label.config(
                 text=f"⚠ Too long ({len(upc)}/12 digits)",
@@ -628,6 +1038,11 @@ class UPCValidatorApp:
             self.solve_missing()
             return
         
+        # Other GTIN lengths (EAN-8, EAN-13, GTIN-14) go through the GTIN engine
+        if len(upc) != 12 and len(upc) in GTIN_LENGTHS:
+            self.validate_gtin_code(upc)
+            return
+        
         # Validate
         validator = UPCValidator(upc)
         is_valid = validator.validate()
@@ -650,6 +1065,8 @@ Product Type:      {validator.product_type}
 Manufacturer Code: {validator.manufacturer_code}
 Product Code:      {validator.product_code}
 Check Digit:       {validator.check_digit}
+GTIN-14:           00{validator.upc_code}
+UPC-E:             {compress_upca(validator.upc_code) or 'N/A (not compressible)'}
 
 ═══════════════════════════════════════════
 Validation Formula:
@@ -669,7 +1086,7 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 self.root.bell()
             except:
                 pass
-            
+        
         else:
             self.status_label.config(
                 text="✗ INVALID UPC CODE",
@@ -694,30 +1111,122 @@ Please check:
 • Check digit must be correct
             """
             
+            # Likely keying errors, codes seen as valid before ranked first
+            corrections = suggest_corrections(validator.upc_code, known=self.history_store.known_codes)
+            if corrections:
+                details += "\nDid you mean:\n" + "\n".join(
+                    f"  {c.upc_code}  ({self.describe_correction(c)})"
+                    for c in corrections[:self.correction_display_limit]
+                ) + "\n"
+            
             self.details_text.delete(1.0, tk.END)
             self.details_text.insert(1.0, details)
         
         # Save to history
-        self.save_to_history(validator.upc_code, is_valid, validator.product_type)
+        self.save_to_history(validator.upc_code, is_valid)
+    
+    def validate_gtin_code(self, code):
+        """Validate an EAN-8, EAN-13 or GTIN-14 code and show its normalized forms."""
+        result = validate_gtin(code)
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        if result.is_valid:
+            info = describe_gtin(code)
+            self.status_label.config(text=f"✓ VALID {info['kind']} CODE", fg=self.colors['valid_fg'])
+            details = f"""
+╔═══════════════════════════════════════════╗
+║         GTIN CODE DETAILS                 ║
+╚═══════════════════════════════════════════╝
+
+Code:              {result.code}
+Status:            ✓ VALID
+Format:            {info['kind']}
+GTIN-14:           {info['gtin14']}
+UPC-A:             {info['upca'] or 'N/A'}
+UPC-E:             {info['upce'] or 'N/A'}
+Product Type:      {info['product_type'] or 'N/A'}
+Check Digit:       {result.code[-1]}
+
+Timestamp: {timestamp}
+═══════════════════════════════════════════
+            """
+            try:
+                self.root.bell()
+            except:
+                pass
+        else:
+            self.status_label.config(text="✗ INVALID GTIN CODE", fg=self.colors['invalid_fg'])
+            details = f"""
+╔═══════════════════════════════════════════╗
+║         VALIDATION FAILED                 ║
+╚═══════════════════════════════════════════╝
+
+Code:      {result.code}
+Status:    ✗ INVALID
+Error:     {result.error_message}
+
+Timestamp: {timestamp}
+═══════════════════════════════════════════
+            """
+        
+        self.details_text.delete(1.0, tk.END)
+        self.details_text.insert(1.0, details)
+        self.save_to_history(result.code, result.is_valid)
+    
+    def describe_correction(self, correction):
+        """Short human-readable description of a Correction."""
+        position = correction.position + 1
+        if correction.kind == 'transposition':
+            text = f"digits {position} and {position + 1} swapped"
+        else:
+            text = f"digit {position} mistyped"
+        return text + (", previously scanned" if correction.known else "")
     
     def solve_missing(self):
-        """Solve for missing digit in UPC."""
+        """Solve for missing digits in UPC."""
         upc = self.upc_entry.get().strip()
         
         if len(upc) != 12:
-            messagebox.showerror("Error", "UPC must be exactly 12 characters with one '?' or '_'")
+            messagebox.showerror("Error", "UPC must be exactly 12 characters with '?' or '_' for unknown digits")
             return
         
-        validator = UPCValidator(upc)
-        solved_upc = validator.solve_missing_digit()
+        prefix = None
+        total = count_completions(upc)
+        if total > 1:
+            # Several unknowns: the known leading digits narrow the solutions down
+            prefix = simpledialog.askstring(
+                "Manufacturer Prefix",
+                f"{total:,} valid UPCs match this pattern.\n\n"
+                "Enter the known leading digits (e.g. the manufacturer prefix)\n"
+                "to narrow them down, or leave blank to list them all:",
+                parent=self.root
+            )
+            if prefix is None:
+                return
+            total = count_completions(upc, prefix)
+        
+        solutions = solve_missing_digits(upc, prefix, limit=self.solver_display_limit)
+        if not solutions:
+            messagebox.showerror("Error", "Could not solve for missing digits.\nNo valid solution found.")
+            return
         
-        if solved_upc:
+        if total == 1:
+            solved_upc = solutions[0]
             self.upc_entry.delete(0, tk.END)
             self.upc_entry.insert(0, solved_upc)
             messagebox.showinfo("Success", f"Missing digit solved!\nComplete UPC: {solved_upc}")
             self.validate_upc()
-        else:
-            messagebox.showerror("Error", "Could not solve for missing digit.\nNo valid solution found.")
+            return
+        
+        shown = f" (first {len(solutions):,} shown)" if total > len(solutions) else ""
+        self.status_label.config(text=f"{total:,} POSSIBLE UPC CODES", fg=self.colors['fg'])
+        self.details_text.delete(1.0, tk.END)
+        self.details_text.insert(1.0, (
+            f"Pattern: {upc}\n"
+            + (f"Prefix:  {prefix}\n" if prefix else "")
+            + f"{total:,} valid completions{shown}:\n\n"
+            + "\n".join(solutions)
+        ))
     
     def clear_input(self):
         """Clear input and results."""
@@ -737,22 +1246,120 @@ Please check:
             )
             return
         
-        self.scanner = BarcodeScanner(callback=self.on_barcode_scanned)
+        if self.scanner and self.scanner.running:
+            return
+        
+        self.scanner = BarcodeScanner(**self.scanner_options)
         if self.scanner.start():
-            messagebox.showinfo(
-                "Scanner Started",
-                "Position a UPC barcode in front of your webcam.\n"
-                "Press ESC to cancel scanning."
+            self.root.after(self.scanner_poll_ms, self.poll_scanner, self.scanner)
+            if self.scanner.continuous:
+                messagebox.showinfo(
+                    "Scanner Started",
+                    "Scan items one after another; each UPC is validated and\n"
+                    "added to the history as it is read.\n"
+                    "Press ESC in the camera window to stop scanning."
+                )
+            else:
+                messagebox.showinfo(
+                    "Scanner Started",
+                    "Position a UPC barcode in front of your webcam.\n"
+                    "Press ESC to cancel scanning."
+                )
+    
+    def poll_scanner(self, scanner):
+        """Handle scanner results on the UI thread until the scanner stops."""
+        while True:
+            try:
+                kind, value = scanner.results.get_nowait()
+            except queue.Empty:
+                break
+            
+            if kind == 'scan':
+                self.on_barcode_scanned(value, scanner.continuous)
+            elif kind == 'error':
+                messagebox.showerror("Scanner Error", value)
+            elif kind == 'stopped':
+                return
+        
+        self.root.after(self.scanner_poll_ms, self.poll_scanner, scanner)
+    
+    def decode_media(self):
+        """Decode barcodes from a folder of images or a video file into CSV and history."""
+        if not CV2_AVAILABLE or not PYZBAR_AVAILABLE:
+            messagebox.showerror(
+                "Missing Dependencies",
+                "Decoding images and videos requires OpenCV and pyzbar.\n\n"
+                "Install with:\n"
+                "pip install opencv-python pyzbar"
+            )
+            return
+        
+        use_folder = messagebox.askyesnocancel(
+            "Decode Media",
+            "Decode a folder of images?\n\n"
+            "Yes: every image in a folder\n"
+            "No: the frames of a video file"
+        )
+        if use_folder is None:
+            return
+        
+        if use_folder:
+            source = filedialog.askdirectory(title="Select image folder")
+        else:
+            source = filedialog.askopenfilename(
+                title="Select video file",
+                filetypes=[("Video Files", "*.mp4 *.avi *.mov *.mkv"), ("All Files", "*.*")]
             )
+        if not source:
+            return
+        
+        output = filedialog.asksaveasfilename(
+            title="Save decoded barcodes as",
+            defaultextension=".csv",
+            filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")]
+        )
+        if not output:
+            return
+        
+        # Hits are written to the CSV and recorded in the validation history
+        task = BackgroundTask(
+            lambda progress, cancel_event: decode_offline(
+                source, output=output, history=self.history_store, workers=self.batch_workers,
+                progress=progress, cancel_event=cancel_event
+            ),
+            cleanup=self.history_store.release
+        )
+        self.start_task(task)
+        self.show_task_progress(
+            task,
+            "Decoding Media",
+            lambda report: self.show_decode_report(report, output),
+            "Failed to decode media"
+        )
     
-    def on_barcode_scanned(self, upc, error):
-        """Callback when barcode is scanned."""
-        if error:
-            messagebox.showerror("Scanner Error", error)
-        elif upc:
-            self.upc_entry.delete(0, tk.END)
-            self.upc_entry.insert(0, upc)
-            self.validate_upc()
+    def show_decode_report(self, report, output):
+        """Summarize an offline decode run and refresh the history panel."""
+        lines = [
+            f"Decoded: {report.items:,} {report.kind} in {report.elapsed:.1f} s "
+            f"({report.rate:,.1f} {report.kind}/s)",
+            f"Barcodes: {report.hits:,} ({report.valid:,} valid)",
+            f"Results saved to:\n{output}",
+        ]
+        if report.errors:
+            lines.append(f"\nUnreadable files: {len(report.errors):,}")
+            lines.extend(f"  {os.path.basename(path)}" for path, _ in report.errors[:10])
+        messagebox.showinfo("Decode Media", "\n".join(lines))
+        
+        self.history_before_id = None
+        self.load_history()
+    
+    def on_barcode_scanned(self, upc, continuous=False):
+        """Validate a scanned barcode and record it in the history."""
+        self.upc_entry.delete(0, tk.END)
+        self.upc_entry.insert(0, upc)
+        self.validate_upc()
+        # A dialog would block the next scan; continuous mode only updates the panel
+        if not continuous:
             messagebox.showinfo("Success", f"Barcode scanned: {upc}")
     
     def generate_barcode(self):
@@ -763,26 +1370,38 @@ Please check:
             messagebox.showwarning("Warning", "Please enter a valid 12-digit UPC first")
             return
         
-        if not BARCODE_AVAILABLE or not PIL_AVAILABLE:
-            messagebox.showerror(
-                "Missing Dependencies",
-                "Barcode generation requires python-barcode and Pillow.\n\n"
-                "Install with:\n"
-                "pip install python-barcode pillow"
-            )
-            return
-        
         # Ask where to save
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG Image", "*.png"), ("JPEG Image", "*.jpg"), ("All Files", "*.*")]
+            filetypes=[("PNG Image", "*.png"), ("JPEG Image", "*.jpg"), ("SVG Vector Image", "*.svg"),
+                       ("All Files", "*.*")]
         )
         
         if not file_path:
             return
         
-        # Generate barcode
-        image = self.barcode_generator.generate(upc, file_path)
+        if file_path.lower().endswith('.svg'):
+            # Vector output needs no imaging library; the preview is raster if Pillow is installed
+            try:
+                self.barcode_generator.generate_svg(upc, file_path)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", f"Failed to generate SVG:\n{e}")
+                return
+            image = self.barcode_generator.generate(upc)
+            if image is None:
+                messagebox.showinfo("Success", f"Barcode saved to:\n{file_path}")
+                return
+        elif not self.barcode_generator.available:
+            messagebox.showerror(
+                "Missing Dependencies",
+                "Barcode generation requires Pillow.\n\n"
+                "Install with:\n"
+                "pip install pillow"
+            )
+            return
+        else:
+            # Generate barcode
+            image = self.barcode_generator.generate(upc, file_path)
         
         if image:
             # Display preview
@@ -796,6 +1415,108 @@ Please check:
         else:
             messagebox.showerror("Error", "Failed to generate barcode image")
     
+    def generate_barcode_batch(self):
+        """Render barcodes for a CSV/text file of UPCs as PNG files or label sheets."""
+        input_path = filedialog.askopenfilename(
+            title="Select CSV file with UPC codes",
+            filetypes=[("CSV Files", "*.csv"), ("Text Files", "*.txt"), ("All Files", "*.*")]
+        )
+        if not input_path:
+            return
+        
+        output_format = self.ask_barcode_batch_format()
+        if output_format is None:
+            return
+        
+        if output_format not in VECTOR_FORMATS and not self.barcode_generator.available:
+            messagebox.showerror(
+                "Missing Dependencies",
+                "Raster barcode generation requires Pillow.\n\n"
+                "Install with:\n"
+                "pip install pillow"
+            )
+            return
+        
+        if output_format in ('sheet-pdf', 'vector-pdf'):
+            output = filedialog.asksaveasfilename(
+                defaultextension=".pdf",
+                filetypes=[("PDF Files", "*.pdf"), ("All Files", "*.*")]
+            )
+        elif output_format == 'sheet-svg':
+            output = filedialog.asksaveasfilename(
+                defaultextension=".svg",
+                filetypes=[("SVG Files", "*.svg"), ("All Files", "*.*")]
+            )
+        else:
+            output = filedialog.askdirectory(title="Select output folder")
+        if not output:
+            return
+        
+        task = BackgroundTask(
+            lambda progress, cancel_event: generate_batch(
+                input_path, output, output_format, workers=self.batch_workers,
+                progress=progress, cancel_event=cancel_event
+            )
+        )
+        self.start_task(task)
+        self.show_task_progress(
+            task,
+            "Generating Barcodes",
+            self.show_barcode_batch_report,
+            "Failed to generate barcodes"
+        )
+    
+    def ask_barcode_batch_format(self):
+        """Ask for the batch barcode output format. Returns a BATCH_FORMATS value or None."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Batch Barcodes")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        format_var = tk.StringVar(value='sheet-pdf')
+        result = {}
+        
+        choices = (
+            ('png', "Individual PNG files"),
+            ('sheet-png', f"Label sheets as PNG ({DEFAULT_SHEET_COLUMNS} x {DEFAULT_SHEET_ROWS})"),
+            ('sheet-pdf', f"Label sheets as PDF ({DEFAULT_SHEET_COLUMNS} x {DEFAULT_SHEET_ROWS})"),
+            ('sheet-svg', "Vector label sheet (SVG)"),
+            ('vector-pdf', f"Vector label pages (PDF, {DEFAULT_SHEET_COLUMNS} x {DEFAULT_SHEET_ROWS})"),
+        )
+        for row, (value, label) in enumerate(choices):
+            state = tk.DISABLED if value.endswith('pdf') and not PDF_AVAILABLE else tk.NORMAL
+            tk.Radiobutton(dialog, text=label, variable=format_var, value=value,
+                           state=state).grid(row=row, column=0, sticky=tk.W, padx=15, pady=3)
+        if not PDF_AVAILABLE:
+            format_var.set('sheet-png')
+        
+        def on_ok():
+            result['format'] = format_var.get()
+            dialog.destroy()
+        
+        button_frame = tk.Frame(dialog)
+        button_frame.grid(row=len(choices), column=0, pady=10)
+        tk.Button(button_frame, text="Generate", command=on_ok, bg='#16a085', fg='white',
+                  padx=15).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Cancel", command=dialog.destroy, padx=15).pack(side=tk.LEFT, padx=5)
+        
+        self.root.wait_window(dialog)
+        return result.get('format')
+    
+    def show_barcode_batch_report(self, report):
+        """Summarize a batch barcode run, listing the first failures."""
+        lines = [
+            f"Rendered: {report.rendered:,} barcodes",
+            f"Files written: {len(report.files):,}",
+            f"Time: {report.elapsed:.1f} s ({report.throughput:,.0f} barcodes/s)",
+        ]
+        if report.failures:
+            lines.append(f"\nFailed: {len(report.failures):,}")
+            lines.extend(f"  {upc or '(empty)'}: {reason}" for upc, reason in report.failures[:10])
+            if len(report.failures) > 10:
+                lines.append(f"  ... and {len(report.failures) - 10:,} more")
+        messagebox.showinfo("Batch Barcodes", "\n".join(lines))
+    
     def batch_validate(self):
         """Batch validate UPCs from CSV file."""
         file_path = filedialog.askopenfilename(
@@ -806,125 +1527,327 @@ Please check:
         if not file_path:
             return
         
-        try:
-            results = []
+        if self.batch_job and self.batch_job.running:
+            messagebox.showwarning("Warning", "A batch validation is already running")
+            return
+        
+        # Stream the file in a background thread; CSV vs plain text is auto-detected
+        self.batch_job = BatchValidationJob(
+            file_path,
+            workers=self.batch_workers,
+            chunk_size=self.batch_chunk_size,
+            parallel_threshold=self.batch_parallel_threshold
+        )
+        self.batch_job.start()
+        self.show_batch_progress(self.batch_job)
+    
+    def show_batch_progress(self, job):
+        """Show a progress dialog that polls the background batch job."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Batch Validation")
+        dialog.geometry("480x220")
+        
+        tk.Label(
+            dialog,
+            text=f"Validating {os.path.basename(job.file_path)}",
+            font=('Segoe UI', 11, 'bold'),
+            pady=10
+        ).pack(fill=tk.X)
+        
+        progress_bar = ttk.Progressbar(dialog, mode='determinate', maximum=1000)
+        progress_bar.pack(fill=tk.X, padx=20, pady=5)
+        
+        counts_label = tk.Label(dialog, font=('Consolas', 10))
+        counts_label.pack(pady=2)
+        
+        rate_label = tk.Label(dialog, font=('Consolas', 9))
+        rate_label.pack(pady=2)
+        
+        button_frame = tk.Frame(dialog)
+        button_frame.pack(pady=10)
+        
+        tk.Button(
+            button_frame,
+            text="View Results",
+            command=lambda: self.show_batch_results(job),
+            bg='#3498db',
+            fg='white',
+            padx=15,
+            pady=5
+        ).pack(side=tk.LEFT, padx=5)
+        
+        cancel_button = tk.Button(
+            button_frame,
+            text="Cancel",
+            command=job.cancel,
+            bg='#c0392b',
+            fg='white',
+            padx=15,
+            pady=5
+        )
+        cancel_button.pack(side=tk.LEFT, padx=5)
+        
+        def poll():
+            if not dialog.winfo_exists():
+                return
             
-            with open(file_path, 'r') as f:
-                # Try to detect if it's CSV or plain text
-                first_line = f.readline().strip()
-                f.seek(0)
-                
-                if ',' in first_line:
-                    reader = csv.reader(f)
-                    upcs = [row[0].strip() for row in reader if row]
-                else:
-                    upcs = [line.strip() for line in f if line.strip()]
+            # Drain all events posted since the last poll
+            finished = None
+            try:
+                while True:
+                    kind, payload = job.queue.get_nowait()
+                    if kind != 'progress':
+                        finished = (kind, payload)
+            except queue.Empty:
+                pass
             
-            # Validate each UPC
-            for upc in upcs:
-                validator = UPCValidator(upc)
-                is_valid = validator.validate()
-                results.append({
-                    'upc': upc,
-                    'valid': is_valid,
-                    'error': validator.error_message if not is_valid else '',
-                    'product_type': validator.product_type if is_valid else ''
-                })
+            stats = job.stats
+            progress_bar['value'] = stats.progress * 1000
+            counts_label.config(
+                text=f"{stats.total:,} processed   ✓ {stats.valid:,} valid   ✗ {stats.invalid:,} invalid"
+            )
+            rate_label.config(text=f"{job.throughput:,.0f} codes/sec")
             
-            # Show results dialog
-            self.show_batch_results(results)
+            if finished is None:
+                dialog.after(100, poll)
+                return
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to process file:\n{e}")
+            kind, payload = finished
+            cancel_button.config(text="Close", command=dialog.destroy)
+            if kind == 'done':
+                dialog.title("Batch Validation - Complete")
+                self.show_batch_results(job)
+            elif kind == 'cancelled':
+                dialog.title("Batch Validation - Cancelled")
+            else:
+                dialog.title("Batch Validation - Failed")
+                messagebox.showerror("Error", f"Failed to process file:\n{payload}")
+        
+        def on_close():
+            job.cancel()
+            dialog.destroy()
+        
+        dialog.protocol("WM_DELETE_WINDOW", on_close)
+        poll()
     
-    def show_batch_results(self, results):
-        """Show batch validation results in a dialog."""
+    def show_batch_results(self, job):
+        """Show a batch job's results (possibly still growing) in a dialog."""
+        store, stats = job.results, job.stats
         dialog = tk.Toplevel(self.root)
         dialog.title("Batch Validation Results")
         dialog.geometry("700x500")
         
-        # Summary
-        valid_count = sum(1 for r in results if r['valid'])
-        invalid_count = len(results) - valid_count
-        
-        tk.Label(
+        summary_label = tk.Label(
             dialog,
-            text=f"Validated {len(results)} UPCs: {valid_count} valid, {invalid_count} invalid",
             font=('Segoe UI', 11, 'bold'),
             bg='#ecf0f1',
             fg='#2c3e50',
             pady=10
-        ).pack(fill=tk.X)
-        
-        # Results text
-        results_text = scrolledtext.ScrolledText(
-            dialog,
-            font=('Consolas', 9),
-            wrap=tk.WORD
         )
-        results_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        summary_label.pack(fill=tk.X)
+        
+        # Filters
+        filter_frame = tk.Frame(dialog)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        invalid_only = tk.BooleanVar(value=False)
+        product_digit = tk.StringVar(value="All")
+        
+        # Jobs that keep only rejects have nothing else to filter out
+        if not job.invalid_only:
+            tk.Checkbutton(
+                filter_frame,
+                text="Invalid only",
+                variable=invalid_only,
+                command=lambda: apply_filter()
+            ).pack(side=tk.LEFT, padx=(0, 15))
+        
+        tk.Label(filter_frame, text="Product type digit:").pack(side=tk.LEFT, padx=(0, 5))
+        digit_combo = ttk.Combobox(
+            filter_frame,
+            textvariable=product_digit,
+            values=["All"] + [str(d) for d in range(10)],
+            width=5,
+            state='readonly'
+        )
+        digit_combo.pack(side=tk.LEFT)
+        digit_combo.bind('<<ComboboxSelected>>', lambda e: apply_filter())
         
-        for i, r in enumerate(results, 1):
-            status = "✓ VALID" if r['valid'] else "✗ INVALID"
-            line = f"{i}. {r['upc']:12s} - {status:10s}"
-            if r['valid']:
-                line += f" - {r['product_type']}"
-            else:
-                line += f" - {r['error']}"
-            results_text.insert(tk.END, line + "\n")
+        # Virtualized results table (only the visible rows exist as widgets)
+        view = VirtualResultView(dialog, store)
+        view.frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        results_text.config(state=tk.DISABLED)
+        def apply_filter():
+            digit = product_digit.get()
+            view.set_filter(invalid_only.get(), None if digit == "All" else digit)
+        
+        def refresh_summary(last_count=None):
+            if not dialog.winfo_exists():
+                return
+            count = (len(store), stats.total)
+            if count != last_count:
+                if job.invalid_only:
+                    summary_label.config(
+                        text=f"Validated {stats.total:,} UPCs: {stats.valid:,} valid, {stats.invalid:,} invalid\n"
+                             "Valid codes are counted but not listed"
+                    )
+                else:
+                    summary_label.config(
+                        text=f"Validated {len(store)} UPCs: {store.valid_count} valid, {store.invalid_count} invalid"
+                    )
+                view.render()
+            dialog.after(500, refresh_summary, count)
+        
+        refresh_summary()
+        
+        button_row = tk.Frame(dialog)
+        button_row.pack(pady=10)
+        
+        tk.Button(
+            button_row,
+            text="Suggest Corrections...",
+            command=lambda: self.export_batch_corrections(store),
+            bg='#27ae60',
+            fg='white',
+            padx=20,
+            pady=5
+        ).pack(side=tk.LEFT, padx=5)
         
         # Close button
         tk.Button(
-            dialog,
+            button_row,
             text="Close",
             command=dialog.destroy,
             bg='#3498db',
             fg='white',
             padx=20,
             pady=5
-        ).pack(pady=10)
+        ).pack(side=tk.LEFT, padx=5)
     
-    def save_to_history(self, upc, is_valid, product_type):
+    def export_batch_corrections(self, store):
+        """Write likely corrections for every check-digit reject of a batch to CSV."""
+        codes, errors = store.codes, store.errors
+        rejects = [codes[i] for i in range(len(store)) if errors[i] == UPCError.CHECK_DIGIT]
+        if not rejects:
+            messagebox.showinfo("Suggest Corrections", "No codes failed their check digit.")
+            return
+        
+        file_path = filedialog.asksaveasfilename(
+            title="Save corrections as",
+            defaultextension=".csv",
+            filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")]
+        )
+        if not file_path:
+            return
+        
+        task = BackgroundTask(
+            lambda progress, cancel_event: write_corrections(
+                rejects, file_path, known=self.history_store.known_codes,
+                progress=progress, cancel_event=cancel_event
+            ),
+            cleanup=self.history_store.release
+        )
+        self.start_task(task)
+        self.show_task_progress(
+            task,
+            "Suggesting Corrections",
+            lambda count: messagebox.showinfo(
+                "Suggest Corrections",
+                f"Suggested corrections for {count:,} rejected codes.\n\nSaved to:\n{file_path}"
+            ),
+            "Failed to suggest corrections"
+        )
+    
+    def save_to_history(self, upc, is_valid):
         """Save validation to history database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO validation_history (upc_code, is_valid, product_type, timestamp) VALUES (?, ?, ?, ?)',
-                (upc, 1 if is_valid else 0, product_type, datetime.now().isoformat())
-            )
-            conn.commit()
-            conn.close()
+            # Buffered write-behind insert; flushed in batches
+            upc, is_valid, timestamp = self.history_store.add(upc, is_valid)
             
-            # Refresh history display
-            self.load_history()
+            # Update the listbox from memory instead of re-reading the database
+            if self.history_before_id is None:
+                self.history_listbox.insert(0, self.format_history_row(upc, is_valid, timestamp))
+                self.history_listbox.delete(self.history_limit, tk.END)
         except Exception as e:
             print(f"Error saving to history: {e}")
     
-    def load_history(self):
-        """Load validation history from database."""
+    def flush_history(self):
+        """Periodically flush buffered history rows to the database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT upc_code, is_valid, timestamp FROM validation_history ORDER BY id DESC LIMIT 50'
+            self.history_store.flush()
+        except Exception as e:
+            print(f"Error flushing history: {e}")
+        self.root.after(self.history_flush_ms, self.flush_history)
+    
+    def maintain_history(self):
+        """Periodically archive expired history and compact the database in the background."""
+        task = self.history_maintenance_task
+        if task is None or not task.running:
+            if task is not None:
+                try:
+                    kind, payload = task.queue.get_nowait()
+                    if kind == 'error':
+                        print(f"Error maintaining history: {payload}")
+                    elif kind == 'done' and payload['archived'] and self.history_before_id is None:
+                        self.load_history()
+                except queue.Empty:
+                    pass
+            
+            self.history_maintenance_task = BackgroundTask(
+                lambda progress, cancel_event: self.history_store.maintain(cancel_event=cancel_event),
+                cleanup=self.history_store.release
             )
-            rows = cursor.fetchall()
-            conn.close()
+            self.start_task(self.history_maintenance_task)
+        self.root.after(self.history_maintenance_ms, self.maintain_history)
+    
+    def format_history_row(self, upc, is_valid, timestamp):
+        """Format one history entry for the listbox."""
+        status = "✓" if is_valid else "✗"
+        time_str = datetime.fromtimestamp(timestamp).strftime('%m/%d %H:%M')
+        return f"{status} {upc} - {time_str}"
+    
+    def load_history(self, rows=None):
+        """Load one page of validation history (the newest page by default)."""
+        try:
+            if rows is None:
+                rows = self.history_store.page(before_id=self.history_before_id, limit=self.history_limit)
             
             # Clear listbox
             self.history_listbox.delete(0, tk.END)
             
             # Add history items
-            for upc, is_valid, timestamp in rows:
-                status = "✓" if is_valid else "✗"
-                time_str = datetime.fromisoformat(timestamp).strftime('%m/%d %H:%M')
-                self.history_listbox.insert(tk.END, f"{status} {upc} - {time_str}")
+            for row in rows:
+                self.history_listbox.insert(
+                    tk.END, self.format_history_row(row.upc_code, row.is_valid, row.timestamp)
+                )
+            
+            # Remember the page boundaries for keyset paging
+            self.history_page_ids = (rows[0].id, rows[-1].id) if rows else None
         except Exception as e:
             print(f"Error loading history: {e}")
     
+    def history_older(self):
+        """Show the next older page of history."""
+        if not self.history_page_ids:
+            return
+        rows = self.history_store.page(before_id=self.history_page_ids[1], limit=self.history_limit)
+        if rows:
+            self.history_before_id = self.history_page_ids[1]
+            self.load_history(rows)
+    
+    def history_newer(self):
+        """Show the next newer page of history."""
+        if self.history_before_id is None or not self.history_page_ids:
+            return
+        rows = self.history_store.page(after_id=self.history_page_ids[0], limit=self.history_limit)
+        if len(rows) < self.history_limit:
+            # Reached the newest page
+            self.history_before_id = None
+            self.load_history()
+        else:
+            self.history_before_id = rows[0].id + 1
+            self.load_history(rows)
+    
     def clear_history(self):
         """Clear all validation history."""
         result = messagebox.askyesno(
@@ -934,46 +1857,149 @@ Please check:
         
         if result:
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM validation_history')
-                conn.commit()
-                conn.close()
+                self.history_store.clear()
                 
+                self.history_before_id = None
+                self.history_page_ids = None
                 self.history_listbox.delete(0, tk.END)
                 messagebox.showinfo("Success", "History cleared")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to clear history:\n{e}")
     
     def export_csv(self):
-        """Export history to CSV file."""
+        """Export history to CSV file (optionally gzip-compressed and filtered)."""
+        filters = self.ask_export_filters()
+        if filters is None:
+            return
+        
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")]
+            filetypes=[("CSV Files", "*.csv"), ("Gzip CSV Files", "*.csv.gz"), ("All Files", "*.*")]
         )
         
         if not file_path:
             return
         
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT upc_code, is_valid, product_type, timestamp FROM validation_history ORDER BY id DESC')
-            rows = cursor.fetchall()
-            conn.close()
+        # Stream rows in the background; .gz paths are gzip-compressed
+        task = BackgroundTask(
+            lambda progress, cancel_event: self.history_store.export_csv(
+                file_path, progress=progress, cancel_event=cancel_event, **filters
+            ),
+            cleanup=self.history_store.release
+        )
+        self.start_task(task)
+        self.show_task_progress(
+            task,
+            "Exporting History (CSV)",
+            lambda rows: messagebox.showinfo("Success", f"Exported {rows} rows to:\n{file_path}"),
+            "Failed to export CSV"
+        )
+    
+    def ask_export_filters(self):
+        """
+        Ask for optional export filters.
+        Returns keyword filters for HistoryStore (start/end/valid) or None if cancelled.
+        """
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Export Filters")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        from_var = tk.StringVar()
+        to_var = tk.StringVar()
+        validity_var = tk.StringVar(value="All")
+        result = {}
+        
+        tk.Label(dialog, text="From date (YYYY-MM-DD):").grid(row=0, column=0, sticky=tk.W, padx=10, pady=5)
+        tk.Entry(dialog, textvariable=from_var).grid(row=0, column=1, padx=10, pady=5)
+        tk.Label(dialog, text="To date (YYYY-MM-DD):").grid(row=1, column=0, sticky=tk.W, padx=10, pady=5)
+        tk.Entry(dialog, textvariable=to_var).grid(row=1, column=1, padx=10, pady=5)
+        tk.Label(dialog, text="Validity:").grid(row=2, column=0, sticky=tk.W, padx=10, pady=5)
+        ttk.Combobox(
+            dialog,
+            textvariable=validity_var,
+            values=["All", "Valid only", "Invalid only"],
+            state='readonly'
+        ).grid(row=2, column=1, padx=10, pady=5)
+        
+        def on_ok():
+            try:
+                if from_var.get().strip():
+                    result['start'] = datetime.strptime(from_var.get().strip(), '%Y-%m-%d').timestamp()
+                if to_var.get().strip():
+                    # Inclusive end date: up to midnight of the following day
+                    end = datetime.strptime(to_var.get().strip(), '%Y-%m-%d')
+                    result['end'] = end.timestamp() + 86400
+            except ValueError:
+                messagebox.showerror("Error", "Dates must use the format YYYY-MM-DD", parent=dialog)
+                result.clear()
+                return
+            if validity_var.get() != "All":
+                result['valid'] = validity_var.get() == "Valid only"
+            result['ok'] = True
+            dialog.destroy()
+        
+        button_frame = tk.Frame(dialog)
+        button_frame.grid(row=3, column=0, columnspan=2, pady=10)
+        tk.Button(button_frame, text="Export", command=on_ok, bg='#16a085', fg='white',
+                  padx=15).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Cancel", command=dialog.destroy, padx=15).pack(side=tk.LEFT, padx=5)
+        
+        self.root.wait_window(dialog)
+        if not result.pop('ok', False):
+            return None
+        return result
+    
+    def start_task(self, task):
+        """Start a BackgroundTask and track it so exit_app can stop it first."""
+        self.background_tasks = [running for running in self.background_tasks if running.running]
+        self.background_tasks.append(task)
+        task.start()
+    
+    def show_task_progress(self, task, title, on_done, error_title):
+        """Show a progress dialog for a BackgroundTask and report its outcome."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title(title)
+        dialog.geometry("420x150")
+        
+        progress_bar = ttk.Progressbar(dialog, mode='determinate', maximum=1000)
+        progress_bar.pack(fill=tk.X, padx=20, pady=(20, 5))
+        
+        status_label = tk.Label(dialog, font=('Consolas', 10))
+        status_label.pack(pady=5)
+        
+        tk.Button(
+            dialog,
+            text="Cancel",
+            command=task.cancel,
+            bg='#c0392b',
+            fg='white',
+            padx=15,
+            pady=5
+        ).pack(pady=5)
+        
+        def poll():
+            if task.total:
+                progress_bar['value'] = task.done * 1000 / task.total
+            status_label.config(text=f"{task.done:,} / {task.total:,}")
             
-            with open(file_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['UPC Code', 'Valid', 'Product Type', 'Timestamp'])
-                for row in rows:
-                    writer.writerow([row[0], 'Yes' if row[1] else 'No', row[2] or '', row[3]])
+            try:
+                kind, payload = task.queue.get_nowait()
+            except queue.Empty:
+                dialog.after(100, poll)
+                return
             
-            messagebox.showinfo("Success", f"History exported to:\n{file_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export CSV:\n{e}")
+            dialog.destroy()
+            if kind == 'done':
+                on_done(payload)
+            elif kind == 'error':
+                messagebox.showerror("Error", f"{error_title}:\n{payload}")
+        
+        dialog.protocol("WM_DELETE_WINDOW", task.cancel)
+        poll()
     
     def export_pdf(self):
-        """Export history to PDF file."""
+        """Export history to a PDF report (summary only or with every row)."""
         if not PDF_AVAILABLE:
             messagebox.showerror(
                 "Missing Dependency",
@@ -983,6 +2009,10 @@ Please check:
             )
             return
         
+        filters = self.ask_export_filters()
+        if filters is None:
+            return
+        
         file_path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF Files", "*.pdf"), ("All Files", "*.*")]
@@ -991,53 +2021,31 @@ Please check:
         if not file_path:
             return
         
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT upc_code, is_valid, product_type, timestamp FROM validation_history ORDER BY id DESC')
-            rows = cursor.fetchall()
-            conn.close()
-            
-            # Create PDF
-            c = canvas.Canvas(file_path, pagesize=letter)
-            width, height = letter
-            
-            # Title
-            c.setFont("Helvetica-Bold", 16)
-            c.drawString(1*inch, height - 1*inch, "UPC Validation History Report")
-            
-            # Metadata
-            c.setFont("Helvetica", 10)
-            c.drawString(1*inch, height - 1.3*inch, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            c.drawString(1*inch, height - 1.5*inch, f"Total Records: {len(rows)}")
-            
-            # Table header
-            y = height - 2*inch
-            c.setFont("Helvetica-Bold", 10)
-            c.drawString(1*inch, y, "UPC Code")
-            c.drawString(2.5*inch, y, "Valid")
-            c.drawString(3.5*inch, y, "Product Type")
-            c.drawString(5*inch, y, "Timestamp")
-            
-            # Table rows
-            c.setFont("Helvetica", 9)
-            y -= 0.2*inch
-            
-            for row in rows:
-                if y < 1*inch:  # New page if needed
-                    c.showPage()
-                    y = height - 1*inch
-                
-                c.drawString(1*inch, y, row[0])
-                c.drawString(2.5*inch, y, "Yes" if row[1] else "No")
-                c.drawString(3.5*inch, y, row[2] or "N/A")
-                c.drawString(5*inch, y, row[3][:16])
-                y -= 0.2*inch
-            
-            c.save()
-            messagebox.showinfo("Success", f"History exported to:\n{file_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export PDF:\n{e}")
+        # Summary-only reports skip the per-row table entirely
+        summary_only = messagebox.askyesnocancel(
+            "PDF Report",
+            "Create a summary-only report?\n\n"
+            "Yes: counts per product type and per day\n"
+            "No: summary followed by every matching row\n"
+            f"(over {PDF_MAX_DETAIL_ROWS:,} rows: summary only, use CSV export)"
+        )
+        if summary_only is None:
+            return
+        
+        task = BackgroundTask(
+            lambda progress, cancel_event: self.history_store.export_pdf(
+                file_path, summary_only=summary_only, progress=progress,
+                cancel_event=cancel_event, **filters
+            ),
+            cleanup=self.history_store.release
+        )
+        self.start_task(task)
+        self.show_task_progress(
+            task,
+            "Exporting History (PDF)",
+            lambda rows: messagebox.showinfo("Success", f"History exported to:\n{file_path}"),
+            "Failed to export PDF"
+        )
     
     def toggle_dark_mode(self):
         """Toggle between dark and light mode."""
@@ -1121,6 +2129,22 @@ Developed in Python with Tkinter
         
         result = messagebox.askyesno("Exit", "Are you sure you want to exit?")
         if result:
+            if self.batch_job:
+                self.batch_job.cancel()
+            # Stop exports, decoding and maintenance before their connections are closed;
+            # each checks cancel_event between short batches and removes partial files
+            for task in self.background_tasks:
+                task.cancel()
+            for task in self.background_tasks:
+                task.thread.join()
+            # Guaranteed flush of buffered history: never quit with rows unsaved
+            while True:
+                try:
+                    self.history_store.close()
+                    break
+                except Exception as e:
+                    if not messagebox.askretrycancel("Exit", f"Could not save history:\n{e}"):
+                        return
             self.root.quit()
 
 